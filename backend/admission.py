@@ -0,0 +1,185 @@
+import math
+import os
+import threading
+import time
+
+from metrics import registry as default_registry
+
+# Request threads per Gunicorn worker (--threads in Procfile and startup.sh)
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Threads cheap and heavy requests may never take, so critical routes always find one
+RESERVED_THREADS = int(os.environ.get("ADMISSION_RESERVED_THREADS", 1))
+
+# Default max wait seconds per priority class
+DEFAULT_MAX_WAIT = {
+    "cheap": 2.0,
+    "heavy": 5.0
+}
+
+def thread_budget(threads=GUNICORN_THREADS, reserved=RESERVED_THREADS):
+    """Threads cheap and heavy requests may hold between them, running or waiting"""
+    return max(1, threads - reserved)
+
+def default_limits(budget):
+    """
+    Pool limits that fit a thread budget
+
+    Heavy requests get at most half the budget, running and queued. Cheap
+    concurrency stays below what heavy work leaves free, so cheap requests
+    start queueing (and heavy ones are shed) before the budget runs out.
+    A queued request holds its thread too, so queues end at the budget.
+
+    Args:
+        budget: thread_budget()
+
+    Returns:
+        dict: Class -> (max concurrency, max queue length, max wait seconds)
+    """
+    heavy_total = max(1, budget // 2)
+    heavy_concurrency = max(1, heavy_total * 2 // 3)
+    cheap_concurrency = max(1, budget - heavy_concurrency - 1)
+    return {
+        "cheap": (cheap_concurrency, max(0, budget - cheap_concurrency), DEFAULT_MAX_WAIT["cheap"]),
+        "heavy": (heavy_concurrency, heavy_total - heavy_concurrency, DEFAULT_MAX_WAIT["heavy"])
+    }
+
+class RoutePool:
+    """
+    Bounded concurrency with a bounded wait queue for one priority class
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, max_wait, threads=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.threads = threads
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait for a slot
+
+        Returns:
+            str: "admitted", "threads" (the shared thread budget is used up),
+                "queue_full" (rejected at once) or "timeout" (waited
+                max_wait without getting a slot)
+        """
+        # Running and waiting requests both hold a server thread
+        if self.threads is not None and not self.threads.acquire(blocking=False):
+            return "threads"
+        result = self._acquire_slot()
+        if result != "admitted" and self.threads is not None:
+            self.threads.release()
+        return result
+
+    def _acquire_slot(self):
+        with self._condition:
+            if self.active < self.max_concurrency:
+                self.active += 1
+                return "admitted"
+            if self.waiting >= self.max_queue:
+                return "queue_full"
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.active >= self.max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return "timeout"
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return "admitted"
+
+    def release(self):
+        """Free a slot and wake one waiter"""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+        if self.threads is not None:
+            self.threads.release()
+
+class AdmissionController:
+    """
+    Admission control for Flask requests by priority class
+
+    Routes in the "critical" class (health checks, metrics) are never
+    limited. "cheap" and "heavy" classes each get their own pool, and heavy
+    work is shed outright while cheap requests are queueing so charts and
+    batch jobs cannot starve interactive predictions. The pools share a
+    budget of server threads, running and waiting requests alike, that
+    leaves RESERVED_THREADS free for the critical routes.
+    """
+
+    def __init__(self, limits=None, registry=None, budget=None):
+        self.budget = budget if budget is not None else thread_budget()
+        limits = limits or load_limits(self.budget)
+        threads = threading.BoundedSemaphore(self.budget)
+        self.pools = {name: RoutePool(name, *limit, threads=threads) for name, limit in limits.items()}
+        self.registry = registry or default_registry
+        self.registry.counter("admission_admitted_total", "Requests admitted by priority class")
+        self.registry.counter("admission_shed_total", "Requests rejected by priority class and reason")
+        self.registry.gauge("admission_queue_depth", "Requests waiting for a slot", self._queue_depths)
+        self.registry.gauge("admission_in_flight", "Requests holding a slot", self._in_flight)
+
+    def _queue_depths(self):
+        return {(("route_class", name),): pool.waiting for name, pool in self.pools.items()}
+
+    def _in_flight(self):
+        return {(("route_class", name),): pool.active for name, pool in self.pools.items()}
+
+    def admit(self, route_class):
+        """
+        Try to admit a request
+
+        Args:
+            route_class: "critical", "cheap" or "heavy"
+
+        Returns:
+            tuple: (pool, rejection) where pool must be released after the
+                request if not None, and rejection is None or a
+                (status_code, reason, retry_after_seconds) tuple
+        """
+        pool = self.pools.get(route_class)
+        if pool is None:
+            return None, None
+
+        cheap = self.pools.get("cheap")
+        if route_class == "heavy" and cheap is not None and cheap.waiting > 0:
+            return None, self._shed(route_class, "priority", 429, pool)
+
+        result = pool.acquire()
+        if result == "admitted":
+            self.registry.inc("admission_admitted_total", {"route_class": route_class})
+            return pool, None
+        if result in ("queue_full", "threads"):
+            return None, self._shed(route_class, result, 429, pool)
+        return None, self._shed(route_class, result, 503, pool)
+
+    def _shed(self, route_class, reason, status, pool):
+        self.registry.inc("admission_shed_total", {"route_class": route_class, "reason": reason})
+        return status, reason, max(1, math.ceil(pool.max_wait))
+
+def load_limits(budget=None):
+    """
+    Read pool limits from the environment
+
+    ADMISSION_<CLASS>_CONCURRENCY, ADMISSION_<CLASS>_QUEUE and
+    ADMISSION_<CLASS>_MAX_WAIT override the defaults for each class, which
+    are derived from the thread budget.
+    """
+    limits = {}
+    for name, (concurrency, queue, wait) in default_limits(budget or thread_budget()).items():
+        prefix = f"ADMISSION_{name.upper()}_"
+        limits[name] = (
+            int(os.environ.get(prefix + "CONCURRENCY", concurrency)),
+            int(os.environ.get(prefix + "QUEUE", queue)),
+            float(os.environ.get(prefix + "MAX_WAIT", wait))
+        )
+    return limits
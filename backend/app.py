@@ -1,20 +1,113 @@
 import os
 import pickle
 import numpy as np
-# Set matplotlib backend to non-interactive before other imports
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, has_request_context, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import io
+import json
 import base64
-from utils import validate_input_data
+import hashlib
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from utils import INPUT_SCHEMA
+from data import file_checksum, load_dataset
+from similarity import SimilarityIndex
+from svr_approx import fit_svr_approximation
+from jobs import JobManager
+from prediction_log import PREDICTION_LOG_PATH, PredictionLog
+from result_cache import RESULT_CACHE_MAX_ROWS, RESULT_CACHE_PATH, ResultCache, cache_key
+from drift import DriftMonitor
+from domain import DOMAIN_CHECKS, ApplicabilityDomain
+from charts import ChartRejected, ChartService
+from distill import DISTILLED_MODEL
+from evaluation import FALLBACK_DEFAULT_MODEL, ModelEvaluation
+from serving import ServingState
+from retraining import LOAD_SCHEMA, RETRAIN_DIR, Retrainer, current_model_files
+from uncertainty import (
+    PILOT_SAMPLES, UNCERTAINTY_BUDGET_MS, UNCERTAINTY_MAX_BUDGET_MS, UNCERTAINTY_MAX_SAMPLES, UNCERTAINTY_SAMPLES,
+    affordable_samples, draw_inputs, draw_parameters, parse_parameter_distributions, parse_percentiles,
+    parse_tolerances, propagate, summarize
+)
+from admission import AdmissionController
+from metrics import registry
+from structured_logging import get_logger, log_event, setup_logging
+from latency import ModelLatencyTracker, rank_candidates
+from formats import columnar_response, compress_response, negotiate_format, not_acceptable_response, read_ndjson
+from load_profile import LoadProfiles, parse_durations
+from calculations import climate_adjusted_loads, compute_derived_metrics, metrics_to_columns, resolve_parameters
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+setup_logging()
+logger = get_logger("app")
+
+# Priority class per endpoint; anything not listed is "cheap"
+ROUTE_PRIORITIES = {
+    "root": "critical",
+    "health_check": "critical",
+    "metrics": "critical",
+    "predict_batch": "heavy",
+    "predict_stream": "heavy",
+    "submit_job": "heavy",
+    "climate_matrix": "heavy",
+    "uncertainty": "heavy",
+    "load_profile": "heavy",
+    "chart": "heavy",
+    "get_co2_comparison": "heavy"
+}
+
+admission = AdmissionController()
+
+@app.before_request
+def start_request():
+    """Assign a request id and start the request timer"""
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def finish_request(response):
+    """Echo the request id and log the request with its duration"""
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    started = g.get("request_started")
+    if started is not None:
+        log_event(
+            logger, "request.completed", f"{request.method} {request.path} {response.status_code}",
+            status=response.status_code, duration_ms=round((time.perf_counter() - started) * 1000, 3),
+            model=g.get("model_used")
+        )
+    return response
+
+@app.before_request
+def admit_request():
+    """Bounded per-class concurrency; shed with 429/503 instead of queueing forever"""
+    if request.method == "OPTIONS":
+        return None
+    route_class = ROUTE_PRIORITIES.get(request.endpoint, "cheap")
+    pool, rejection = admission.admit(route_class)
+    if rejection is not None:
+        status, reason, retry_after = rejection
+        response = jsonify({
+            "success": False,
+            "error": "Server is busy, retry later",
+            "reason": reason
+        })
+        response.status_code = status
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+    g.admission_pool = pool
+
+@app.teardown_request
+def release_admission(exc):
+    """Give the request's slot back"""
+    pool = g.pop("admission_pool", None)
+    if pool is not None:
+        pool.release()
+
 # Model paths
 MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 
@@ -25,6 +118,9 @@ CLIMATE_DATA_PATH = os.path.join(DATA_DIR, "Updated_CDD_HDD_Energy_CO2.csv")
 # City climate data
 city_data = {}
 
+# Hourly heating and cooling shapes of the cities, fitted to their degree-days
+load_profiles = None
+
 def load_city_data():
     """Load city climate and CO2 data from CSV"""
     try:
@@ -38,22 +134,93 @@ def load_city_data():
                 'energy_consumption': row['Energy Consumption (million kWh)'],
                 'number_of_houses': row['Number of houses'] if row['Number of houses'] > 0 else 1  # Avoid division by zero
             }
-        print(f"Loaded climate data for {len(city_data)} cities")
+        global load_profiles
+        load_profiles = LoadProfiles.from_city_data(city_data)
+        log_event(logger, "climate.loaded", f"Loaded climate data for {len(city_data)} cities", cities=len(city_data))
         return True
     except Exception as e:
-        print(f"Error loading climate data: {e}")
+        log_event(logger, "climate.load_failed", f"Error loading climate data: {e}", level=logging.ERROR)
         return False
 
-# Load models
-models = {}
+# Reference city for each region, used for CO2 comparisons
+REGION_REFERENCE_CITIES = {
+    "Northern": "Hanoi (Northern)",
+    "Central": "Da Nang (Central)",
+    "Southern": "Ho Chi Minh City (Southern)"
+}
+
+# Degree-day baselines the load predictions are normalized to (same as the React modules)
+BASELINE_HDD = 800.0
+BASELINE_CDD = 1000.0
+
+def resolve_region(city):
+    """
+    Determine the region and reference city from a city name
+    
+    Args:
+        city: City name such as "Hue (Central)"
+        
+    Returns:
+        tuple: (region, reference_city), both None if the region is unknown
+    """
+    for region, reference_city in REGION_REFERENCE_CITIES.items():
+        if f"({region})" in city:
+            return region, reference_city
+    return None, None
+
+def average_co2_per_house(reference_city):
+    """Average CO2 per house in kg/year for a city in city_data"""
+    ref_city_data = city_data[reference_city]
+    if ref_city_data['number_of_houses'] > 0:
+        # Convert tonnes to kg (× 1000)
+        return (ref_city_data['co2_emission'] * 1000) / ref_city_data['number_of_houses']
+    return 0
+
+# Rolling per-model latency and circuit breakers for deadline-bound requests
+latency_tracker = ModelLatencyTracker()
+
+# Deadline-bound predictions run here so the request thread can stop waiting
+PREDICTION_THREADS = int(os.environ.get("PREDICTION_THREADS", 4))
+PREDICTION_EXECUTOR = ThreadPoolExecutor(max_workers=PREDICTION_THREADS)
+
+# One slot per executor thread: with every thread busy, deadline-bound requests
+# degrade at once instead of queueing behind calls that may already be abandoned
+prediction_slots = threading.BoundedSemaphore(PREDICTION_THREADS)
+
+# Records per model call on /api/predict/stream
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 256))
+
+# Models, SVM approximations, version and leaderboard being served, replaced as a whole
+# when models load or a retrained version is published; read it once per request
+serving = ServingState()
+
+# Audit log of predictions, disabled by setting PREDICTION_LOG_PATH to ""
+prediction_log = PredictionLog(PREDICTION_LOG_PATH) if PREDICTION_LOG_PATH else None
+
+# Prediction results and CO2 charts shared by the workers on this host, disabled by setting RESULT_CACHE_PATH to ""
+result_cache = ResultCache(RESULT_CACHE_PATH) if RESULT_CACHE_PATH else None
 
 # Add a global variable to track if models were at least attempted to be loaded
 model_load_attempted = False
 
+# KD-tree over the scaled ENB2012 buildings, built after the models load
+similarity_index = None
+
+# Streaming input histograms compared with ENB2012, built when the models load
+drift_monitor = None
+
+# ENB2012 envelopes that flag extrapolating predictions, built when the models load
+applicability_domain = None
+
+# Batch endpoints answer "SVM" with explicit feature map approximations when enabled
+SVR_FAST_PATH = os.environ.get("SVR_FAST_PATH", "false").lower() in ("1", "true", "yes")
+
 def load_models():
     """Load models following the Streamlit app's approach"""
     global model_load_attempted
     model_load_attempted = True
+    build_drift_monitor()
+    build_applicability_domain()
     
     try:
         # Create models directory if it doesn't exist
@@ -61,24 +228,32 @@ def load_models():
         
         # Check if model files exist
         col_transformer_path = os.path.join(MODEL_DIR, "col_transformer.pkl")
-        heating_path = os.path.join(MODEL_DIR, "heating_AL.pkl")
-        cooling_path = os.path.join(MODEL_DIR, "cooling_AL.pkl")
+        # The latest retrained version once one is published, else the shipped files
+        heating_path, cooling_path, manifest = current_model_files(MODEL_DIR, RETRAIN_DIR)
+        # Optional students written by run.py --distill
+        distilled_path = os.path.join(MODEL_DIR, "distilled.pkl")
+        model_paths = [col_transformer_path, heating_path, cooling_path]
+        if os.path.exists(distilled_path):
+            model_paths.append(distilled_path)
         
         if not (os.path.exists(col_transformer_path) and os.path.exists(heating_path) and os.path.exists(cooling_path)):
-            print("Warning: Some model files are missing. Using fallback calculations.")
+            log_event(logger, "models.missing", "Some model files are missing. Using fallback calculations.", level=logging.WARNING)
             return False
         
         # Load column transformer for preprocessing
         with open(col_transformer_path, "rb") as f:
-            models["transformer"] = pickle.load(f)
+            transformer = pickle.load(f)
+        
+        version = compute_model_version(model_paths)
+        run_id = manifest["run_id"] if manifest else None
         
         # Load heating models
         with open(heating_path, "rb") as f:
-            models["heating"] = pickle.load(f)
+            heating = pickle.load(f)
         
         # Load cooling models
         with open(cooling_path, "rb") as f:
-            models["cooling"] = pickle.load(f)
+            cooling = pickle.load(f)
         
         # Check that the models contain all the expected model types
         model_types = [
@@ -90,56 +265,467 @@ def load_models():
             "K-Nearest Neighbors"
         ]
         
-        if not isinstance(models["heating"], dict) or not isinstance(models["cooling"], dict):
-            print("Warning: Heating or cooling models are not in the expected format. Using fallback calculations.")
+        if not isinstance(heating, dict) or not isinstance(cooling, dict):
+            log_event(logger, "models.invalid", "Heating or cooling models are not in the expected format. Using fallback calculations.", level=logging.WARNING)
             return False
         
+        # Serve the distilled students as one more model
+        if distilled_path in model_paths:
+            attach_distilled(heating, cooling, distilled_path)
+        
         # Print loaded models
-        print(f"Loaded heating models: {list(models['heating'].keys())}")
-        print(f"Loaded cooling models: {list(models['cooling'].keys())}")
+        log_event(
+            logger, "models.loaded", "All models loaded successfully",
+            heating_models=list(heating.keys()),
+            cooling_models=list(cooling.keys()),
+            model_version=version,
+            retraining_run=run_id
+        )
         
-        print("All models loaded successfully")
+        build_training_indexes(transformer)
+        global serving
+        serving = ServingState(
+            transformer, heating, cooling, version, run_id,
+            approximations=build_svr_fast_models(heating, cooling) if SVR_FAST_PATH else None,
+            evaluation=build_model_evaluation(transformer, heating, cooling, version)
+        )
         return True
     except Exception as e:
-        print(f"Error loading models: {e}")
+        log_event(logger, "models.load_failed", f"Error loading models: {e}", level=logging.ERROR)
         return False
 
+def compute_model_version(paths):
+    """Short hash of the contents of the model files"""
+    return hashlib.sha256("".join(file_checksum(path) for path in paths).encode()).hexdigest()[:12]
+
+def attach_distilled(heating_models, cooling_models, distilled_path):
+    """Add the students written by run.py --distill to a pair of model dicts"""
+    with open(distilled_path, "rb") as f:
+        distilled = pickle.load(f)
+    heating_models[DISTILLED_MODEL] = distilled["heating"]
+    cooling_models[DISTILLED_MODEL] = distilled["cooling"]
+
+def publish_models(manifest):
+    """
+    Swap in a model version published by the retrainer
+    
+    Everything is loaded, fitted and ranked on the retrainer's thread first,
+    then one ServingState replaces the served one: requests see the whole
+    new version or the whole old one, never a mix. Approximations not fitted
+    for the new version are dropped with the old state.
+    
+    Args:
+        manifest: Published version from retraining.read_manifest
+        
+    Returns:
+        bool: Whether the version was swapped in
+    """
+    global serving
+    current = serving
+    if manifest["run_id"] == current.run_id or not current.loaded:
+        return False
+    started = time.perf_counter()
+    with open(manifest["heating"], "rb") as f:
+        heating = pickle.load(f)
+    with open(manifest["cooling"], "rb") as f:
+        cooling = pickle.load(f)
+    model_paths = [os.path.join(MODEL_DIR, "col_transformer.pkl"), manifest["heating"], manifest["cooling"]]
+    distilled_path = os.path.join(MODEL_DIR, "distilled.pkl")
+    if os.path.exists(distilled_path):
+        attach_distilled(heating, cooling, distilled_path)
+        model_paths.append(distilled_path)
+    version = compute_model_version(model_paths)
+    approximations = build_svr_fast_models(heating, cooling) if SVR_FAST_PATH else None
+    evaluation = ModelEvaluation.build(current.transformer, heating, cooling, load_dataset(), version, measured=manifest.get("evaluation"))
+    
+    serving = ServingState(current.transformer, heating, cooling, version, manifest["run_id"], approximations, evaluation)
+    log_event(
+        logger, "models.published", f"Swapped in retrained models from run {serving.run_id}",
+        retraining_run=serving.run_id, model_version=version, default_model=evaluation.default_model,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3)
+    )
+    return True
+
+def prediction_source():
+    """(endpoint, request_id) recorded with logged predictions, ("job", None) outside a request"""
+    if has_request_context():
+        return request.path, getattr(g, "request_id", None)
+    return "job", None
+
+def log_predictions(features, heating_loads, cooling_loads, model_name, version, latency_ms, source=None):
+    """Queue a batch of predictions for the prediction log and feed its inputs to the drift monitor"""
+    if drift_monitor is not None:
+        drift_monitor.update(features)
+    if prediction_log is None:
+        return
+    endpoint, request_id = source or prediction_source()
+    prediction_log.record(features, heating_loads, cooling_loads, model_name, version, latency_ms, endpoint, request_id)
+
+def build_drift_monitor():
+    """Precompute the ENB2012 reference histograms for drift monitoring"""
+    global drift_monitor
+    try:
+        drift_monitor = DriftMonitor(load_dataset().features)
+    except Exception as e:
+        drift_monitor = None
+        log_event(logger, "drift.build_failed", f"Could not build the drift monitor: {e}", level=logging.WARNING)
+
+def build_applicability_domain():
+    """Precompute the ENB2012 applicability domain"""
+    global applicability_domain
+    try:
+        applicability_domain = ApplicabilityDomain(load_dataset().features)
+    except Exception as e:
+        applicability_domain = None
+        log_event(logger, "domain.build_failed", f"Could not build the applicability domain: {e}", level=logging.WARNING)
+
+def assess_domain(features):
+    """
+    Applicability-domain assessment of prediction inputs
+    
+    Returns:
+        dict: ApplicabilityDomain.assess arrays, or None when the domain is unavailable
+    """
+    if applicability_domain is None:
+        return None
+    return applicability_domain.assess(features)
+
+def build_training_indexes(transformer):
+    """Build the lookups over ENB2012 that depend on the loaded transformer"""
+    global similarity_index
+    try:
+        started = time.perf_counter()
+        similarity_index = SimilarityIndex(transformer, load_dataset())
+        log_event(
+            logger, "similarity.built", f"Built similarity index over {len(similarity_index)} buildings",
+            rows=len(similarity_index), duration_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
+    except Exception as e:
+        similarity_index = None
+        log_event(logger, "similarity.build_failed", f"Could not build similarity index: {e}", level=logging.WARNING)
+
+def build_model_evaluation(transformer, heating, cooling, version):
+    """
+    Rank a model version on held-out ENB2012 and pick its default model
+    
+    Returns:
+        ModelEvaluation: The leaderboard, or None if the models could not be evaluated
+    """
+    try:
+        started = time.perf_counter()
+        evaluation = ModelEvaluation.build(transformer, heating, cooling, load_dataset(), version)
+        log_event(
+            logger, "evaluation.built", f"Default model is {evaluation.default_model}",
+            default_model=evaluation.default_model, cached=evaluation.cached,
+            leaderboard=[entry["model"] for entry in evaluation.leaderboard],
+            duration_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
+        return evaluation
+    except Exception as e:
+        log_event(logger, "evaluation.build_failed", f"Could not evaluate the models: {e}; default model is {FALLBACK_DEFAULT_MODEL}", level=logging.WARNING)
+        return None
+
+def build_svr_fast_models(heating, cooling):
+    """
+    Fit the fast-path approximations of a model version's SVM models
+    
+    Returns:
+        dict: Target ("heating"/"cooling") -> ApproximateSVR, empty if they could not be fitted
+    """
+    try:
+        started = time.perf_counter()
+        approximations = {target: fit_svr_approximation(loaded["SVM"]) for target, loaded in (("heating", heating), ("cooling", cooling))}
+        log_event(
+            logger, "svr_fast.built", "Fitted SVM fast-path approximations",
+            approximation=approximations["heating"].describe(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
+        return approximations
+    except Exception as e:
+        log_event(logger, "svr_fast.build_failed", f"Could not fit SVM fast-path approximations: {e}", level=logging.WARNING)
+        return {}
+
+def svr_fast_path(model_name, state=None):
+    """Whether a batch call of this model should use the SVM approximation of the served (or given) state"""
+    return SVR_FAST_PATH and (state or serving).approximates(model_name)
+
+# Fallback formula: intercept plus one coefficient per input feature, in schema order
+FALLBACK_HEATING = (10.0 + 30.0, np.array([-30.0, 0.01, 0.01, 0.5, 10.0, 1.0]))
+FALLBACK_COOLING = (15.0 + 25.0, np.array([-25.0, 0.015, 0.02, 1.0, 15.0, 1.5]))
+
+def fallback_predict_batch(features, log=True):
+    """
+    Vectorized fallback prediction for a validated feature matrix
+    
+    Args:
+        features: Feature matrix in INPUT_SCHEMA column order
+        log: Record the predictions in the prediction log and drift monitor
+        
+    Returns:
+        tuple: (heating_loads, cooling_loads) arrays
+    """
+    started = time.perf_counter()
+    heating_loads = FALLBACK_HEATING[0] + features @ FALLBACK_HEATING[1]
+    cooling_loads = FALLBACK_COOLING[0] + features @ FALLBACK_COOLING[1]
+    if log:
+        log_predictions(features, heating_loads, cooling_loads, "fallback", None, (time.perf_counter() - started) * 1000)
+    return heating_loads, cooling_loads
+
 def fallback_predict(input_data):
     """Fallback prediction function if models aren't available"""
-    # Extract parameters
-    relative_compactness = input_data.get("relativeCompactness", 0.98)
-    wall_area = input_data.get("wallArea", 294.0)
-    roof_area = input_data.get("roofArea", 110.25)
-    overall_height = input_data.get("overallHeight", 7.0)
-    glazing_area = input_data.get("glazingArea", 0.0)
-    glazing_area_distribution = input_data.get("glazingAreaDistribution", 0)
-    
-    # Simple formula to simulate predictions (not a real model)
-    heating_load = 10 + \
-        (1 - relative_compactness) * 30 + \
-        wall_area * 0.01 + \
-        roof_area * 0.01 + \
-        overall_height * 0.5 + \
-        glazing_area * 10 + \
-        glazing_area_distribution
-        
-    cooling_load = 15 + \
-        (1 - relative_compactness) * 25 + \
-        wall_area * 0.015 + \
-        roof_area * 0.02 + \
-        overall_height + \
-        glazing_area * 15 + \
-        glazing_area_distribution * 1.5
+    # Extract parameters, simple formula to simulate predictions (not a real model)
+    defaults = {
+        "relativeCompactness": 0.98,
+        "wallArea": 294.0,
+        "roofArea": 110.25,
+        "overallHeight": 7.0,
+        "glazingArea": 0.0,
+        "glazingAreaDistribution": 0
+    }
+    features = np.array([[float(input_data.get(field, defaults[field])) for field in INPUT_SCHEMA.fields]])
+    heating_loads, cooling_loads = fallback_predict_batch(features)
     
     return {
-        "heatingLoad": round(heating_load, 2),
-        "coolingLoad": round(cooling_load, 2)
+        "heatingLoad": round(float(heating_loads[0]), 2),
+        "coolingLoad": round(float(cooling_loads[0]), 2)
     }
 
+def models_available():
+    """Check whether the transformer and both model dicts are loaded"""
+    return serving.loaded
+
+def resolve_model_name(model_name):
+    """
+    Resolve a requested model name against the loaded models
+    
+    Args:
+        model_name: Requested model name
+        
+    Returns:
+        str: The requested name if loaded, else the default model, else the first available model, else None
+    """
+    state = serving
+    heating_models, cooling_models, default_model = state.heating, state.cooling, state.default_model
+    if model_name in heating_models and model_name in cooling_models:
+        return model_name
+    
+    available_models = list(heating_models.keys())
+    if not available_models:
+        return None
+    substitute = default_model if default_model in heating_models and default_model in cooling_models else available_models[0]
+    log_event(logger, "prediction.model_substituted", f"Requested model not found. Using {substitute} instead.", level=logging.WARNING, requested_model=model_name, model=substitute)
+    return substitute
+
+def scatter_rows(values, valid):
+    """Place per-valid-row values at their input positions, None for invalid rows"""
+    column = [None] * len(valid)
+    for index, value in zip(np.flatnonzero(valid).tolist(), values):
+        column[index] = value
+    return column
+
+def expand_column(values, valid):
+    """Columnar counterpart of scatter_rows: NaN (or "") where a row was invalid"""
+    values = np.asarray(values)
+    fill = "" if values.dtype.kind == "U" else np.nan
+    column = np.full(len(valid), fill, dtype=values.dtype if values.dtype.kind == "U" else np.float64)
+    column[valid] = values
+    return column
+
+def served_version(model_name, fast=False, state=None):
+    """Version of the served (or given) model files, marked when the SVM approximation answers instead"""
+    state = state or serving
+    if fast and svr_fast_path(model_name, state):
+        return f"{state.version}+approx"
+    return state.version
+
+def result_cache_failed(e):
+    """Count and log a cache error; callers carry on as on a miss"""
+    registry.inc("result_cache_errors_total")
+    log_event(logger, "result_cache.error", f"Result cache unavailable: {e}", level=logging.WARNING)
+
+def cached_predict_loads(features, model_name, fast=False, state=None):
+    """
+    predict_loads through the shared result cache
+    
+    Each building is looked up by its features, the model and the served
+    version; only the misses reach the model, and their results are stored
+    for every worker. Batches over RESULT_CACHE_MAX_ROWS skip the cache,
+    where the lookups would cost more than one vectorized model call.
+    The keys, the model call and the stored entries all use one snapshot of
+    the serving state, so a version published meanwhile is never cached
+    under the old one.
+    
+    Returns:
+        tuple: (heating_loads, cooling_loads) float arrays
+    """
+    state = state or serving
+    if result_cache is None or not 0 < len(features) <= RESULT_CACHE_MAX_ROWS:
+        return predict_loads(features, model_name, fast=fast, state=state)
+    
+    started = time.perf_counter()
+    version = served_version(model_name, fast, state)
+    keys = [cache_key(version, model_name, row.tobytes()) for row in np.ascontiguousarray(features, dtype=np.float64)]
+    try:
+        cached = result_cache.get_many("prediction", keys)
+    except Exception as e:
+        result_cache_failed(e)
+        return predict_loads(features, model_name, fast=fast, state=state)
+    
+    loads = np.array([np.frombuffer(value, dtype=np.float64) if value is not None else (np.nan, np.nan) for value in cached])
+    hits = np.array([value is not None for value in cached])
+    if hits.any():
+        log_predictions(features[hits], loads[hits, 0], loads[hits, 1], model_name, version, (time.perf_counter() - started) * 1000)
+        if has_request_context():
+            g.model_used = model_name
+    
+    misses = np.flatnonzero(~hits)
+    if len(misses):
+        heating_loads, cooling_loads = predict_loads(features[misses], model_name, fast=fast, state=state)
+        loads[misses, 0], loads[misses, 1] = heating_loads, cooling_loads
+        try:
+            # Invalidation follows the model files, so the approximation shares their version
+            result_cache.put_many("prediction", state.version, [(keys[i], loads[i].tobytes()) for i in misses])
+        except Exception as e:
+            result_cache_failed(e)
+    return loads[:, 0], loads[:, 1]
+
+def predict_loads(features, model_name, fast=False, source=None, log=True, state=None):
+    """
+    Predict heating and cooling loads for a validated feature matrix
+    
+    Args:
+        features: Feature matrix in INPUT_SCHEMA column order
+        model_name: Name of a loaded model
+        fast: Use the SVM approximation if svr_fast_path allows it
+        source: (endpoint, request_id) for the prediction log, prediction_source() by default
+        log: Record the predictions in the prediction log and drift monitor; off
+            for synthetic inputs such as Monte Carlo samples
+        state: ServingState to predict with, the served one by default
+        
+    Returns:
+        tuple: (heating_loads, cooling_loads) float arrays
+    """
+    started = time.perf_counter()
+    state = state or serving
+    try:
+        scaled_input = state.transformer.transform(INPUT_SCHEMA.to_frame(features))
+        heating_model, cooling_model = state.heating[model_name], state.cooling[model_name]
+        version = served_version(model_name, fast, state)
+        if fast and svr_fast_path(model_name, state):
+            heating_model, cooling_model = state.approximations["heating"], state.approximations["cooling"]
+        heating_loads = np.asarray(heating_model.predict(scaled_input), dtype=np.float64)
+        cooling_loads = np.asarray(cooling_model.predict(scaled_input), dtype=np.float64)
+    except Exception:
+        latency_tracker.record_failure(model_name)
+        raise
+    elapsed = time.perf_counter() - started
+    latency_tracker.record(model_name, elapsed, len(features))
+    if log:
+        log_predictions(features, heating_loads, cooling_loads, model_name, version, elapsed * 1000, source)
+    if has_request_context():
+        g.model_used = model_name
+    return heating_loads, cooling_loads
+
+def requested_deadline_ms(data):
+    """
+    Read the client's latency budget from the body or the X-Deadline-Ms header
+    
+    Returns:
+        float: Deadline in milliseconds, or None when the client did not send one
+        
+    Raises:
+        ValueError: If the deadline is not a positive number
+    """
+    deadline = data.get("deadlineMs", request.headers.get("X-Deadline-Ms"))
+    if deadline is None:
+        return None
+    try:
+        deadline = float(deadline)
+    except (ValueError, TypeError):
+        raise ValueError("deadlineMs must be a number of milliseconds")
+    if not np.isfinite(deadline) or deadline <= 0:
+        raise ValueError("deadlineMs must be a positive number of milliseconds")
+    return deadline
+
+def predict_within_deadline(features, requested_model, deadline_ms, fast=False):
+    """
+    Predict with the most accurate model expected to meet the deadline
+    
+    Starts from the requested model (or the most accurate one for "auto") and
+    downgrades along the accuracy ranking using each model's rolling latency
+    profile. When every executor thread is busy, or the call has not finished
+    by the deadline, the fallback formula answers. An abandoned call is
+    cancelled if it has not started; one already running counts against the
+    model's circuit breaker once its own run time exceeds the deadline.
+    
+    Args:
+        features: Feature matrix in INPUT_SCHEMA column order
+        requested_model: Requested model name or "auto"
+        deadline_ms: Latency budget in milliseconds
+        fast: Passed on to predict_loads
+        
+    Returns:
+        tuple: (heating_loads, cooling_loads, model_used, selection) where
+            model_used is None if the fallback formula answered
+    """
+    started = time.perf_counter()
+    state = serving
+    accuracy_rank = state.evaluation.accuracy_ranking() if state.evaluation is not None else None
+    candidates = rank_candidates(requested_model, list(state.heating.keys()), accuracy_rank)
+    model_name, estimate_ms, reason = latency_tracker.choose(candidates, len(features), deadline_ms)
+    selection = {
+        "requested_model": requested_model,
+        "deadline_ms": deadline_ms,
+        "estimated_ms": None if estimate_ms is None else round(estimate_ms, 3),
+        "reason": reason,
+        "cut_off": False
+    }
+    
+    if model_name is not None and not prediction_slots.acquire(blocking=False):
+        log_event(logger, "prediction.executor_saturated", f"All {PREDICTION_THREADS} prediction threads are busy, using fallback prediction", level=logging.WARNING, model=model_name, deadline_ms=deadline_ms)
+        selection["reason"] = "prediction executor saturated"
+        model_name = None
+    
+    if model_name is not None:
+        remaining = deadline_ms / 1000 - (time.perf_counter() - started)
+        # Executor threads have no request context, so the log source is taken here
+        source = prediction_source()
+        call = {}
+        
+        def timed_call():
+            call["started"] = time.perf_counter()
+            try:
+                return predict_loads(features, model_name, fast, source, state=state)
+            finally:
+                call["seconds"] = time.perf_counter() - call["started"]
+        
+        def count_overrun(future):
+            # Exceptions were already counted by predict_loads; time spent queued is not the model's
+            if future.exception() is None and call["seconds"] > deadline_ms / 1000:
+                latency_tracker.record_failure(model_name)
+        
+        future = PREDICTION_EXECUTOR.submit(timed_call)
+        future.add_done_callback(lambda _: prediction_slots.release())
+        try:
+            heating_loads, cooling_loads = future.result(timeout=max(remaining, 0.0))
+            latency_tracker.record_success(model_name)
+            selection["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return heating_loads, cooling_loads, model_name, selection
+        except FutureTimeout:
+            if not future.cancel():
+                future.add_done_callback(count_overrun)
+            log_event(logger, "prediction.deadline_exceeded", f"{model_name} exceeded the {deadline_ms} ms deadline, using fallback prediction", level=logging.WARNING, model=model_name, deadline_ms=deadline_ms)
+            selection["reason"] = f"{model_name} exceeded the deadline"
+    
+    selection["cut_off"] = True
+    heating_loads, cooling_loads = fallback_predict_batch(features)
+    selection["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return heating_loads, cooling_loads, None, selection
+
 @app.route("/", methods=["GET"])
 def root():
     """Root endpoint with basic API info"""
-    loaded_status = bool(models and "transformer" in models)
+    loaded_status = models_available()
     
     return jsonify({
         "name": "Energy Efficiency Prediction API",
@@ -152,8 +738,23 @@ def root():
         },
         "endpoints": {
             "/health": "Check API health",
+            "/metrics": "Prometheus metrics",
             "/api/models": "Get available prediction models",
             "/api/predict": "Make predictions",
+            "/api/predict/batch": "Make predictions for a list of buildings",
+            "/api/predict/stream": "Stream NDJSON buildings in, NDJSON predictions out",
+            "/api/jobs": "Submit a background scoring job; poll /api/jobs/<id>, download /api/jobs/<id>/result",
+            "/api/derived-metrics": "Compute HVAC, cost, CO2, solar and rating metrics",
+            "/api/climate-matrix": "Climate-adjusted loads and CO2 for buildings × cities",
+            "/api/uncertainty": "Monte Carlo percentile bands of loads, cost, CO2 and panels under input tolerances",
+            "/api/load-profile": "8760-hour load profiles per city: peak kW, load-duration curve and monthly totals",
+            "/api/similar-buildings": "Most similar ENB2012 buildings with measured loads",
+            "/api/predictions/stats": "Logged prediction counts and load distributions by model, day and glazing",
+            "/api/drift": "Per-feature drift of prediction inputs against ENB2012",
+            "/api/measurements": "Store measured loads of real buildings for retraining",
+            "/api/retraining": "Retraining state; POST to retrain on the next poll",
+            "/api/cache": "Shared result cache usage; DELETE to empty it",
+            "/api/charts/<kind>": "Model comparison, sweep or portfolio chart (model-comparison, sweep, portfolio)",
             "/api/co2-comparison": "Get CO2 comparison data and chart"
         }
     })
@@ -161,7 +762,7 @@ def root():
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    loaded_status = bool(models and "transformer" in models)
+    loaded_status = models_available()
     
     return jsonify({
         "status": "healthy", 
@@ -171,88 +772,106 @@ def health_check():
         "api_version": "1.0.0"
     })
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/api/predict", methods=["POST"])
 def predict():
     """Make predictions using loaded models"""
+    fmt = negotiate_format(request)
+    if fmt is None:
+        return not_acceptable_response()
     try:
         # Get data from request
         data = request.json
         
         # Validate input data
-        is_valid, message = validate_input_data(data)
-        if not is_valid:
+        features, _, errors = INPUT_SCHEMA.validate([data])
+        if errors:
             return jsonify({
                 "success": False,
-                "error": message
+                "error": errors[0]["error"]
             }), 400
+        typed_input = dict(data, **INPUT_SCHEMA.to_records(features)[0])
         
         # If models aren't loaded, use fallback prediction
-        if not models or "transformer" not in models or "heating" not in models or "cooling" not in models:
-            print("Using fallback prediction because models aren't loaded")
-            predictions = fallback_predict(data)
+        if not models_available():
+            log_event(logger, "prediction.fallback", "Using fallback prediction because models aren't loaded", level=logging.WARNING)
+            predictions = fallback_predict(typed_input)
             return jsonify({
                 "success": True,
                 "data": predictions,
                 "note": "Using fallback prediction (models not loaded)"
             })
         
-        # Create DataFrame from input data
-        input_df = pd.DataFrame({
-            "Relative Compactness": [data.get("relativeCompactness", 0.98)],
-            "Wall Area": [data.get("wallArea", 294.0)],
-            "Roof Area": [data.get("roofArea", 110.25)],
-            "Overall Height": [data.get("overallHeight", 7.0)],
-            "Glazing Area": [data.get("glazingArea", 0.0)],
-            "Glazing Area Distribution": [data.get("glazingAreaDistribution", 0)]
-        })
+        try:
+            deadline_ms = requested_deadline_ms(data)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
-        # Preprocess input data
-        scaled_input = models["transformer"].transform(input_df)
-        
-        # Get model name if provided
-        model_name = data.get("model", "Linear Regression")
-        print(f"The choosen model is: {model_name}")
-        # Get heating and cooling models
-        heating_models = models["heating"]
-        cooling_models = models["cooling"]
-        
-        # Check if the requested model exists
-        if model_name not in heating_models or model_name not in cooling_models:
-            # If requested model doesn't exist, use first available model
-            available_models = list(heating_models.keys())
-            if not available_models:
-                print("No models available. Using fallback prediction.")
-                predictions = fallback_predict(data)
+        selection = None
+        if deadline_ms is not None:
+            # Latency-budget mode: the server picks the model
+            heating_loads, cooling_loads, model_name, selection = predict_within_deadline(
+                features, data.get("model", "auto"), deadline_ms
+            )
+        else:
+            # Get model name if provided
+            model_name = data.get("model", serving.default_model)
+            log_event(logger, "prediction.model_chosen", f"The chosen model is: {model_name}", model=model_name)
+            
+            # Check if the requested model exists
+            model_name = resolve_model_name(model_name)
+            if model_name is None:
+                log_event(logger, "prediction.fallback", "No models available. Using fallback prediction.", level=logging.WARNING)
+                predictions = fallback_predict(typed_input)
                 return jsonify({
                     "success": True,
                     "data": predictions,
                     "note": "Using fallback prediction (requested model not found)"
                 })
             
-            model_name = available_models[0]
-            print(f"Requested model not found. Using {model_name} instead.")
-        
-        # Get heating model prediction
-        heating_model = heating_models[model_name]
-        heating_load = float(heating_model.predict(scaled_input)[0])
+            heating_loads, cooling_loads = cached_predict_loads(features, model_name)
+        domain = assess_domain(features)
         
-        # Get cooling model prediction
-        cooling_model = cooling_models[model_name]
-        cooling_load = float(cooling_model.predict(scaled_input)[0])
+        if fmt != "json":
+            columns = {"heatingLoad": heating_loads, "coolingLoad": cooling_loads}
+            if domain is not None:
+                columns.update(extrapolation=domain["extrapolation"], extrapolationScore=domain["score"])
+            metadata = {"model_used": model_name}
+            if selection:
+                metadata["model_selection"] = selection
+            return columnar_response(fmt, columns, metadata)
         
         # Return predictions
-        return jsonify({
+        response = {
             "success": True,
             "data": {
-                "heatingLoad": round(heating_load, 2),
-                "coolingLoad": round(cooling_load, 2)
+                "heatingLoad": round(float(heating_loads[0]), 2),
+                "coolingLoad": round(float(cooling_loads[0]), 2)
             },
-            "input": data,
+            "input": typed_input,
             "model_used": model_name
-        })
+        }
+        if domain is not None:
+            response["data"].update(
+                extrapolation=bool(domain["extrapolation"][0]),
+                extrapolationScore=round(float(domain["score"][0]), 3)
+            )
+            response["applicability"] = {name: round(float(domain[name][0]), 3) for name in DOMAIN_CHECKS}
+        if selection:
+            response["model_selection"] = selection
+            if selection["cut_off"]:
+                response["note"] = "Using fallback prediction (deadline cut-off)"
+        return jsonify(response)
         
     except Exception as e:
-        print(f"Error during prediction: {e}")
+        log_event(logger, "prediction.error", f"Error during prediction: {e}", level=logging.ERROR, exc_info=True)
         # Try fallback prediction on error
         try:
             predictions = fallback_predict(request.json)
@@ -268,10 +887,903 @@ def predict():
                 "fallback_error": str(fallback_error)
             }), 500
 
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    """Make predictions for a list of buildings in one model call"""
+    fmt = negotiate_format(request)
+    if fmt is None:
+        return not_acceptable_response()
+    data = request.json
+    if not isinstance(data, dict) or not isinstance(data.get("buildings"), list):
+        return jsonify({
+            "success": False,
+            "error": "Request body must contain a 'buildings' list"
+        }), 400
+    
+    try:
+        buildings = data["buildings"]
+        features, valid, errors = INPUT_SCHEMA.validate(buildings)
+        
+        deadline_ms = requested_deadline_ms(data)
+        
+        note = None
+        model_name = None
+        selection = None
+        state = serving
+        if len(features) == 0:
+            # Nothing valid to predict; the per-row errors say why
+            heating_loads = cooling_loads = np.empty(0)
+        elif models_available() and deadline_ms is not None:
+            heating_loads, cooling_loads, model_name, selection = predict_within_deadline(
+                features, data.get("model", "auto"), deadline_ms, fast=True
+            )
+            if selection["cut_off"]:
+                note = "Using fallback prediction (deadline cut-off)"
+        else:
+            if models_available():
+                model_name = resolve_model_name(data.get("model", serving.default_model))
+            if model_name is None:
+                note = "Using fallback prediction (models not loaded)"
+                heating_loads, cooling_loads = fallback_predict_batch(features)
+            else:
+                heating_loads, cooling_loads = cached_predict_loads(features, model_name, fast=True, state=state)
+        approximation = state.approximations["heating"].describe() if svr_fast_path(model_name, state) else None
+        domain = assess_domain(features)
+        
+        metrics = None
+        if data.get("derivedMetrics"):
+            # Area follows the apps: wall area + roof area
+            areas = features[:, 1] + features[:, 2]
+            metrics = compute_derived_metrics(heating_loads, cooling_loads, areas, resolve_parameters(data.get("parameters")))
+        
+        if fmt != "json":
+            columns = {
+                "heatingLoad": expand_column(heating_loads, valid),
+                "coolingLoad": expand_column(cooling_loads, valid)
+            }
+            if domain is not None:
+                columns.update(
+                    extrapolation=expand_column(domain["extrapolation"], valid),
+                    extrapolationScore=expand_column(domain["score"], valid)
+                )
+            if metrics is not None:
+                columns.update({name: expand_column(values, valid) for name, values in metrics.items()})
+            metadata = {"model_used": model_name, "errors": errors}
+            if selection:
+                metadata["model_selection"] = selection
+            if approximation:
+                metadata["approximation"] = approximation
+            if note:
+                metadata["note"] = note
+            return compress_response(columnar_response(fmt, columns, metadata), request)
+        
+        # Scatter predictions back to their input positions, None for invalid rows
+        heating_column = scatter_rows(np.round(heating_loads, 2).tolist(), valid)
+        cooling_column = scatter_rows(np.round(cooling_loads, 2).tolist(), valid)
+        results = [
+            None if heating_load is None else {"heatingLoad": heating_load, "coolingLoad": cooling_load}
+            for heating_load, cooling_load in zip(heating_column, cooling_column)
+        ]
+        if domain is not None:
+            flags = scatter_rows(domain["extrapolation"].tolist(), valid)
+            scores = scatter_rows(np.round(domain["score"], 3).tolist(), valid)
+            for result, flag, score in zip(results, flags, scores):
+                if result is not None:
+                    result.update(extrapolation=flag, extrapolationScore=score)
+        
+        response = {
+            "success": True,
+            "data": results,
+            "errors": errors,
+            "model_used": model_name
+        }
+        if metrics is not None:
+            response["derived_metrics"] = {
+                name: scatter_rows(values, valid) for name, values in metrics_to_columns(metrics).items()
+            }
+        if selection:
+            response["model_selection"] = selection
+        if approximation:
+            response["approximation"] = approximation
+        if note:
+            response["note"] = note
+        return compress_response(jsonify(response), request)
+        
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        log_event(logger, "prediction.batch_error", f"Error during batch prediction: {e}", level=logging.ERROR, exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def score_stream_batch(batch, model_name):
+    """
+    Predict one batch of streamed records
+    
+    Args:
+        batch: List of (line_number, record, error) tuples from read_ndjson
+        model_name: Name of a loaded model, or None for the fallback formula
+        
+    Returns:
+        list: One result dict per line, in input order
+    """
+    parsed = [index for index, (_, _, error) in enumerate(batch) if error is None]
+    features, parsed_valid, errors = INPUT_SCHEMA.validate([batch[index][1] for index in parsed])
+    valid = np.zeros(len(batch), dtype=bool)
+    valid[parsed] = parsed_valid
+    row_errors = {
+        index: [{"field": None, "error": error}] for index, (_, _, error) in enumerate(batch) if error is not None
+    }
+    for error in errors:
+        row_errors.setdefault(parsed[error["index"]], []).append({"field": error["field"], "error": error["error"]})
+    
+    heating_loads = cooling_loads = np.empty(0)
+    if len(features):
+        try:
+            if model_name is None:
+                heating_loads, cooling_loads = fallback_predict_batch(features)
+            else:
+                heating_loads, cooling_loads = predict_loads(features, model_name, fast=True)
+        except Exception as e:
+            log_event(logger, "prediction.stream_error", f"Error during streamed prediction: {e}", level=logging.ERROR, exc_info=True)
+            for index in np.flatnonzero(valid).tolist():
+                row_errors[index] = [{"field": None, "error": f"Prediction failed: {e}"}]
+            valid = np.zeros(len(batch), dtype=bool)
+    
+    heating_column = scatter_rows(np.round(heating_loads, 2).tolist(), valid)
+    cooling_column = scatter_rows(np.round(cooling_loads, 2).tolist(), valid)
+    domain = assess_domain(features) if valid.any() else None
+    if domain is not None:
+        flags = scatter_rows(domain["extrapolation"].tolist(), valid)
+        scores = scatter_rows(np.round(domain["score"], 3).tolist(), valid)
+    results = []
+    for index, (line_number, record, _) in enumerate(batch):
+        result = {"line": line_number}
+        if isinstance(record, dict) and "id" in record:
+            result["id"] = record["id"]
+        if valid[index]:
+            result.update(heatingLoad=heating_column[index], coolingLoad=cooling_column[index])
+            if domain is not None:
+                result.update(extrapolation=flags[index], extrapolationScore=scores[index])
+        else:
+            result["errors"] = row_errors[index]
+        results.append(result)
+    return results
+
+@app.route("/api/predict/stream", methods=["POST"])
+def predict_stream():
+    """Predict newline-delimited JSON buildings, streaming NDJSON results as they are produced"""
+    model_name = resolve_model_name(request.args.get("model", serving.default_model)) if models_available() else None
+    
+    def generate():
+        counts = {"records": 0, "predicted": 0, "errors": 0}
+        batch = []
+        
+        def flush():
+            lines = []
+            for result in score_stream_batch(batch, model_name):
+                counts["predicted" if "errors" not in result else "errors"] += 1
+                lines.append(json.dumps(result) + "\n")
+            batch.clear()
+            return "".join(lines)
+        
+        for line in read_ndjson(request.stream):
+            counts["records"] += 1
+            batch.append(line)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield flush()
+        if batch:
+            yield flush()
+        
+        summary = dict(counts, model_used=model_name)
+        if model_name is None:
+            summary["note"] = "Using fallback prediction (models not loaded)"
+        yield json.dumps({"summary": summary}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def score_job_chunk(records, options):
+    """
+    Score one chunk of a background job
+    
+    Args:
+        records: List of input records
+        options: Job options (model, derivedMetrics, parameters)
+        
+    Returns:
+        tuple: (columns, errors) with one value per record in every column,
+            NaN or "" where a record was invalid
+    """
+    features, valid, errors = INPUT_SCHEMA.validate(records)
+    model_name = resolve_model_name(options["model"]) if models_available() else None
+    if len(features) == 0:
+        # Every record is invalid; the chunk still writes its rows with their errors
+        heating_loads = cooling_loads = np.empty(0)
+    elif model_name is None:
+        heating_loads, cooling_loads = fallback_predict_batch(features)
+    else:
+        heating_loads, cooling_loads = predict_loads(features, model_name, fast=True)
+    
+    columns = {
+        "heatingLoad": expand_column(heating_loads, valid),
+        "coolingLoad": expand_column(cooling_loads, valid)
+    }
+    domain = assess_domain(features)
+    if domain is not None:
+        columns.update(
+            extrapolation=expand_column(domain["extrapolation"], valid),
+            extrapolationScore=expand_column(domain["score"], valid)
+        )
+    if options["derivedMetrics"]:
+        areas = features[:, 1] + features[:, 2]
+        metrics = compute_derived_metrics(heating_loads, cooling_loads, areas, options["parameters"])
+        columns.update({name: expand_column(values, valid) for name, values in metrics.items()})
+    return columns, errors
+
+# Background scoring jobs, created on first use
+job_manager = None
+
+def get_job_manager():
+    """The process's job manager, with its worker threads started"""
+    global job_manager
+    if job_manager is None:
+        job_manager = JobManager(score_job_chunk)
+    job_manager.start()
+    return job_manager
+
+def start_job_workers():
+    """Start the job workers at startup so interrupted jobs resume without a new submission"""
+    try:
+        get_job_manager()
+    except Exception as e:
+        log_event(logger, "jobs.start_failed", f"Could not start job workers: {e}", level=logging.WARNING)
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Queue a scoring job for inline buildings or an uploaded CSV/NDJSON file"""
+    upload = request.files.get("file")
+    if upload is not None:
+        fields = request.form
+        try:
+            parameters = json.loads(fields["parameters"]) if fields.get("parameters") else None
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "parameters must be a JSON object"
+            }), 400
+        derived = fields.get("derivedMetrics", "").lower() in ("1", "true", "yes")
+        input_format = fields.get("format") or ("csv" if upload.filename.lower().endswith(".csv") else "ndjson")
+        if input_format not in ("csv", "ndjson"):
+            return jsonify({
+                "success": False,
+                "error": "format must be csv or ndjson"
+            }), 400
+    else:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict) or not isinstance(fields.get("buildings"), list) or not fields["buildings"]:
+            return jsonify({
+                "success": False,
+                "error": "Send a non-empty 'buildings' list or upload a file in the 'file' field"
+            }), 400
+        parameters = fields.get("parameters")
+        derived = bool(fields.get("derivedMetrics"))
+    
+    try:
+        options = {
+            "model": fields.get("model", serving.default_model),
+            "derivedMetrics": derived,
+            "parameters": resolve_parameters(parameters)
+        }
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    manager = get_job_manager()
+    if upload is not None:
+        job_id = manager.submit(options, upload=upload.stream, input_format=input_format)
+    else:
+        job_id = manager.submit(options, records=fields["buildings"])
+    
+    return jsonify(dict(
+        manager.status(job_id),
+        success=True,
+        status_url=f"/api/jobs/{job_id}",
+        result_url=f"/api/jobs/{job_id}/result"
+    )), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Progress of a scoring job"""
+    status = get_job_manager().status(job_id)
+    if status is None:
+        return jsonify({
+            "success": False,
+            "error": "Unknown job"
+        }), 404
+    return jsonify(dict(status, success=True))
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Download a completed job's results as CSV"""
+    manager = get_job_manager()
+    status = manager.status(job_id)
+    if status is None:
+        return jsonify({
+            "success": False,
+            "error": "Unknown job"
+        }), 404
+    if status["status"] != "completed":
+        return jsonify({
+            "success": False,
+            "error": f"Job is {status['status']}",
+            "progress": status["progress"]
+        }), 409
+    return send_file(manager.result_path(job_id), mimetype="text/csv", as_attachment=True, download_name=f"job-{job_id}.csv")
+
+def _as_float_array(data, name):
+    """Read a scalar or list field from the request as a finite, non-negative float array"""
+    try:
+        values = np.asarray(data[name], dtype=np.float64)
+    except KeyError:
+        raise ValueError(f"Missing required field: {name}")
+    except (ValueError, TypeError):
+        raise ValueError(f"Field {name} must be a number or a list of numbers")
+    if values.ndim > 1 or not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError(f"Field {name} must contain finite, non-negative numbers")
+    return values
+
+@app.route("/api/derived-metrics", methods=["POST"])
+def derived_metrics():
+    """Compute HVAC power, cost, CO2, solar panels and rating for arrays of predictions"""
+    fmt = negotiate_format(request)
+    if fmt is None:
+        return not_acceptable_response()
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object"
+        }), 400
+    
+    try:
+        heating_loads = _as_float_array(data, "heatingLoad")
+        cooling_loads = _as_float_array(data, "coolingLoad")
+        if "area" in data:
+            areas = _as_float_array(data, "area")
+        else:
+            areas = _as_float_array(data, "wallArea") + _as_float_array(data, "roofArea")
+        parameters = resolve_parameters(data.get("parameters"))
+        metrics = compute_derived_metrics(heating_loads, cooling_loads, areas, parameters)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    if fmt != "json":
+        columns = {name: np.atleast_1d(values) for name, values in metrics.items()}
+        return compress_response(columnar_response(fmt, columns, {"parameters": parameters}), request)
+    
+    return compress_response(jsonify({
+        "success": True,
+        "data": metrics_to_columns(metrics),
+        "parameters": parameters
+    }), request)
+
+@app.route("/api/uncertainty", methods=["POST"])
+def uncertainty():
+    """Monte Carlo percentile bands of loads, cost, CO2 and panels for one building with tolerances"""
+    started = time.perf_counter()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("building"), dict):
+        return jsonify({
+            "success": False,
+            "error": "Request body must contain a 'building' object"
+        }), 400
+    
+    try:
+        nominal, valid, errors = INPUT_SCHEMA.validate([data["building"]])
+        if errors:
+            raise ValueError("; ".join(error["error"] for error in errors))
+        tolerances = parse_tolerances(data.get("tolerances"))
+        parameters = resolve_parameters(data.get("parameters"))
+        distributions = parse_parameter_distributions(data.get("parameterDistributions"))
+        percentiles = parse_percentiles(data.get("percentiles"))
+        wanted = int(data.get("samples", UNCERTAINTY_SAMPLES))
+        budget_ms = float(data.get("budgetMs", UNCERTAINTY_BUDGET_MS))
+        if not 1 <= wanted <= UNCERTAINTY_MAX_SAMPLES:
+            raise ValueError(f"samples must be between 1 and {UNCERTAINTY_MAX_SAMPLES}")
+        if not 0 < budget_ms <= UNCERTAINTY_MAX_BUDGET_MS:
+            raise ValueError(f"budgetMs must be between 0 and {UNCERTAINTY_MAX_BUDGET_MS:g}")
+        seed = data.get("seed")
+        rng = np.random.default_rng(int(seed) if seed is not None else None)
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    try:
+        # Every sample batch uses the same version, even if a new one is published meanwhile
+        state = serving
+        model_name = resolve_model_name(data.get("model", state.default_model)) if state.loaded else None
+        
+        def predict(features):
+            if model_name is None:
+                return fallback_predict_batch(features, log=False)
+            return predict_loads(features, model_name, fast=True, log=False, state=state)
+        
+        def elapsed_ms():
+            return (time.perf_counter() - started) * 1000
+        
+        # The call's cost comes from the leaderboard timings; without them a pilot batch is timed first
+        blocks = []
+        cost = state.evaluation.call_cost_ms(model_name) if state.evaluation is not None and model_name else None
+        if cost is None:
+            pilot = draw_inputs(nominal[0], tolerances, rng, min(PILOT_SAMPLES, wanted))
+            pilot_started = time.perf_counter()
+            blocks.append((pilot, *predict(pilot)))
+            cost = (0.0, (time.perf_counter() - pilot_started) * 1000 / len(pilot))
+        
+        # However tight the budget, at least a pilot's worth of samples is drawn
+        remaining = wanted - sum(len(block[0]) for block in blocks)
+        count = affordable_samples(budget_ms - elapsed_ms(), cost[0], cost[1], remaining)
+        if not blocks:
+            count = max(count, min(PILOT_SAMPLES, remaining))
+        
+        # One model call for the rest, with the nominal building riding along as row 0
+        main = np.vstack([nominal, draw_inputs(nominal[0], tolerances, rng, count)])
+        main_heating, main_cooling = predict(main)
+        blocks.append((main[1:], main_heating[1:], main_cooling[1:]))
+        features, heating_loads, cooling_loads = (np.concatenate(parts) for parts in zip(*blocks))
+        
+        figures = propagate(features, heating_loads, cooling_loads, draw_parameters(parameters, distributions, rng, len(features)))
+        bands, ratings = summarize(figures, percentiles)
+        nominal_figures = propagate(nominal, main_heating[:1], main_cooling[:1], parameters)
+        domain = assess_domain(features)
+        
+        return jsonify({
+            "success": True,
+            "model_used": model_name,
+            "nominal": {
+                name: (values[0].item() if values.dtype.kind == "U" else round(float(values[0]), 2))
+                for name, values in nominal_figures.items()
+            },
+            "bands": bands,
+            "ratingProbabilities": ratings,
+            "percentiles": percentiles,
+            "extrapolationShare": round(float(domain["extrapolation"].mean()), 4) if domain is not None else None,
+            "samples": len(features),
+            "requestedSamples": wanted,
+            "truncated": len(features) < wanted,
+            "budget_ms": budget_ms,
+            "elapsed_ms": round(elapsed_ms(), 3)
+        })
+    except Exception as e:
+        log_event(logger, "uncertainty.error", f"Error propagating uncertainty: {e}", level=logging.ERROR, exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/api/climate-matrix", methods=["POST"])
+def climate_matrix():
+    """Heating, cooling and CO2 for every building in every city, scaled by degree-days"""
+    fmt = negotiate_format(request)
+    if fmt is None:
+        return not_acceptable_response()
+    if not city_data:
+        load_city_data()
+    if not city_data:
+        return jsonify({
+            "success": False,
+            "error": "Climate data not available"
+        }), 503
+    
+    data = request.json
+    if not isinstance(data, dict) or not isinstance(data.get("buildings"), list):
+        return jsonify({
+            "success": False,
+            "error": "Request body must contain a 'buildings' list"
+        }), 400
+    
+    try:
+        cities = data.get("cities") or sorted(city_data)
+        unknown = [city for city in cities if city not in city_data]
+        if unknown:
+            raise ValueError(f"Unknown cities: {', '.join(map(str, unknown))}")
+        parameters = resolve_parameters(data.get("parameters"))
+        baseline_hdd = float(data.get("baselineHdd", BASELINE_HDD))
+        baseline_cdd = float(data.get("baselineCdd", BASELINE_CDD))
+        if baseline_hdd <= 0 or baseline_cdd <= 0:
+            raise ValueError("Degree-day baselines must be positive")
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    features, valid, errors = INPUT_SCHEMA.validate(data["buildings"])
+    if len(features) == 0:
+        return jsonify({
+            "success": False,
+            "error": "No valid buildings",
+            "errors": errors
+        }), 400
+    
+    try:
+        model_name = resolve_model_name(data.get("model", serving.default_model)) if models_available() else None
+        if model_name is None:
+            heating_loads, cooling_loads = fallback_predict_batch(features)
+        else:
+            heating_loads, cooling_loads = predict_loads(features, model_name, fast=True)
+        state = serving
+        approximation = state.approximations["heating"].describe() if svr_fast_path(model_name, state) else None
+        
+        # Per-city columns
+        hdd = np.array([city_data[city]['hdd'] for city in cities], dtype=np.float64)
+        cdd = np.array([city_data[city]['cdd'] for city in cities], dtype=np.float64)
+        reference_cities = [resolve_region(city)[1] for city in cities]
+        reference_co2 = np.array([
+            average_co2_per_house(ref) if ref in city_data else np.nan for ref in reference_cities
+        ], dtype=np.float64)
+        
+        # N × C matrices in one broadcast
+        heating, cooling = climate_adjusted_loads(heating_loads, cooling_loads, hdd, cdd, baseline_hdd, baseline_cdd)
+        areas = (features[:, 1] + features[:, 2])[:, np.newaxis]
+        co2 = (heating + cooling) * areas * parameters["emissionFactor"]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            co2_ratio = np.where(reference_co2 > 0, co2 / reference_co2, np.nan)
+        ranking = np.argsort(heating + cooling, axis=1, kind='stable')
+        city_names = np.array(cities, dtype=object)
+        
+        if fmt != "json":
+            # Long format: one row per (valid building, city) pair
+            building_index = np.repeat(np.flatnonzero(valid), len(cities))
+            columns = {
+                "building": building_index.astype(np.int64),
+                "city": np.tile(np.array(cities, dtype=str), int(valid.sum())),
+                "heatingLoad": heating.ravel(),
+                "coolingLoad": cooling.ravel(),
+                "co2EmissionKg": co2.ravel(),
+                "co2VsReference": co2_ratio.ravel()
+            }
+            metadata = {"model_used": model_name, "errors": errors, "reference_cities": dict(zip(cities, reference_cities))}
+            if approximation:
+                metadata["approximation"] = approximation
+            return compress_response(columnar_response(fmt, columns, metadata), request)
+        
+        def matrix(values):
+            rows = np.round(values, 2).tolist()
+            # NaN is not valid JSON
+            rows = [[None if value != value else value for value in row] for row in rows]
+            return scatter_rows(rows, valid)
+        
+        response = {
+            "success": True,
+            "cities": cities,
+            "reference_cities": reference_cities,
+            "heating_load": matrix(heating),
+            "cooling_load": matrix(cooling),
+            "co2_emission_kg": matrix(co2),
+            "co2_vs_reference": matrix(co2_ratio),
+            "ranking": scatter_rows(city_names[ranking].tolist(), valid),
+            "errors": errors,
+            "model_used": model_name
+        }
+        if approximation:
+            response["approximation"] = approximation
+        return compress_response(jsonify(response), request)
+        
+    except Exception as e:
+        log_event(logger, "climate.matrix_error", f"Error computing climate matrix: {e}", level=logging.ERROR, exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/api/load-profile", methods=["POST"])
+def load_profile():
+    """Hourly load profiles of buildings in every city: peaks, load-duration curves and monthly totals"""
+    if load_profiles is None:
+        load_city_data()
+    if load_profiles is None:
+        return jsonify({
+            "success": False,
+            "error": "Climate data not available"
+        }), 503
+    
+    data = request.json
+    if not isinstance(data, dict) or not isinstance(data.get("buildings"), list):
+        return jsonify({
+            "success": False,
+            "error": "Request body must contain a 'buildings' list"
+        }), 400
+    
+    try:
+        cities = data.get("cities") or load_profiles.cities
+        columns = load_profiles.indices(cities)
+        durations = parse_durations(data.get("durations"))
+        baseline_hdd = float(data.get("baselineHdd", BASELINE_HDD))
+        baseline_cdd = float(data.get("baselineCdd", BASELINE_CDD))
+        if baseline_hdd <= 0 or baseline_cdd <= 0:
+            raise ValueError("Degree-day baselines must be positive")
+        hourly = bool(data.get("hourly", False))
+        if hourly and len(data["buildings"]) != 1:
+            raise ValueError("hourly profiles are returned for a single building only")
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    features, valid, errors = INPUT_SCHEMA.validate(data["buildings"])
+    if len(features) == 0:
+        return jsonify({
+            "success": False,
+            "error": "No valid buildings",
+            "errors": errors
+        }), 400
+    
+    try:
+        model_name = resolve_model_name(data.get("model", serving.default_model)) if models_available() else None
+        if model_name is None:
+            heating_loads, cooling_loads = fallback_predict_batch(features)
+        else:
+            heating_loads, cooling_loads = predict_loads(features, model_name, fast=True)
+        
+        # Annual kWh of every building in every city, as in the climate matrix
+        hdd = np.array([city_data[city]['hdd'] for city in cities], dtype=np.float64)
+        cdd = np.array([city_data[city]['cdd'] for city in cities], dtype=np.float64)
+        heating, cooling = climate_adjusted_loads(heating_loads, cooling_loads, hdd, cdd, baseline_hdd, baseline_cdd)
+        areas = (features[:, 1] + features[:, 2])[:, np.newaxis]
+        heating_kwh, cooling_kwh = heating * areas, cooling * areas
+        figures = load_profiles.simulate(heating_kwh, cooling_kwh, columns, durations)
+        figures.update(heatingKwh=heating_kwh, coolingKwh=cooling_kwh)
+        rounded = {name: np.round(values, 2).tolist() for name, values in figures.items()}
+        
+        profiles = [
+            {city: {name: values[row][column] for name, values in rounded.items()} for column, city in enumerate(cities)}
+            for row in range(len(features))
+        ]
+        with np.errstate(divide='ignore'):
+            heating_hours = 1 / load_profiles.heating_sorted[columns, 0]
+            cooling_hours = 1 / load_profiles.cooling_sorted[columns, 0]
+        response = {
+            "success": True,
+            "cities": cities,
+            "climate": {
+                city: {
+                    "meanTemperatureC": round(float(load_profiles.mean[column]), 2),
+                    "seasonalAmplitudeC": round(float(load_profiles.seasonal_amplitude[column]), 2),
+                    # Annual energy over peak power, the figure the fixed 1000 hours stood in for
+                    "heatingFullLoadHours": round(float(heating_hours[index]), 1) if np.isfinite(heating_hours[index]) else None,
+                    "coolingFullLoadHours": round(float(cooling_hours[index]), 1) if np.isfinite(cooling_hours[index]) else None
+                }
+                for index, (column, city) in enumerate(zip(columns.tolist(), cities))
+            },
+            "durations": durations,
+            "profiles": scatter_rows(profiles, valid),
+            "errors": errors,
+            "model_used": model_name
+        }
+        if hourly and len(features):
+            heating_kw, cooling_kw = load_profiles.hourly(heating_kwh, cooling_kwh, columns)
+            response["hourly"] = {
+                city: {"heatingKw": np.round(heating_kw[0, column], 3).tolist(), "coolingKw": np.round(cooling_kw[0, column], 3).tolist()}
+                for column, city in enumerate(cities)
+            }
+        return compress_response(jsonify(response), request)
+        
+    except Exception as e:
+        log_event(logger, "load_profile.error", f"Error simulating load profiles: {e}", level=logging.ERROR, exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route("/api/similar-buildings", methods=["POST"])
+def similar_buildings():
+    """Return the k most similar ENB2012 buildings for one or more designs"""
+    if similarity_index is None:
+        return jsonify({
+            "success": False,
+            "error": "Similarity index not available"
+        }), 503
+    
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object"
+        }), 400
+    
+    # Either a "buildings" list or a single building at the top level
+    batch = isinstance(data.get("buildings"), list)
+    buildings = data["buildings"] if batch else [data]
+    try:
+        k = int(data.get("k", 5))
+        if not 1 <= k <= 50:
+            raise ValueError
+    except (ValueError, TypeError):
+        return jsonify({
+            "success": False,
+            "error": "k must be an integer between 1 and 50"
+        }), 400
+    
+    features, valid, errors = INPUT_SCHEMA.validate(buildings)
+    if not batch and errors:
+        return jsonify({
+            "success": False,
+            "error": errors[0]["error"]
+        }), 400
+    if len(features) == 0:
+        return jsonify({
+            "success": False,
+            "error": "No valid buildings",
+            "errors": errors
+        }), 400
+    
+    distances, indices, query_ms = similarity_index.query(features, k)
+    matches = scatter_rows(similarity_index.matches(distances, indices), valid)
+    
+    response = {
+        "success": True,
+        "data": matches if batch else matches[0],
+        "query_ms": round(query_ms, 4)
+    }
+    if batch:
+        response["errors"] = errors
+    return jsonify(response)
+
+@app.route("/api/drift", methods=["GET"])
+def input_drift():
+    """Per-feature drift scores of recent prediction inputs against ENB2012"""
+    if drift_monitor is None:
+        return jsonify({
+            "success": False,
+            "error": "Drift monitor is not available"
+        }), 503
+    
+    return jsonify(dict(drift_monitor.report(), success=True))
+
+@app.route("/api/predictions/stats", methods=["GET"])
+def prediction_stats():
+    """Aggregate the prediction log by model, version, day and glazing bucket"""
+    if prediction_log is None:
+        return jsonify({
+            "success": False,
+            "error": "Prediction log is disabled"
+        }), 503
+    
+    group_by = [name.strip() for name in request.args.get("group_by", "model,day").split(",") if name.strip()]
+    try:
+        groups = prediction_log.stats(
+            group_by=group_by,
+            model=request.args.get("model"),
+            since=request.args.get("since"),
+            until=request.args.get("until"),
+            bin_width=float(request.args.get("bin_width", 5))
+        )
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    return jsonify({
+        "success": True,
+        "group_by": group_by,
+        "groups": groups,
+        "dropped": prediction_log.dropped
+    })
+
+# Field measurement store and background retrainer, created on first use; None when RETRAIN_DIR is ""
+retrainer = None
+
+def get_retrainer():
+    """The process's retrainer with its poll thread started, or None when retraining is disabled"""
+    global retrainer
+    if retrainer is None and RETRAIN_DIR:
+        retrainer = Retrainer(publish_models, RETRAIN_DIR, MODEL_DIR)
+    if retrainer is not None:
+        retrainer.start()
+    return retrainer
+
+def start_retrainer():
+    """Start polling for published versions and due training runs at startup"""
+    try:
+        get_retrainer()
+    except Exception as e:
+        log_event(logger, "retraining.start_failed", f"Could not start the retrainer: {e}", level=logging.WARNING)
+
+def retraining_disabled_response():
+    return jsonify({
+        "success": False,
+        "error": "Retraining is disabled"
+    }), 503
+
+@app.route("/api/measurements", methods=["POST"])
+def ingest_measurements():
+    """Store measured heating and cooling loads of real buildings for retraining"""
+    data = request.get_json(silent=True)
+    records = data.get("measurements", [data]) if isinstance(data, dict) else None
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            "success": False,
+            "error": "Send one measurement or a non-empty 'measurements' list"
+        }), 400
+    service = get_retrainer()
+    if service is None:
+        return retraining_disabled_response()
+    
+    features, valid, errors = INPUT_SCHEMA.validate(records)
+    loads, loads_valid, load_errors = LOAD_SCHEMA.validate(records)
+    errors = sorted(errors + [error for error in load_errors if error["field"] is not None], key=lambda error: error["index"])
+    stored = valid & loads_valid
+    if not stored.any():
+        return jsonify({
+            "success": False,
+            "error": "No valid measurements",
+            "errors": errors
+        }), 400
+    
+    # Each validated matrix holds its own valid rows; keep the ones valid in both
+    features, loads = features[stored[valid]], loads[stored[loads_valid]]
+    service.ingest(features, loads[:, 0], loads[:, 1], source=data.get("source") if isinstance(data.get("source"), str) else None)
+    return jsonify({
+        "success": True,
+        "stored": int(stored.sum()),
+        "errors": errors,
+        "pending": service.store.pending()
+    }), 201
+
+@app.route("/api/retraining", methods=["GET", "POST"])
+def retraining_status():
+    """Retraining state (GET), or start a training run on the next poll (POST)"""
+    service = get_retrainer()
+    if service is None:
+        return retraining_disabled_response()
+    if request.method == "POST":
+        service.trigger()
+        return jsonify({
+            "success": True,
+            "triggered": True,
+            "pending": service.store.pending()
+        }), 202
+    
+    state = serving
+    return jsonify(dict(
+        service.status(),
+        success=True,
+        serving={"model_version": state.version, "run_id": state.run_id}
+    ))
+
+@app.route("/api/cache", methods=["GET", "DELETE"])
+def result_cache_status():
+    """Shared result cache usage (GET), or empty it for every worker (DELETE)"""
+    if result_cache is None:
+        return jsonify({
+            "success": False,
+            "error": "Result cache is disabled (RESULT_CACHE_PATH is empty)"
+        }), 503
+    if request.method == "DELETE":
+        result_cache.clear()
+        return jsonify({"success": True, "cleared": True})
+    return jsonify(dict(result_cache.stats(), success=True, model_version=serving.version, chart_version=CHART_VERSION))
+
 @app.route("/api/models", methods=["GET"])
 def get_available_models():
     """Return a list of available models"""
-    if not models or "heating" not in models or not models["heating"]:
+    state = serving
+    if not state.heating:
         return jsonify({
             "success": False,
             "error": "Models not loaded",
@@ -285,11 +1797,219 @@ def get_available_models():
             ]
         })
     
-    available_models = list(models["heating"].keys())
+    available_models = list(state.heating.keys())
+    
+    return jsonify({
+        "success": True,
+        "models": available_models,
+        "model_version": state.version,
+        "default_model": state.default_model,
+        "evaluation": state.evaluation.to_dict() if state.evaluation is not None else None,
+        "latency": latency_tracker.snapshot(),
+        "svr_fast_path": state.approximations["heating"].describe() if svr_fast_path("SVM", state) else None,
+        "distilled": state.heating[DISTILLED_MODEL].describe() if DISTILLED_MODEL in state.heating else None
+    })
+
+# Pooled chart renderers, created on first use
+chart_service = None
+
+def get_chart_service():
+    """The process's chart service, with its renderers started"""
+    global chart_service
+    if chart_service is None:
+        chart_service = ChartService()
+    return chart_service.start()
+
+def start_chart_renderers():
+    """Spawn and warm up the chart renderers at startup instead of on the first chart"""
+    try:
+        get_chart_service()
+    except Exception as e:
+        log_event(logger, "charts.start_failed", f"Could not start chart renderers: {e}", level=logging.WARNING)
+
+# Checksum of the chart code, so cached charts are rendered again when it changes
+CHART_VERSION = file_checksum(os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts.py"))[:16]
+
+def render_cached_chart(kind, payload):
+    """
+    Chart PNG from the shared result cache, rendered and stored on a miss
+    
+    Raises:
+        ChartRejected: If the chart service sheds the render
+    """
+    if result_cache is None:
+        return get_chart_service().render(kind, payload)
+    key = cache_key(CHART_VERSION, kind, json.dumps(payload, sort_keys=True))
+    try:
+        png = result_cache.get("chart", key)
+    except Exception as e:
+        result_cache_failed(e)
+        return get_chart_service().render(kind, payload)
+    if png is not None:
+        return png
+    png = get_chart_service().render(kind, payload)
+    try:
+        result_cache.put("chart", CHART_VERSION, key, png)
+    except Exception as e:
+        result_cache_failed(e)
+    return png
+
+def wants_png_response():
+    """Raw PNG instead of base64 JSON when asked for with ?format=png or the Accept header"""
+    return request.args.get("format") == "png" or (
+        request.accept_mimetypes.best_match(["application/json", "image/png"]) == "image/png"
+    )
+
+def chart_rejected_response(rejection):
+    """429/503 with Retry-After for a chart the renderers could not take"""
+    response = jsonify({
+        "success": False,
+        "error": "Chart renderers are busy, retry later",
+        "reason": rejection.reason
+    })
+    response.status_code = rejection.status
+    response.headers["Retry-After"] = str(rejection.retry_after)
+    return response
+
+# Points in a sweep when only a range is given, and the most a sweep may have
+DEFAULT_SWEEP_STEPS = 20
+MAX_SWEEP_POINTS = int(os.environ.get("CHART_MAX_SWEEP_POINTS", 200))
+
+# Histogram bins of a portfolio chart when none are given, and the most it may have
+DEFAULT_PORTFOLIO_BINS = 20
+MAX_PORTFOLIO_BINS = int(os.environ.get("CHART_MAX_BINS", 100))
+
+def model_comparison_spec(data):
+    """Predictions of every loaded model for one building"""
+    features, _, errors = INPUT_SCHEMA.validate([data.get("building")])
+    if errors:
+        raise ValueError(errors[0]["error"])
+    state = serving
+    names = list(state.heating.keys())
+    # Chart inputs are what-if queries, not served predictions: kept out of the log and drift monitor
+    loads = [predict_loads(features, name, log=False, state=state) for name in names]
+    return {
+        "models": names,
+        "heating": [float(heating[0]) for heating, _ in loads],
+        "cooling": [float(cooling[0]) for _, cooling in loads]
+    }
+
+def sweep_spec(data):
+    """Predictions for one building with one feature varied over values or a range"""
+    feature = data.get("feature")
+    if feature not in INPUT_SCHEMA.fields:
+        raise ValueError(f"feature must be one of {', '.join(INPUT_SCHEMA.fields)}")
+    if "values" in data:
+        values = np.asarray(data["values"], dtype=np.float64)
+        if values.ndim != 1 or not 1 <= len(values) <= MAX_SWEEP_POINTS:
+            raise ValueError(f"values must be a list of 1 to {MAX_SWEEP_POINTS} numbers")
+    else:
+        index = INPUT_SCHEMA.fields.index(feature)
+        if "range" in data:
+            low, high = data["range"]
+        elif applicability_domain is not None:
+            low, high = applicability_domain.low[index], applicability_domain.high[index]
+        else:
+            raise ValueError("Give the sweep 'values' or a 'range'")
+        steps = int(data.get("steps", DEFAULT_SWEEP_STEPS))
+        if not 2 <= steps <= MAX_SWEEP_POINTS:
+            raise ValueError(f"steps must be between 2 and {MAX_SWEEP_POINTS}")
+        values = np.linspace(float(low), float(high), steps)
+    if INPUT_SCHEMA.integral[INPUT_SCHEMA.fields.index(feature)]:
+        values = np.unique(np.round(values))
+    
+    building = data.get("building")
+    if not isinstance(building, dict):
+        raise ValueError("Request body must contain a 'building' object")
+    features, _, errors = INPUT_SCHEMA.validate([dict(building, **{feature: value}) for value in values.tolist()])
+    if errors:
+        raise ValueError(errors[0]["error"])
+    model_name = resolve_model_name(data.get("model", serving.default_model))
+    heating_loads, cooling_loads = predict_loads(features, model_name, fast=True, log=False)
+    return {
+        "feature": feature,
+        "model": model_name,
+        "x": values.tolist(),
+        "heating": heating_loads.tolist(),
+        "cooling": cooling_loads.tolist()
+    }
+
+def portfolio_spec(data):
+    """Predicted loads of a list of buildings"""
+    buildings = data.get("buildings")
+    if not isinstance(buildings, list):
+        raise ValueError("Request body must contain a 'buildings' list")
+    bins = int(data.get("bins", DEFAULT_PORTFOLIO_BINS))
+    if not 1 <= bins <= MAX_PORTFOLIO_BINS:
+        raise ValueError(f"bins must be between 1 and {MAX_PORTFOLIO_BINS}")
+    features, _, errors = INPUT_SCHEMA.validate(buildings)
+    if not len(features):
+        raise ValueError("No valid buildings")
+    model_name = resolve_model_name(data.get("model", serving.default_model))
+    heating_loads, cooling_loads = predict_loads(features, model_name, fast=True, log=False)
+    return {
+        "model": model_name,
+        "bins": bins,
+        "heating": heating_loads.tolist(),
+        "cooling": cooling_loads.tolist(),
+        "errors": errors
+    }
+
+# Chart kind -> function building its spec from the request body
+CHART_SPECS = {
+    "model-comparison": ("model_comparison", model_comparison_spec),
+    "sweep": ("sweep", sweep_spec),
+    "portfolio": ("portfolio", portfolio_spec)
+}
+
+@app.route("/api/charts/<kind>", methods=["POST"])
+def chart(kind):
+    """Render a model comparison, sweep or portfolio chart from fresh predictions"""
+    if kind not in CHART_SPECS:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown chart: {kind}; use {', '.join(CHART_SPECS)}"
+        }), 404
+    if not models_available():
+        return jsonify({
+            "success": False,
+            "error": "Models not loaded"
+        }), 503
+    
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object"
+        }), 400
     
+    renderer, build_spec = CHART_SPECS[kind]
+    try:
+        spec = build_spec(data)
+        errors = spec.pop("errors", [])
+        png = get_chart_service().render(renderer, spec)
+    except ChartRejected as e:
+        return chart_rejected_response(e)
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        log_event(logger, "charts.error", f"Error rendering {kind} chart: {e}", level=logging.ERROR, exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+    
+    if wants_png_response():
+        return send_file(io.BytesIO(png), mimetype='image/png')
     return jsonify({
         "success": True,
-        "models": available_models
+        "chart": kind,
+        "data": spec,
+        "errors": errors,
+        "chart_image": base64.b64encode(png).decode('utf-8')
     })
 
 @app.route("/api/co2-comparison", methods=["POST"])
@@ -303,6 +2023,8 @@ def get_co2_comparison():
         # Get data from request
         data = request.json
         
+        wants_png = wants_png_response()
+        
         # Extract parameters
         city = data.get("city", "")
         building_co2 = data.get("buildingCO2", 0)  # CO2 from the building in kg
@@ -314,17 +2036,8 @@ def get_co2_comparison():
             }), 400
         
         # Extract region from city name
-        region = None
-        if "(Northern)" in city:
-            region = "Northern"
-            reference_city = "Hanoi (Northern)"
-        elif "(Central)" in city:
-            region = "Central"
-            reference_city = "Da Nang (Central)"
-        elif "(Southern)" in city:
-            region = "Southern"
-            reference_city = "Ho Chi Minh City (Southern)"
-        else:
+        region, reference_city = resolve_region(city)
+        if region is None:
             return jsonify({
                 "success": False,
                 "error": f"Could not determine region for city: {city}"
@@ -338,58 +2051,37 @@ def get_co2_comparison():
             }), 404
         
         # Calculate average CO2 per house in the reference city
-        ref_city_data = city_data[reference_city]
-        avg_co2_per_house = 0
-        
-        if ref_city_data['number_of_houses'] > 0:
-            # Convert tonnes to kg (× 1000)
-            avg_co2_per_house = (ref_city_data['co2_emission'] * 1000) / ref_city_data['number_of_houses']
+        avg_co2_per_house = average_co2_per_house(reference_city)
         
-        # Generate comparison chart - ensure we create and close the figure
-        plt.figure(figsize=(10, 6))
+        # Generate comparison chart in a renderer process, unless a worker already has
         try:
-            # Data for the bar chart
-            labels = ['Your Building', f'Average {reference_city}']
-            values = [building_co2, avg_co2_per_house]
-            colors = ['#1a73e8', '#66bb6a']
-            
-            # Create the bar chart
-            bars = plt.bar(labels, values, color=colors, width=0.5)
-            
-            # Add values on top of bars
-            for bar in bars:
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                        f'{int(height):,}', ha='center', va='bottom', fontsize=12)
-            
-            plt.title(f'CO₂ Emissions Comparison (kg/year)', fontsize=16)
-            plt.ylabel('CO₂ Emissions (kg/year)', fontsize=12)
-            plt.ylim(0, max(values) * 1.2)  # Add 20% space above the highest bar
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # Save the plot to a bytes buffer
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', bbox_inches='tight')
-            buffer.seek(0)
-            
-            # Encode the image to base64
-            img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            # Return the data and image
-            return jsonify({
-                "success": True,
-                "region": region,
-                "reference_city": reference_city,
-                "building_co2": building_co2,
-                "avg_co2_per_house": avg_co2_per_house,
-                "chart_image": img_str
+            png = render_cached_chart("co2_comparison", {
+                "labels": ['Your Building', f'Average {reference_city}'],
+                "values": [building_co2, avg_co2_per_house]
             })
-        finally:
-            # Always make sure to close the figure to prevent memory leaks
-            plt.close()
+        except ChartRejected as e:
+            return chart_rejected_response(e)
+        
+        if wants_png:
+            # Raw image, the comparison figures travel in headers
+            response = send_file(io.BytesIO(png), mimetype='image/png')
+            response.headers["X-Region"] = region
+            response.headers["X-Reference-City"] = reference_city
+            response.headers["X-Avg-CO2-Per-House"] = str(avg_co2_per_house)
+            return response
+        
+        # Return the data and the base64-encoded image
+        return jsonify({
+            "success": True,
+            "region": region,
+            "reference_city": reference_city,
+            "building_co2": building_co2,
+            "avg_co2_per_house": avg_co2_per_house,
+            "chart_image": base64.b64encode(png).decode('utf-8')
+        })
         
     except Exception as e:
-        print(f"Error generating CO2 comparison: {e}")
+        log_event(logger, "co2.chart_error", f"Error generating CO2 comparison: {e}", level=logging.ERROR, exc_info=True)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -400,13 +2092,17 @@ if __name__ == "__main__":
     loaded = load_models()
     
     if not loaded:
-        print("Warning: Models could not be loaded. Using fallback calculations.")
+        log_event(logger, "models.unavailable", "Models could not be loaded. Using fallback calculations.", level=logging.WARNING)
+    
+    start_job_workers()
+    start_chart_renderers()
+    start_retrainer()
     
     # Load city climate data
     loaded_climate = load_city_data()
     
     if not loaded_climate:
-        print("Warning: Climate data could not be loaded.")
+        log_event(logger, "climate.unavailable", "Climate data could not be loaded.", level=logging.WARNING)
     
     # Run the Flask app
     port = int(os.environ.get("PORT", 5000))
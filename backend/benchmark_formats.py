@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark response formats of the batch prediction endpoint.
+
+Posts the same batch to /api/predict/batch once per format (and with
+compression) through the Flask test client and reports median request time
+and body size relative to plain JSON.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app import app, load_models
+from formats import available_formats
+
+def make_buildings(n, seed=0):
+    """Random buildings inside the ENB2012 ranges"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "relativeCompactness": round(float(rc), 2),
+            "wallArea": round(float(wall), 1),
+            "roofArea": round(float(roof), 2),
+            "overallHeight": float(height),
+            "glazingArea": float(glazing),
+            "glazingAreaDistribution": int(distribution)
+        }
+        for rc, wall, roof, height, glazing, distribution in zip(
+            rng.uniform(0.62, 0.98, n),
+            rng.uniform(245.0, 416.5, n),
+            rng.uniform(110.25, 220.5, n),
+            rng.choice([3.5, 7.0], n),
+            rng.choice([0.0, 0.1, 0.25, 0.4], n),
+            rng.integers(0, 6, n)
+        )
+    ]
+
+def time_request(client, body, query, headers, repeats):
+    """Median wall time in ms and body size in bytes of one request"""
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.post(f"/api/predict/batch{query}", data=body, content_type="application/json", headers=headers)
+        size = len(response.get_data())
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch response formats")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="Batch sizes")
+    parser.add_argument("--model", default="Linear Regression", help="Model to predict with")
+    parser.add_argument("--repeats", type=int, default=5, help="Requests per measurement")
+    args = parser.parse_args()
+
+    load_models()
+    client = app.test_client()
+
+    for rows in args.rows:
+        body = json.dumps({"buildings": make_buildings(rows), "model": args.model, "derivedMetrics": True})
+        print(f"\n{rows} rows (model: {args.model}, with derived metrics)")
+        print(f"{'format':<16}{'encoding':<10}{'time ms':>10}{'bytes':>14}{'vs json time':>15}{'vs json size':>15}")
+        baseline = None
+        for fmt in available_formats():
+            for encoding in ["identity", "gzip", "zstd"]:
+                headers = {"Accept-Encoding": encoding}
+                elapsed, size = time_request(client, body, f"?format={fmt}", headers, args.repeats)
+                if baseline is None:
+                    baseline = (elapsed, size)
+                print(f"{fmt:<16}{encoding:<10}{elapsed:>10.1f}{size:>14,}"
+                      f"{elapsed / baseline[0]:>14.2f}x{size / baseline[1]:>14.2f}x")
+
+if __name__ == "__main__":
+    main()
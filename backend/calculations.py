@@ -0,0 +1,118 @@
+import numpy as np
+
+# Defaults match the formulas used by the Streamlit tabs and React modules
+DEFAULT_PARAMETERS = {
+    "hoursPerYear": 1000.0,      # Full-load hours used for HVAC sizing
+    "pricePerKwh": 3000.0,       # VND/kWh
+    "emissionFactor": 0.5,       # kg CO2/kWh
+    "panelOutput": 350.0,        # kWh/year per solar panel
+    "ratingThresholds": [10.0, 15.0]  # Load limits for ratings A and B
+}
+
+RATING_LABELS = np.array(["A", "B", "C"])
+
+def resolve_parameters(overrides=None):
+    """
+    Merge user supplied parameters over the defaults
+
+    Args:
+        overrides: Optional dict of parameter overrides
+
+    Returns:
+        dict: Complete parameter set
+
+    Raises:
+        ValueError: If a parameter is unknown or not a positive number
+    """
+    parameters = dict(DEFAULT_PARAMETERS)
+    if not overrides:
+        return parameters
+    if not isinstance(overrides, dict):
+        raise ValueError("Parameters must be an object")
+
+    for name, value in overrides.items():
+        if name not in DEFAULT_PARAMETERS:
+            raise ValueError(f"Unknown parameter: {name}")
+        if name == "ratingThresholds":
+            thresholds = np.asarray(value, dtype=np.float64)
+            if thresholds.shape != (2,) or not np.all(np.isfinite(thresholds)) or thresholds[0] > thresholds[1]:
+                raise ValueError("ratingThresholds must be two increasing numbers")
+            parameters[name] = thresholds.tolist()
+            continue
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"Parameter {name} must be a number")
+        if not np.isfinite(value) or value <= 0:
+            raise ValueError(f"Parameter {name} must be a positive number")
+        parameters[name] = value
+
+    return parameters
+
+def compute_derived_metrics(heating_loads, cooling_loads, areas, parameters=None):
+    """
+    Compute every derived metric for arrays of predictions in one pass
+
+    Args:
+        heating_loads: Heating loads in kWh/m²
+        cooling_loads: Cooling loads in kWh/m²
+        areas: Building areas in m² (wall area + roof area in the apps)
+        parameters: Parameter dict from resolve_parameters, defaults if None
+
+    Returns:
+        dict: Arrays keyed by metric name, broadcast to a common shape
+    """
+    if parameters is None:
+        parameters = DEFAULT_PARAMETERS
+    heating_loads, cooling_loads, areas = np.broadcast_arrays(
+        np.asarray(heating_loads, dtype=np.float64),
+        np.asarray(cooling_loads, dtype=np.float64),
+        np.asarray(areas, dtype=np.float64)
+    )
+
+    heating_energy = heating_loads * areas
+    cooling_energy = cooling_loads * areas
+    total_energy = heating_energy + cooling_energy
+
+    # A when both loads are under the first threshold, B under the second, else C
+    peak_load = np.maximum(heating_loads, cooling_loads)
+    thresholds = parameters["ratingThresholds"]
+    rating_index = (peak_load >= thresholds[0]).astype(np.intp) + (peak_load >= thresholds[1])
+
+    return {
+        "heatingPowerKw": heating_energy / parameters["hoursPerYear"],
+        "coolingPowerKw": cooling_energy / parameters["hoursPerYear"],
+        "totalEnergyKwh": total_energy,
+        "annualCost": total_energy * parameters["pricePerKwh"],
+        "co2EmissionKg": total_energy * parameters["emissionFactor"],
+        "requiredPanels": total_energy / parameters["panelOutput"],
+        "rating": RATING_LABELS[rating_index]
+    }
+
+def metrics_to_columns(metrics, decimals=2):
+    """Round numeric metric arrays and convert them to JSON-ready lists"""
+    return {
+        name: (values.tolist() if values.dtype.kind == "U" else np.round(values, decimals).tolist())
+        for name, values in metrics.items()
+    }
+
+def climate_adjusted_loads(heating_loads, cooling_loads, hdd, cdd, baseline_hdd, baseline_cdd):
+    """
+    Scale building loads by each city's degree-days in one broadcast
+
+    Args:
+        heating_loads: N heating loads in kWh/m²
+        cooling_loads: N cooling loads in kWh/m²
+        hdd: C heating degree-days, one per city
+        cdd: C cooling degree-days, one per city
+        baseline_hdd: Heating degree-days the loads are normalized to
+        baseline_cdd: Cooling degree-days the loads are normalized to
+
+    Returns:
+        tuple: (heating, cooling) N × C matrices
+    """
+    heating_factors = np.asarray(hdd, dtype=np.float64) / baseline_hdd
+    cooling_factors = np.asarray(cdd, dtype=np.float64) / baseline_cdd
+    heating = np.asarray(heating_loads, dtype=np.float64)[:, np.newaxis] * heating_factors[np.newaxis, :]
+    cooling = np.asarray(cooling_loads, dtype=np.float64)[:, np.newaxis] * cooling_factors[np.newaxis, :]
+    return heating, cooling
@@ -0,0 +1,253 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from metrics import registry as default_registry
+
+# Renderer processes; 0 renders in the calling thread
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", 2))
+
+# Charts allowed to wait for a renderer on top of the ones being drawn
+CHART_QUEUE = int(os.environ.get("CHART_QUEUE", 8))
+
+# Seconds a request waits for its chart
+CHART_TIMEOUT_SECONDS = float(os.environ.get("CHART_TIMEOUT_SECONDS", 10))
+
+# Charts a renderer draws before it is replaced, bounding matplotlib's memory growth
+CHART_MAX_TASKS = int(os.environ.get("CHART_MAX_TASKS", 500))
+
+# ProcessPoolExecutor replaces its own workers only from Python 3.11; before that the pool is replaced as a whole
+NATIVE_MAX_TASKS = sys.version_info >= (3, 11)
+
+HEATING_COLOR = "#e8711a"
+COOLING_COLOR = "#1a73e8"
+
+def _new_figure(figsize=(10, 6)):
+    """Figure with its own Agg canvas, independent of pyplot's global state"""
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+def _to_png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+def render_co2_comparison(spec):
+    """Bars of the building's CO2 against the reference city's average house"""
+    figure, ax = _new_figure()
+    values = spec["values"]
+    bars = ax.bar(spec["labels"], values, color=["#1a73e8", "#66bb6a"], width=0.5)
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height + 0.1, f"{int(height):,}", ha="center", va="bottom", fontsize=12)
+    ax.set_title("CO₂ Emissions Comparison (kg/year)", fontsize=16)
+    ax.set_ylabel("CO₂ Emissions (kg/year)", fontsize=12)
+    ax.set_ylim(0, max(max(values) * 1.2, 1))  # Add 20% space above the highest bar
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    return _to_png(figure)
+
+def render_model_comparison(spec):
+    """Grouped heating and cooling bars, one group per model"""
+    figure, ax = _new_figure()
+    positions = np.arange(len(spec["models"]))
+    width = 0.38
+    for offset, key, label, color in ((-width / 2, "heating", "Heating", HEATING_COLOR), (width / 2, "cooling", "Cooling", COOLING_COLOR)):
+        bars = ax.bar(positions + offset, spec[key], width, label=label, color=color)
+        ax.bar_label(bars, fmt="%.1f", fontsize=9)
+    ax.set_xticks(positions, spec["models"], rotation=20, ha="right")
+    ax.set_title("Predicted Loads by Model", fontsize=16)
+    ax.set_ylabel("Load (kWh/m²)", fontsize=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.legend()
+    return _to_png(figure)
+
+def render_sweep(spec):
+    """Heating and cooling load curves over one varied feature"""
+    figure, ax = _new_figure()
+    ax.plot(spec["x"], spec["heating"], marker="o", color=HEATING_COLOR, label="Heating")
+    ax.plot(spec["x"], spec["cooling"], marker="o", color=COOLING_COLOR, label="Cooling")
+    ax.set_title(f"Loads vs {spec['feature']} ({spec['model']})", fontsize=16)
+    ax.set_xlabel(spec["feature"], fontsize=12)
+    ax.set_ylabel("Load (kWh/m²)", fontsize=12)
+    ax.grid(linestyle="--", alpha=0.7)
+    ax.legend()
+    return _to_png(figure)
+
+def render_portfolio(spec):
+    """Overlaid heating and cooling load histograms of a set of buildings"""
+    figure, ax = _new_figure()
+    heating, cooling = np.asarray(spec["heating"]), np.asarray(spec["cooling"])
+    edges = np.histogram_bin_edges(np.concatenate([heating, cooling]), bins=spec.get("bins", 20))
+    ax.hist(heating, bins=edges, alpha=0.6, color=HEATING_COLOR, label=f"Heating (mean {heating.mean():.1f})")
+    ax.hist(cooling, bins=edges, alpha=0.6, color=COOLING_COLOR, label=f"Cooling (mean {cooling.mean():.1f})")
+    ax.set_title(f"Load Distribution of {heating.shape[0]} Buildings ({spec['model']})", fontsize=16)
+    ax.set_xlabel("Load (kWh/m²)", fontsize=12)
+    ax.set_ylabel("Buildings", fontsize=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.legend()
+    return _to_png(figure)
+
+# Chart kind -> renderer taking a plain, picklable spec dict
+CHART_RENDERERS = {
+    "co2_comparison": render_co2_comparison,
+    "model_comparison": render_model_comparison,
+    "sweep": render_sweep,
+    "portfolio": render_portfolio
+}
+
+def render_chart(kind, spec):
+    """Render one chart to PNG bytes; runs inside a renderer process"""
+    return CHART_RENDERERS[kind](spec)
+
+def _warm_up():
+    # Pay for font loading and the Agg backend once per renderer, not per request
+    render_chart("co2_comparison", {"labels": ["a", "b"], "values": [1, 2]})
+
+class ChartRejected(Exception):
+    """A chart could not be rendered in time; status and reason go to the client"""
+
+    def __init__(self, status, reason, retry_after=1):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+class ChartService:
+    """
+    Chart rendering in a small pool of pre-warmed processes
+
+    Requests hold one of `workers + queue_size` slots from submission until
+    their chart is done, so a full pool rejects new charts at once (429)
+    instead of queueing behind slow ones, and a request gives up after
+    `timeout` seconds (503). A chart abandoned after its timeout keeps its
+    slot until the renderer finishes it, which bounds the work a stuck
+    renderer can pile up. Renderers are spawned rather than forked, so they
+    never inherit the server's threads or loaded models.
+    """
+
+    def __init__(self, workers=CHART_WORKERS, queue_size=CHART_QUEUE, timeout=CHART_TIMEOUT_SECONDS,
+                 max_tasks=CHART_MAX_TASKS, registry=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.capacity = max(workers, 1) + queue_size
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._submitted = 0
+        self.registry = registry or default_registry
+        self.registry.counter("charts_rendered_total", "Charts rendered by kind")
+        self.registry.counter("charts_rejected_total", "Charts not rendered by reason")
+        self.registry.gauge("charts_in_flight", "Charts being rendered or waiting for a renderer", lambda: {(): self.in_flight})
+
+    def _new_pool(self):
+        options = {"max_tasks_per_child": self.max_tasks} if NATIVE_MAX_TASKS and self.max_tasks > 0 else {}
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up, **options
+        )
+        # The executor starts processes on demand; one no-op per worker starts them all now
+        for _ in range(self.workers):
+            pool.submit(int)
+        self._submitted = 0
+        return pool
+
+    def start(self):
+        """Spawn and warm up the renderers"""
+        with self._lock:
+            if self._pool is None and self.workers > 0:
+                self._pool = self._new_pool()
+        return self
+
+    def _submit(self, kind, spec):
+        retired = None
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+            elif not NATIVE_MAX_TASKS and 0 < self.max_tasks * self.workers <= self._submitted:
+                # The old renderers finish the charts they have and exit; new charts go to fresh ones
+                retired, self._pool = self._pool, self._new_pool()
+            self._submitted += 1
+            pool = self._pool
+        if retired is not None:
+            retired.shutdown(wait=False)
+        return pool.submit(render_chart, kind, spec)
+
+    def stop(self):
+        """Shut the renderers down"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _=None):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _reject(self, status, reason):
+        self.registry.inc("charts_rejected_total", {"reason": reason})
+        return ChartRejected(status, reason, retry_after=max(1, int(self.timeout)))
+
+    def render(self, kind, spec):
+        """
+        Render a chart within the timeout
+
+        Args:
+            kind: Key of CHART_RENDERERS
+            spec: Plain data for the renderer
+
+        Returns:
+            bytes: PNG image
+
+        Raises:
+            ValueError: If the chart kind is unknown
+            ChartRejected: If the pool is full, the chart timed out or a renderer died
+        """
+        if kind not in CHART_RENDERERS:
+            raise ValueError(f"Unknown chart: {kind}")
+        if not self._slots.acquire(blocking=False):
+            raise self._reject(429, "queue_full")
+        with self._lock:
+            self.in_flight += 1
+
+        if self.workers <= 0:
+            try:
+                png = render_chart(kind, spec)
+            finally:
+                self._release()
+            self.registry.inc("charts_rendered_total", {"kind": kind})
+            return png
+
+        try:
+            future = self._submit(kind, spec)
+        except (BrokenProcessPool, RuntimeError):
+            self._release()
+            self._restart()
+            raise self._reject(503, "renderer_failed")
+        future.add_done_callback(self._release)
+        try:
+            png = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise self._reject(503, "timeout")
+        except BrokenProcessPool:
+            self._restart()
+            raise self._reject(503, "renderer_failed")
+        self.registry.inc("charts_rendered_total", {"kind": kind})
+        return png
+
+    def _restart(self):
+        """Replace a pool whose renderer process died"""
+        self.stop()
+        self.start()
@@ -0,0 +1,279 @@
+import io
+import pickle
+import tracemalloc
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.neighbors import KDTree, KNeighborsRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from utils import INPUT_SCHEMA
+
+# Models replaced by compact equivalents; the others are copied unchanged
+COMPACTED_MODELS = ("Random Forest", "Decision Tree", "K-Nearest Neighbors")
+
+# Default RMSE allowed between the pruned and the full forest, in kWh/m²
+DEFAULT_TOLERANCE = 0.05
+
+def _float32_floor(values):
+    """Largest float32 not above each value, so float32 inputs compare as before"""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+class CompactForest:
+    """
+    Regression trees flattened into shared float32 node arrays
+
+    Every tree's nodes sit in the same arrays; leaves point to themselves,
+    so prediction walks all rows through all trees for max_depth vectorized
+    steps without branching. Inputs are compared in float32 like sklearn's
+    trees, and thresholds are rounded down to float32 so splits are unchanged.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self):
+        return self.roots.shape[0]
+
+    @property
+    def node_count(self):
+        return self.feature.shape[0]
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict(self, X):
+        """Mean leaf value over the trees"""
+        return self.value[self.apply(X)].astype(np.float64).mean(axis=1)
+
+def _flatten_tree(tree, offset):
+    """Node arrays of one sklearn tree with identical-leaf subtrees collapsed"""
+    children_left, children_right = tree.children_left, tree.children_right
+    values = tree.value[:, 0, 0].astype(np.float32)
+    features, thresholds, lefts, rights, leaf_values = [], [], [], [], []
+
+    def constant(node):
+        # Leaf value if every leaf under node has the same float32 value
+        if children_left[node] == -1:
+            return values[node]
+        left, right = constant(children_left[node]), constant(children_right[node])
+        return left if left is not None and left == right else None
+
+    def emit(node, depth):
+        index = len(features)
+        features.append(0)
+        thresholds.append(0.0)
+        lefts.append(offset + index)
+        rights.append(offset + index)
+        leaf_values.append(0.0)
+        collapsed = constant(node)
+        if collapsed is not None:
+            leaf_values[index] = collapsed
+            return depth
+        features[index] = tree.feature[node]
+        thresholds[index] = tree.threshold[node]
+        left_depth = emit(children_left[node], depth + 1)
+        lefts[index] = offset + index + 1
+        rights[index] = offset + len(features)
+        return max(left_depth, emit(children_right[node], depth + 1))
+
+    depth = emit(0, 0)
+    return (
+        np.array(features, dtype=np.uint8),
+        _float32_floor(np.array(thresholds, dtype=np.float64)),
+        np.array(lefts, dtype=np.int32),
+        np.array(rights, dtype=np.int32),
+        np.array(leaf_values, dtype=np.float32),
+        depth
+    )
+
+def select_trees(tree_predictions, tolerance=DEFAULT_TOLERANCE, max_trees=None):
+    """
+    Greedily pick the trees whose average best tracks the full forest
+
+    Args:
+        tree_predictions: Array (n_trees, n_samples) of each tree's predictions
+        tolerance: Stop once the RMSE to the full forest is at most this
+        max_trees: Upper bound on the number of trees kept
+
+    Returns:
+        list: Indices of the selected trees in selection order
+    """
+    target = tree_predictions.mean(axis=0)
+    limit = min(max_trees or len(tree_predictions), len(tree_predictions))
+    selected, total = [], np.zeros_like(target)
+    remaining = np.ones(len(tree_predictions), dtype=bool)
+    while len(selected) < limit:
+        candidates = (total + tree_predictions) / (len(selected) + 1)
+        errors = np.sqrt(np.mean((candidates - target) ** 2, axis=1))
+        errors[~remaining] = np.inf
+        best = int(np.argmin(errors))
+        selected.append(best)
+        remaining[best] = False
+        total += tree_predictions[best]
+        if errors[best] <= tolerance:
+            break
+    return selected
+
+def compact_forest(model, reference, tolerance=DEFAULT_TOLERANCE, max_trees=None):
+    """
+    Convert a random forest or decision tree to a CompactForest
+
+    Args:
+        model: Fitted RandomForestRegressor or DecisionTreeRegressor
+        reference: Scaled inputs the pruned forest must track
+        tolerance: RMSE allowed between the pruned and the full forest
+        max_trees: Upper bound on the number of trees kept
+
+    Returns:
+        CompactForest: The compact model
+    """
+    estimators = model.estimators_ if isinstance(model, RandomForestRegressor) else [model]
+    if len(estimators) > 1:
+        reference = np.asarray(reference, dtype=np.float32)
+        tree_predictions = np.array([estimator.predict(reference) for estimator in estimators])
+        estimators = [estimators[index] for index in select_trees(tree_predictions, tolerance, max_trees)]
+
+    parts, roots, offset, max_depth = [], [], 0, 0
+    for estimator in estimators:
+        part = _flatten_tree(estimator.tree_, offset)
+        parts.append(part[:5])
+        roots.append(offset)
+        offset += part[0].shape[0]
+        max_depth = max(max_depth, part[5])
+    arrays = [np.concatenate(column) for column in zip(*parts)]
+    return CompactForest(*arrays, np.array(roots, dtype=np.int32), max_depth)
+
+class CompactKNN:
+    """
+    K-nearest-neighbours regression over deduplicated reference points
+
+    Repeated training points are stored once with their multiplicity and
+    mean target, and the k nearest neighbours are filled from the nearest
+    groups by count, which matches the original model up to tie-breaking.
+    """
+
+    def __init__(self, points, counts, targets, n_neighbors, weights, leaf_size=16):
+        self.points = points
+        self.counts = counts
+        self.targets = targets
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.tree = KDTree(points, leaf_size=leaf_size)
+
+    def predict(self, X):
+        """Predict like KNeighborsRegressor.predict"""
+        X = np.asarray(X, dtype=np.float64)
+        k = min(self.n_neighbors, int(self.counts.sum()))
+        distances, groups = self.tree.query(X, k=min(k, self.points.shape[0]))
+        counts = self.counts[groups]
+        # Neighbours taken from each group: its count, cut off once k are taken
+        taken = np.minimum(counts, np.maximum(k - (np.cumsum(counts, axis=1) - counts), 0))
+        targets = self.targets[groups]
+        if self.weights == "distance":
+            exact = distances == 0
+            with np.errstate(divide="ignore"):
+                weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(np.float64), 1.0 / distances)
+            weights = weights * taken
+        else:
+            weights = taken.astype(np.float64)
+        return (weights * targets).sum(axis=1) / weights.sum(axis=1)
+
+def compact_knn(model):
+    """
+    Convert a KNeighborsRegressor to a CompactKNN with duplicate points merged
+
+    Raises:
+        ValueError: If the model uses a metric other than Euclidean distance
+    """
+    if model.effective_metric_ != "euclidean" or not isinstance(model.weights, str):
+        raise ValueError("Only Euclidean KNN models with uniform or distance weights can be compacted")
+    points, inverse, counts = np.unique(model._fit_X, axis=0, return_inverse=True, return_counts=True)
+    targets = np.bincount(inverse.ravel(), weights=np.asarray(model._y, dtype=np.float64).ravel()) / counts
+    return CompactKNN(points, counts.astype(np.int32), targets, model.n_neighbors, model.weights)
+
+def compact_models(model_dict, reference, tolerance=DEFAULT_TOLERANCE, max_trees=None):
+    """
+    Copy of a model dict with the forest, tree and KNN models compacted
+
+    XGBoost already stores float32 trees in its own format and is copied as is,
+    like every other model.
+    """
+    compacted = dict(model_dict)
+    for name, model in model_dict.items():
+        if isinstance(model, (RandomForestRegressor, DecisionTreeRegressor)):
+            compacted[name] = compact_forest(model, reference, tolerance, max_trees)
+        elif isinstance(model, KNeighborsRegressor):
+            compacted[name] = compact_knn(model)
+    return compacted
+
+def artifact_stats(model):
+    """
+    Pickled size and in-memory footprint of a model
+
+    Returns:
+        tuple: (pickled_bytes, loaded_bytes) where loaded_bytes is what
+            unpickling allocates
+    """
+    buffer = io.BytesIO()
+    pickle.dump(model, buffer)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        loaded = pickle.loads(buffer.getvalue())
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return buffer.tell(), after - before
+
+def compaction_report(transformer, original, compacted, dataset, target):
+    """
+    Size, memory and ENB2012 accuracy of every model before and after compaction
+
+    Args:
+        transformer: Fitted column transformer used by the models
+        original: Model dict as loaded from heating_AL.pkl / cooling_AL.pkl
+        compacted: Result of compact_models
+        dataset: ENB2012 Dataset from data.load_dataset
+        target: "Heating Load" or "Cooling Load"
+
+    Returns:
+        list: One dict per model
+    """
+    scaled = np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(dataset.features)), dtype=np.float64)
+    truth = dataset.column(target)
+    report = []
+    for name, model in original.items():
+        before, after = model.predict(scaled), compacted[name].predict(scaled)
+        size_before, memory_before = artifact_stats(model)
+        size_after, memory_after = artifact_stats(compacted[name])
+        report.append({
+            "model": name,
+            "compacted": compacted[name] is not model,
+            "size_before": size_before,
+            "size_after": size_after,
+            "memory_before": memory_before,
+            "memory_after": memory_after,
+            "rmse_before": float(np.sqrt(np.mean((before - truth) ** 2))),
+            "rmse_after": float(np.sqrt(np.mean((after - truth) ** 2))),
+            "max_abs_diff": float(np.max(np.abs(after - before)))
+        })
+    return report
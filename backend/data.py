@@ -0,0 +1,155 @@
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils import INPUT_SCHEMA
+
+# ENB2012 column codes -> feature names used by the models
+ENB2012_COLUMNS = {
+    "X1": "Relative Compactness",
+    "X2": "Surface Area",
+    "X3": "Wall Area",
+    "X4": "Roof Area",
+    "X5": "Overall Height",
+    "X6": "Orientation",
+    "X7": "Glazing Area",
+    "X8": "Glazing Area Distribution",
+    "Y1": "Heating Load",
+    "Y2": "Cooling Load"
+}
+
+# Columns holding whole numbers in the source file
+INTEGER_COLUMNS = ("Orientation", "Glazing Area Distribution")
+
+TARGET_COLUMNS = ["Heating Load", "Cooling Load"]
+
+# Cache layout: served features first and targets last, so both are slices
+CACHE_COLUMNS = INPUT_SCHEMA.columns + [
+    name for name in ENB2012_COLUMNS.values() if name not in INPUT_SCHEMA.columns and name not in TARGET_COLUMNS
+] + TARGET_COLUMNS
+
+ENB2012_PATH = os.environ.get(
+    "ENB2012_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "data", "ENB2012_data.csv")
+)
+
+ENB2012_CACHE_DIR = os.environ.get(
+    "ENB2012_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+class Dataset:
+    """
+    ENB2012 as one read-only float64 matrix with named columns
+
+    The matrix is memory-mapped from the NPY cache in Fortran order, so every
+    column, the served features and the targets are zero-copy views.
+    """
+
+    def __init__(self, matrix, checksum):
+        self.matrix = matrix
+        self.checksum = checksum
+        self.columns = list(CACHE_COLUMNS)
+        self._index = {name: position for position, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def column(self, name):
+        """Contiguous view of one column"""
+        return self.matrix[:, self._index[name]]
+
+    @property
+    def features(self):
+        """View of the served features, in INPUT_SCHEMA column order"""
+        return self.matrix[:, :len(INPUT_SCHEMA.columns)]
+
+    @property
+    def targets(self):
+        """View of the heating and cooling loads"""
+        return self.matrix[:, -len(TARGET_COLUMNS):]
+
+    def select(self, names):
+        """
+        Columns by name, a view when they are adjacent in the cache and a copy otherwise
+        """
+        positions = [self._index[name] for name in names]
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            return self.matrix[:, positions[0]:positions[0] + len(positions)]
+        return self.matrix[:, positions]
+
+    def frame(self, names=None):
+        """DataFrame of some or all columns, whole-number columns as integers"""
+        names = list(names or ENB2012_COLUMNS.values())
+        df = pd.DataFrame(self.select(names), columns=names)
+        for name in INTEGER_COLUMNS:
+            if name in df:
+                df[name] = df[name].astype(np.int64)
+        return df
+
+def file_checksum(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_cache(source, cache_path):
+    df = pd.read_csv(source).rename(columns=ENB2012_COLUMNS)
+    matrix = np.asfortranarray(df[CACHE_COLUMNS].dropna().to_numpy(dtype=np.float64))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write then rename, so other workers never map a half-written file
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".npy.tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.save(f, matrix, allow_pickle=False)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, cache_path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+_datasets = {}
+_lock = threading.Lock()
+
+def load_dataset(path=ENB2012_PATH, cache_dir=ENB2012_CACHE_DIR):
+    """
+    Load ENB2012 through the NPY cache
+
+    The CSV is parsed once per source checksum; later calls in any process
+    memory-map the cache, and calls in the same process reuse the mapping.
+    Cache files of the same source with other checksums are removed when a
+    new one is written.
+
+    Args:
+        path: Path to ENB2012_data.csv
+        cache_dir: Directory for the cache files
+
+    Returns:
+        Dataset: The cached dataset
+    """
+    checksum = file_checksum(path)
+    key = (os.path.abspath(path), checksum)
+    with _lock:
+        if key in _datasets:
+            return _datasets[key]
+
+        prefix = "enb2012-" + hashlib.sha256(key[0].encode()).hexdigest()[:8]
+        cache_path = os.path.join(cache_dir, f"{prefix}-{checksum[:16]}.npy")
+        if not os.path.exists(cache_path):
+            _write_cache(path, cache_path)
+            for stale in glob.glob(os.path.join(cache_dir, f"{prefix}-*.npy")):
+                if stale != cache_path:
+                    os.unlink(stale)
+
+        dataset = Dataset(np.load(cache_path, mmap_mode="r"), checksum)
+        for old in [old for old in _datasets if old[0] == key[0]]:
+            del _datasets[old]
+        _datasets[key] = dataset
+        return dataset
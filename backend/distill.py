@@ -0,0 +1,157 @@
+import itertools
+import time
+
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures
+from sklearn.tree import DecisionTreeRegressor
+
+from utils import INPUT_SCHEMA
+
+# Name the students are served under, next to the models they were distilled from
+DISTILLED_MODEL = "Distilled"
+
+DEFAULT_TEACHER = "XGBoost"
+
+# Uniform samples drawn on top of the full grid of ENB2012 feature levels
+DEFAULT_SAMPLES = 40000
+
+# Depth of tree students, deep enough to reproduce the teacher on every ENB2012 level
+DEFAULT_DEPTH = 14
+
+# Degree of polynomial students
+DEFAULT_DEGREE = 3
+
+STUDENT_KINDS = ("tree", "polynomial")
+
+class DistilledModel:
+    """
+    Compact student fitted to a teacher model's predictions
+
+    Serves like the teacher (predict on scaled inputs) and carries what it
+    was distilled from for /api/models and reports.
+    """
+
+    def __init__(self, student, teacher, kind, samples):
+        self.student = student
+        self.teacher = teacher
+        self.kind = kind
+        self.samples = samples
+
+    def predict(self, X):
+        """Predict like the teacher for scaled inputs"""
+        return self.student.predict(X)
+
+    def describe(self):
+        """Summary for API responses and reports"""
+        summary = {"teacher": self.teacher, "kind": self.kind, "samples": self.samples}
+        if self.kind == "tree":
+            summary.update(nodes=int(self.student.tree_.node_count), depth=int(self.student.get_depth()))
+        return summary
+
+def sample_input_space(transformer, features, size=DEFAULT_SAMPLES, random_state=0):
+    """
+    Scaled inputs covering where the models are queried
+
+    Every combination of the values each feature takes in the training data
+    (requests mostly use those exact levels), followed by uniform samples
+    over the training box with whole-number features rounded.
+
+    Args:
+        transformer: Fitted column transformer used by the models
+        features: Training feature matrix in INPUT_SCHEMA column order
+        size: Number of uniform samples
+        random_state: Seed for the uniform samples
+
+    Returns:
+        ndarray: Scaled samples
+    """
+    features = np.asarray(features, dtype=np.float64)
+    levels = [np.unique(features[:, index]) for index in range(features.shape[1])]
+    grid = np.array(list(itertools.product(*levels)), dtype=np.float64)
+    rng = np.random.default_rng(random_state)
+    uniform = rng.uniform(features.min(axis=0), features.max(axis=0), size=(size, features.shape[1]))
+    uniform[:, INPUT_SCHEMA.integral] = np.round(uniform[:, INPUT_SCHEMA.integral])
+    samples = np.vstack([grid, uniform])
+    return np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(samples)), dtype=np.float64)
+
+def distill(teacher, samples, kind="tree", max_depth=DEFAULT_DEPTH, degree=DEFAULT_DEGREE, teacher_name=DEFAULT_TEACHER):
+    """
+    Fit a student to a teacher's predictions on the samples
+
+    Args:
+        teacher: Fitted model predicting on scaled inputs
+        samples: Scaled inputs, from sample_input_space
+        kind: "tree" (one depth-limited regression tree) or "polynomial"
+            (ridge regression on monomials)
+        max_depth: Depth of a tree student
+        degree: Degree of a polynomial student
+        teacher_name: Teacher's model name, recorded on the student
+
+    Returns:
+        DistilledModel: The fitted student
+
+    Raises:
+        ValueError: If the student kind is unknown
+    """
+    labels = np.asarray(teacher.predict(samples), dtype=np.float64)
+    if kind == "tree":
+        student = DecisionTreeRegressor(max_depth=max_depth, random_state=0).fit(samples, labels)
+    elif kind == "polynomial":
+        student = make_pipeline(PolynomialFeatures(degree=degree), Ridge(alpha=1e-6)).fit(samples, labels)
+    else:
+        raise ValueError(f"Unknown student kind: {kind}; use {', '.join(STUDENT_KINDS)}")
+    return DistilledModel(student, teacher_name, kind, samples.shape[0])
+
+def _best_time(predict, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def distillation_report(transformer, pairs, dataset, holdout, rows=10000, repeats=5, random_state=0):
+    """
+    Fidelity to the teacher, ENB2012 accuracy and speed of every student
+
+    Args:
+        transformer: Fitted column transformer used by the models
+        pairs: Dict of target name -> (teacher, DistilledModel), target names
+            "heating" and "cooling" are scored against ENB2012 loads
+        dataset: ENB2012 Dataset from data.load_dataset
+        holdout: Scaled samples not used for fitting, for fidelity off the training rows
+        rows: Batch size used for timing
+        repeats: Timing repetitions, the best run is reported
+        random_state: Seed for the timing batch
+
+    Returns:
+        list: One dict per target
+    """
+    scaled = np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(dataset.features)), dtype=np.float64)
+    truth = {"heating": dataset.column("Heating Load"), "cooling": dataset.column("Cooling Load")}
+    batch = scaled[np.random.default_rng(random_state).integers(0, len(scaled), size=rows)]
+
+    report = []
+    for target, (teacher, student) in pairs.items():
+        teacher_pred, student_pred = teacher.predict(scaled), student.predict(scaled)
+        holdout_diff = student.predict(holdout) - teacher.predict(holdout)
+        teacher_ms = _best_time(teacher.predict, batch, repeats)
+        student_ms = _best_time(student.predict, batch, repeats)
+        entry = dict(
+            student.describe(),
+            target=target,
+            rmse_vs_teacher=float(np.sqrt(np.mean((student_pred - teacher_pred) ** 2))),
+            max_abs_diff=float(np.max(np.abs(student_pred - teacher_pred))),
+            holdout_rmse_vs_teacher=float(np.sqrt(np.mean(holdout_diff ** 2))),
+            rows=rows,
+            teacher_ms=teacher_ms,
+            student_ms=student_ms,
+            speedup=teacher_ms / student_ms if student_ms > 0 else float("inf")
+        )
+        if target in truth:
+            entry["rmse_teacher"] = float(np.sqrt(np.mean((teacher_pred - truth[target]) ** 2)))
+            entry["rmse_student"] = float(np.sqrt(np.mean((student_pred - truth[target]) ** 2)))
+        report.append(entry)
+    return report
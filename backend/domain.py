@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+# Multiplier on the training envelopes before a prediction counts as extrapolation
+DOMAIN_TOLERANCE = float(os.environ.get("DOMAIN_TOLERANCE", 1.0))
+
+# Batches with fewer row x training point pairs are searched by brute force,
+# which beats the KD-tree's per-call overhead for small requests
+BRUTE_FORCE_PAIRS = 1 << 16
+
+# Checks combined into the extrapolation score, in the order of ApplicabilityDomain.assess
+DOMAIN_CHECKS = ("bounds", "mahalanobis", "nearest")
+
+class ApplicabilityDomain:
+    """
+    Region of feature space covered by the training data
+
+    Three checks, each expressed as a ratio to its training envelope so that
+    values above 1 mean extrapolation:
+
+    - bounds: 0 inside the per-feature training ranges, otherwise 1 plus the
+      largest distance outside them in range widths
+    - mahalanobis: Mahalanobis distance over the largest one in the training data
+    - nearest: distance to the nearest training point (features scaled to the
+      training range) over the largest nearest-neighbour gap between
+      distinct training points
+
+    The score is the largest ratio. Everything is precomputed at startup, so
+    assessing a batch is a few array operations and one nearest-point search.
+    """
+
+    def __init__(self, reference, tolerance=DOMAIN_TOLERANCE, leaf_size=16):
+        """
+        Precompute the envelopes
+
+        Args:
+            reference: Training feature matrix in INPUT_SCHEMA column order
+            tolerance: Score above which a row is flagged
+            leaf_size: KD-tree leaf size
+        """
+        reference = np.asarray(reference, dtype=np.float64)
+        self.tolerance = tolerance
+        self.low = reference.min(axis=0)
+        self.high = reference.max(axis=0)
+        self.width = np.where(self.high > self.low, self.high - self.low, 1.0)
+
+        self.mean = reference.mean(axis=0)
+        # Pseudo-inverse: ENB2012 roof area and height are nearly collinear
+        self.precision = np.linalg.pinv(np.cov(reference, rowvar=False))
+        self.mahalanobis_limit = float(self._mahalanobis(reference).max())
+
+        self.points = np.unique(self._scale(reference), axis=0)
+        self.tree = KDTree(self.points, leaf_size=leaf_size)
+        gaps = self.tree.query(self.points, k=2)[0][:, 1]
+        self.nearest_limit = float(gaps.max())
+
+    def _scale(self, features):
+        return (features - self.low) / self.width
+
+    def _mahalanobis(self, features):
+        centred = features - self.mean
+        return np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", centred, self.precision, centred), 0.0))
+
+    def _nearest(self, features):
+        scaled = self._scale(features)
+        if scaled.shape[0] * self.points.shape[0] <= BRUTE_FORCE_PAIRS:
+            return np.sqrt(((scaled[:, np.newaxis, :] - self.points) ** 2).sum(axis=2).min(axis=1))
+        return self.tree.query(scaled, k=1)[0][:, 0]
+
+    def assess(self, features):
+        """
+        Score every row against the training envelopes
+
+        Args:
+            features: Feature matrix in INPUT_SCHEMA column order
+
+        Returns:
+            dict: Arrays with one value per row: "score", "extrapolation"
+                (score above the tolerance) and one ratio per DOMAIN_CHECKS
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.shape[0] == 0:
+            empty = np.empty(0)
+            return dict({name: empty for name in DOMAIN_CHECKS}, score=empty, extrapolation=np.empty(0, dtype=bool))
+        outside = (np.maximum(self.low - features, features - self.high) / self.width).max(axis=1)
+        ratios = {
+            "bounds": np.where(outside > 0, 1.0 + outside, 0.0),
+            "mahalanobis": self._mahalanobis(features) / self.mahalanobis_limit,
+            "nearest": self._nearest(features) / self.nearest_limit
+        }
+        score = np.maximum.reduce([ratios[name] for name in DOMAIN_CHECKS])
+        return dict(ratios, score=score, extrapolation=score > self.tolerance)
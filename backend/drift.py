@@ -0,0 +1,274 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from metrics import registry as default_registry
+from utils import INPUT_SCHEMA
+
+# Seconds between drift computations; live counts are decayed after each one
+DRIFT_INTERVAL_SECONDS = float(os.environ.get("DRIFT_INTERVAL_SECONDS", 60))
+
+# Weight kept by earlier traffic at each computation, 0.5 halves it every interval
+DRIFT_DECAY = float(os.environ.get("DRIFT_DECAY", 0.5))
+
+# Effective number of observations needed before a feature gets a score
+DRIFT_MIN_COUNT = int(os.environ.get("DRIFT_MIN_COUNT", 30))
+
+# Inner histogram bins per continuous feature
+DRIFT_BINS = 10
+
+# Population stability index above which a feature is reported as moderate / drifted
+PSI_THRESHOLDS = (0.1, 0.25)
+
+# Quantiles reported for the reference and the live traffic
+REPORTED_QUANTILES = (0.05, 0.5, 0.95)
+
+# Probability given to empty bins so PSI stays finite
+EPSILON = 1e-4
+
+def reference_edges(values, bins=DRIFT_BINS):
+    """
+    Cut points between the inner bins of a feature
+
+    Features with at most `bins` distinct training values get one bin per
+    value (cut at the midpoints), others get training quantile bins.
+    """
+    distinct = np.unique(values)
+    if distinct.shape[0] <= bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+
+def population_stability_index(reference, live):
+    """PSI between two probability vectors over the same bins"""
+    reference = np.maximum(reference, EPSILON)
+    live = np.maximum(live, EPSILON)
+    return float(np.sum((live - reference) * np.log(live / reference)))
+
+def jensen_shannon(reference, live):
+    """Jensen-Shannon divergence in bits, between 0 and 1"""
+    middle = (reference + live) / 2
+
+    def kl(p):
+        mask = p > 0
+        return np.sum(p[mask] * np.log2(p[mask] / middle[mask]))
+    return float((kl(reference) + kl(live)) / 2)
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketches over the non-negative columns of a matrix
+
+    Values are counted in logarithmic buckets of width log(gamma) (the
+    DDSketch layout), so any quantile is returned within `relative_accuracy`
+    of the true value. When a column uses more than `max_buckets` buckets its
+    lowest ones are merged, which bounds memory regardless of the number of
+    observations. Values at or below `min_value` share one zero bucket.
+    """
+
+    # Spacing between the bucket keys of consecutive columns
+    KEY_STRIDE = 1 << 32
+
+    def __init__(self, columns, relative_accuracy=0.01, max_buckets=1024, min_value=1e-9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.zero_counts = np.zeros(columns, dtype=np.float64)
+        self.buckets = [{} for _ in range(columns)]
+
+    def count(self, column):
+        return self.zero_counts[column] + sum(self.buckets[column].values())
+
+    def update(self, values):
+        """Add a batch of rows, one np.unique for all columns"""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values > self.min_value
+        self.zero_counts += values.shape[0] - np.count_nonzero(positive, axis=0)
+        rows, columns = np.nonzero(positive)
+        keys = np.ceil(np.log(values[rows, columns]) / self.log_gamma).astype(np.int64) + columns * self.KEY_STRIDE
+        keys, counts = np.unique(keys, return_counts=True)
+        offset = self.KEY_STRIDE // 2
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            column, bucket = divmod(key + offset, self.KEY_STRIDE)
+            buckets = self.buckets[column]
+            buckets[bucket - offset] = buckets.get(bucket - offset, 0.0) + count
+            if len(buckets) > self.max_buckets:
+                # Fold the two lowest buckets together
+                lowest = sorted(buckets)[:2]
+                buckets[lowest[1]] += buckets.pop(lowest[0])
+
+    def scale(self, factor):
+        """Multiply every count, for exponential decay"""
+        self.zero_counts *= factor
+        for buckets in self.buckets:
+            for key in buckets:
+                buckets[key] *= factor
+
+    def quantile(self, column, q):
+        """Estimated q-quantile of a column, or None when it has no values"""
+        total = self.count(column)
+        if total <= 0:
+            return None
+        rank = q * total
+        seen = self.zero_counts[column]
+        if rank < seen:
+            return 0.0
+        buckets = self.buckets[column]
+        for key in sorted(buckets):
+            seen += buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(buckets) / (self.gamma + 1)
+
+class DriftMonitor:
+    """
+    Per-feature streaming histograms and quantile sketches of prediction inputs
+
+    Every feature has fixed bins derived from ENB2012: the inner bins cover
+    the training range and two outer bins catch values below and above it.
+    An update is one broadcast comparison and one bincount for all features
+    of the whole batch; memory does not grow with traffic. Every `interval` seconds the
+    live histograms are compared with the training reference (PSI and
+    Jensen-Shannon divergence) and then decayed, so the scores follow recent
+    traffic.
+    """
+
+    def __init__(self, reference, interval=DRIFT_INTERVAL_SECONDS, decay=DRIFT_DECAY,
+                 min_count=DRIFT_MIN_COUNT, bins=DRIFT_BINS, registry=None):
+        """
+        Precompute the training reference
+
+        Args:
+            reference: Training feature matrix in INPUT_SCHEMA column order
+            interval: Seconds between drift computations
+            decay: Weight kept by earlier traffic at each computation
+            min_count: Effective observations needed before a feature is scored
+            bins: Inner bins for continuous features
+            registry: Metrics registry for the drift gauges
+        """
+        reference = np.asarray(reference, dtype=np.float64)
+        self.features = list(INPUT_SCHEMA.fields)
+        self.interval = interval
+        self.decay = decay
+        self.min_count = min_count
+        self.low = reference.min(axis=0)
+        self.high = reference.max(axis=0)
+        self.edges = [reference_edges(reference[:, index], bins) for index in range(reference.shape[1])]
+        sizes = np.array([edges.shape[0] + 3 for edges in self.edges])
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.sizes = sizes
+        # Lower bin boundaries per feature, the range minimum then the inner cuts, padded with inf
+        self.thresholds = np.full((len(self.edges), max(sizes) - 2), np.inf)
+        for index, edges in enumerate(self.edges):
+            self.thresholds[index, :edges.shape[0] + 1] = np.concatenate([[self.low[index]], edges])
+        self.reference = self._proportions(np.bincount(self._bins(reference), minlength=sizes.sum()).astype(np.float64))
+        self.reference_quantiles = np.quantile(reference, REPORTED_QUANTILES, axis=0)
+
+        self.counts = np.zeros(sizes.sum(), dtype=np.float64)
+        self.sketch = QuantileSketch(len(self.features))
+        self.observed = 0
+        self.snapshot = None
+        self.computed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.registry = registry or default_registry
+        for name, key, help_text in (
+            ("input_drift_psi", "psi", "Population stability index of each input feature against ENB2012"),
+            ("input_drift_js", "js_divergence", "Jensen-Shannon divergence of each input feature against ENB2012"),
+            ("input_drift_out_of_range_ratio", "out_of_range", "Share of recent inputs outside the ENB2012 range")
+        ):
+            self.registry.gauge(name, help_text, lambda key=key: self._gauge(key))
+
+    def _bins(self, features):
+        """Flat bin index of every value: below range, inner bins, above range"""
+        # Boundaries passed, plus one for values above the range, in one comparison for all features
+        bins = (features[:, :, np.newaxis] >= self.thresholds).sum(axis=2) + (features > self.high)
+        return (bins + self.offsets).ravel()
+
+    def _proportions(self, counts):
+        """Normalize a flat count array per feature"""
+        proportions = np.zeros_like(counts)
+        for offset, size in zip(self.offsets, self.sizes):
+            total = counts[offset:offset + size].sum()
+            if total > 0:
+                proportions[offset:offset + size] = counts[offset:offset + size] / total
+        return proportions
+
+    def update(self, features):
+        """
+        Add a batch of prediction inputs
+
+        Args:
+            features: Feature matrix in INPUT_SCHEMA column order
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.shape[0] == 0:
+            return
+        counts = np.bincount(self._bins(features), minlength=self.counts.shape[0])
+        with self._lock:
+            self.counts += counts
+            self.sketch.update(features)
+            self.observed += features.shape[0]
+            due = time.monotonic() - self.computed_at >= self.interval
+        if due:
+            self.compute()
+
+    def compute(self):
+        """
+        Score every feature against the reference, then decay the live counts
+
+        Returns:
+            dict: The new snapshot, also returned by report()
+        """
+        with self._lock:
+            counts = self.counts.copy()
+            quantiles = [[self.sketch.quantile(index, q) for q in REPORTED_QUANTILES] for index in range(len(self.features))]
+            self.counts *= self.decay
+            self.sketch.scale(self.decay)
+            self.computed_at = time.monotonic()
+            observed = self.observed
+
+        live = self._proportions(counts)
+        features = {}
+        for index, name in enumerate(self.features):
+            start, stop = self.offsets[index], self.offsets[index] + self.sizes[index]
+            weight = counts[start:stop].sum()
+            entry = {
+                "weight": round(float(weight), 3),
+                "psi": None,
+                "js_divergence": None,
+                "out_of_range": None,
+                "status": "insufficient_data",
+                "training_range": [float(self.low[index]), float(self.high[index])],
+                "reference_quantiles": dict(zip(map(str, REPORTED_QUANTILES), self.reference_quantiles[:, index].tolist())),
+                "live_quantiles": dict(zip(map(str, REPORTED_QUANTILES), quantiles[index]))
+            }
+            if weight >= self.min_count:
+                psi = population_stability_index(self.reference[start:stop], live[start:stop])
+                entry.update(
+                    psi=round(psi, 6),
+                    js_divergence=round(jensen_shannon(self.reference[start:stop], live[start:stop]), 6),
+                    out_of_range=round(float(live[start] + live[stop - 1]), 6),
+                    status="drift" if psi >= PSI_THRESHOLDS[1] else "moderate" if psi >= PSI_THRESHOLDS[0] else "stable"
+                )
+            features[name] = entry
+
+        snapshot = {"observed": observed, "computed_at": time.time(), "features": features}
+        self.snapshot = snapshot
+        return snapshot
+
+    def report(self):
+        """Latest snapshot, recomputed first if the interval has passed or none exists"""
+        if self.snapshot is None or time.monotonic() - self.computed_at >= self.interval:
+            return self.compute()
+        return self.snapshot
+
+    def _gauge(self, key):
+        if self.snapshot is None:
+            return {}
+        return {
+            (("feature", name),): entry[key]
+            for name, entry in self.snapshot["features"].items() if entry[key] is not None
+        }
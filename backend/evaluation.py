@@ -0,0 +1,274 @@
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from utils import INPUT_SCHEMA
+
+# Held-out split of ENB2012, the same one the models were trained against in the notebook
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Leaderboard cache, reused while the model files, the dataset and the settings are unchanged; "" disables it
+EVALUATION_CACHE_PATH = os.environ.get(
+    "EVALUATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "evaluation.json")
+)
+
+# Weight of latency against accuracy when choosing the default model: 0 picks the most accurate, 1 the fastest
+MODEL_LATENCY_WEIGHT = float(os.environ.get("MODEL_LATENCY_WEIGHT", 0.2))
+
+# Single-row latency a default model may not exceed; unset for no limit
+MODEL_MAX_LATENCY_MS = float(os.environ["MODEL_MAX_LATENCY_MS"]) if os.environ.get("MODEL_MAX_LATENCY_MS") else None
+
+# Pins the default model instead of choosing it from the leaderboard
+DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL", "")
+
+# Served when no leaderboard is available, as before it existed
+FALLBACK_DEFAULT_MODEL = "Linear Regression"
+
+# Rows per timed batch, and timed calls per measurement (the median is kept)
+BATCH_ROWS = 1000
+SINGLE_ROW_REPEATS = 25
+BATCH_REPEATS = 3
+
+def holdout_indices(size, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """Row indices of the held-out ENB2012 split"""
+    _, test = train_test_split(np.arange(size), test_size=test_size, random_state=random_state)
+    return np.sort(test)
+
+def _median_ms(call, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000
+
+def _errors(predicted, truth):
+    diff = np.asarray(predicted, dtype=np.float64) - truth
+    return {"rmse": float(np.sqrt(np.mean(diff ** 2))), "mae": float(np.mean(np.abs(diff)))}
+
+def evaluate_models(transformer, heating_models, cooling_models, dataset, batch_rows=BATCH_ROWS,
+                    single_row_repeats=SINGLE_ROW_REPEATS, batch_repeats=BATCH_REPEATS):
+    """
+    Score every model on the held-out split and time it
+
+    Latency covers the heating and cooling calls a prediction makes on
+    already scaled inputs; the transformer's share is the same for every
+    model and left out.
+
+    Args:
+        transformer: Fitted column transformer used by the models
+        heating_models: Dict of model name -> heating model
+        cooling_models: Dict of model name -> cooling model
+        dataset: ENB2012 Dataset from data.load_dataset
+        batch_rows: Rows in the timed batch
+        single_row_repeats: Timed single-row calls per model
+        batch_repeats: Timed batch calls per model
+
+    Returns:
+        list: One dict per model served for both targets
+    """
+    test = holdout_indices(len(dataset))
+    scaled = np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(dataset.features[test])), dtype=np.float64)
+    heating_truth = dataset.column("Heating Load")[test]
+    cooling_truth = dataset.column("Cooling Load")[test]
+    row = scaled[:1]
+    batch = scaled[np.arange(batch_rows) % len(scaled)]
+
+    entries = []
+    for name in [name for name in heating_models if name in cooling_models]:
+        heating, cooling = heating_models[name], cooling_models[name]
+
+        def predict(X):
+            heating.predict(X)
+            cooling.predict(X)
+
+        predict(row)  # Warm caches before timing
+        batch_ms = _median_ms(lambda: predict(batch), batch_repeats)
+        entries.append({
+            "model": name,
+            "heating": _errors(heating.predict(scaled), heating_truth),
+            "cooling": _errors(cooling.predict(scaled), cooling_truth),
+            "single_row_ms": _median_ms(lambda: predict(row), single_row_repeats),
+            "batch_ms": batch_ms,
+            "batch_rows": batch_rows,
+            "per_row_us": batch_ms * 1000 / batch_rows
+        })
+    return entries
+
+def objective_score(entry, best_rmse, best_latency, latency_weight):
+    """
+    How far a model is from the best accuracy and latency on the leaderboard
+
+    A weighted sum of log ratios to the best of each, so it does not depend
+    on the units: 0 is a model that is both the most accurate and the fastest.
+    """
+    rmse = (entry["heating"]["rmse"] + entry["cooling"]["rmse"]) / 2
+    latency = entry["single_row_ms"]
+    return (1 - latency_weight) * math.log(max(rmse, 1e-12) / max(best_rmse, 1e-12)) \
+        + latency_weight * math.log(max(latency, 1e-9) / max(best_latency, 1e-9))
+
+def rank_models(entries, latency_weight=MODEL_LATENCY_WEIGHT, max_latency_ms=MODEL_MAX_LATENCY_MS):
+    """
+    Score the leaderboard by the accuracy/latency objective, best first
+
+    Args:
+        entries: evaluate_models output
+        latency_weight: Weight of latency against accuracy, between 0 and 1
+        max_latency_ms: Single-row latency above which a model is not eligible as default
+
+    Returns:
+        list: Entries with "score" and "eligible" added, sorted by score
+    """
+    if not 0 <= latency_weight <= 1:
+        raise ValueError("latency_weight must be between 0 and 1")
+    if not entries:
+        return []
+    best_rmse = min((entry["heating"]["rmse"] + entry["cooling"]["rmse"]) / 2 for entry in entries)
+    best_latency = min(entry["single_row_ms"] for entry in entries)
+    ranked = [
+        dict(
+            entry,
+            score=objective_score(entry, best_rmse, best_latency, latency_weight),
+            eligible=max_latency_ms is None or entry["single_row_ms"] <= max_latency_ms
+        )
+        for entry in entries
+    ]
+    return sorted(ranked, key=lambda entry: (not entry["eligible"], entry["score"]))
+
+def choose_default_model(ranked, pinned=DEFAULT_MODEL):
+    """
+    Default model for requests that do not name one
+
+    Args:
+        ranked: rank_models output
+        pinned: Model name that overrides the ranking when it is on the leaderboard
+
+    Returns:
+        str: The pinned model, else the best eligible one, else FALLBACK_DEFAULT_MODEL
+    """
+    names = [entry["model"] for entry in ranked]
+    if pinned and pinned in names:
+        return pinned
+    eligible = [entry["model"] for entry in ranked if entry["eligible"]]
+    return eligible[0] if eligible else FALLBACK_DEFAULT_MODEL
+
+def _cache_key(model_version, dataset, models, batch_rows):
+    return {
+        "model_version": model_version,
+        "dataset": dataset.checksum,
+        "models": sorted(models),
+        "split": [TEST_SIZE, RANDOM_STATE],
+        "batch_rows": batch_rows
+    }
+
+def load_cached_evaluation(path, key):
+    """Cached evaluate_models output for the key, or None"""
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cached.get("entries") if cached.get("key") == key else None
+
+def save_evaluation(path, key, entries):
+    """Write the leaderboard cache atomically"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+    try:
+        with os.fdopen(handle, "w") as f:
+            json.dump({"key": key, "entries": entries}, f)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+class ModelEvaluation:
+    """
+    Leaderboard of the loaded models and the default model it picked
+
+    Accuracy and latency are measured once per model version and cached;
+    the ranking is recomputed from the cached figures, so changing the
+    objective takes effect on the next load without measuring again.
+    """
+
+    def __init__(self, entries, model_version, cached=False, latency_weight=MODEL_LATENCY_WEIGHT,
+                 max_latency_ms=MODEL_MAX_LATENCY_MS, pinned=DEFAULT_MODEL):
+        self.model_version = model_version
+        self.cached = cached
+        self.latency_weight = latency_weight
+        self.max_latency_ms = max_latency_ms
+        self.pinned = pinned
+        self.leaderboard = rank_models(entries, latency_weight, max_latency_ms)
+        self.default_model = choose_default_model(self.leaderboard, pinned)
+
+    @classmethod
+    def build(cls, transformer, heating_models, cooling_models, dataset, model_version,
+              cache_path=EVALUATION_CACHE_PATH, refresh=False, measured=None, **kwargs):
+        """
+        Evaluate the models, or reuse the cached figures of the same version
+
+        Args:
+            transformer: Fitted column transformer used by the models
+            heating_models: Dict of model name -> heating model
+            cooling_models: Dict of model name -> cooling model
+            dataset: ENB2012 Dataset from data.load_dataset
+            model_version: Version of the loaded model files
+            cache_path: Leaderboard cache file, "" to always measure
+            refresh: Measure again and overwrite the cache
+            measured: evaluate_models output taken elsewhere (by the training
+                process), cached instead of measuring here
+            **kwargs: Objective settings passed to the constructor
+
+        Returns:
+            ModelEvaluation: The ranked leaderboard
+        """
+        key = _cache_key(model_version, dataset, [name for name in heating_models if name in cooling_models], BATCH_ROWS)
+        entries = load_cached_evaluation(cache_path, key) if cache_path and not refresh and measured is None else None
+        if entries is not None:
+            return cls(entries, model_version, cached=True, **kwargs)
+        entries = measured if measured is not None else evaluate_models(transformer, heating_models, cooling_models, dataset)
+        if cache_path:
+            save_evaluation(cache_path, key, entries)
+        return cls(entries, model_version, **kwargs)
+
+    def accuracy_ranking(self):
+        """Model names from the lowest to the highest mean held-out RMSE, whatever their latency"""
+        ranked = sorted(self.leaderboard, key=lambda entry: (entry["heating"]["rmse"] + entry["cooling"]["rmse"]) / 2)
+        return [entry["model"] for entry in ranked]
+
+    def call_cost_ms(self, model_name):
+        """
+        Affine cost of predicting both targets with a model, from its timings
+
+        Returns:
+            tuple: (overhead_ms, per_row_ms) of a call, or None for a model
+                not on the leaderboard
+        """
+        for entry in self.leaderboard:
+            if entry["model"] == model_name:
+                per_row = max(entry["batch_ms"] - entry["single_row_ms"], 0.0) / max(entry["batch_rows"] - 1, 1)
+                return entry["single_row_ms"], per_row
+        return None
+
+    def to_dict(self):
+        """Leaderboard and objective for /api/models"""
+        return {
+            "model_version": self.model_version,
+            "default_model": self.default_model,
+            "objective": {
+                "latency_weight": self.latency_weight,
+                "max_latency_ms": self.max_latency_ms,
+                "pinned": self.pinned or None
+            },
+            "split": {"test_size": TEST_SIZE, "random_state": RANDOM_STATE},
+            "cached": self.cached,
+            "leaderboard": self.leaderboard
+        }
@@ -0,0 +1,218 @@
+import gzip
+import io
+import json
+
+import numpy as np
+from flask import Response
+
+# Optional encoders, a format is only offered when its package is installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Format name -> MIME type, JSON first so "*/*" negotiates to JSON
+MIME_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "npy": "application/x-npy"
+}
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = 1024
+
+# Longest NDJSON input line accepted, in bytes
+NDJSON_MAX_LINE_BYTES = 64 * 1024
+
+def available_formats():
+    """List the response formats supported by the installed packages"""
+    formats = ["json"]
+    if msgpack is not None:
+        formats.append("msgpack")
+    if pa is not None:
+        formats.extend(["arrow", "parquet"])
+    formats.append("npy")
+    return formats
+
+def negotiate_format(request):
+    """
+    Pick a response format from the ?format= parameter or the Accept header
+
+    Args:
+        request: Flask request
+
+    Returns:
+        str: Format name, or None if nothing acceptable is available
+    """
+    formats = available_formats()
+    requested = request.args.get("format")
+    if requested:
+        return requested if requested in formats else None
+    if not request.accept_mimetypes:
+        return "json"
+
+    best = request.accept_mimetypes.best_match([MIME_TYPES[name] for name in formats])
+    for name in formats:
+        if MIME_TYPES[name] == best:
+            return name
+    return None
+
+def _encode_msgpack(columns, metadata):
+    return msgpack.packb({
+        "columns": {name: values.tolist() for name, values in columns.items()},
+        "metadata": metadata
+    })
+
+def _arrow_table(columns, metadata):
+    arrays = {}
+    for name, values in columns.items():
+        # NaN marks rows without a result, Arrow has real nulls for that
+        mask = np.isnan(values) if values.dtype.kind == "f" else None
+        arrays[name] = pa.array(values, mask=mask)
+    table = pa.table(arrays)
+    return table.replace_schema_metadata({"metadata": json.dumps(metadata)})
+
+def _encode_arrow(columns, metadata):
+    table = _arrow_table(columns, metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _encode_parquet(columns, metadata):
+    buffer = io.BytesIO()
+    pq.write_table(_arrow_table(columns, metadata), buffer)
+    return buffer.getvalue()
+
+def _encode_npy(columns, metadata):
+    # One structured array, field names are the column names
+    dtype = [(name, values.dtype) for name, values in columns.items()]
+    length = len(next(iter(columns.values()))) if columns else 0
+    records = np.empty(length, dtype=dtype)
+    for name, values in columns.items():
+        records[name] = values
+    buffer = io.BytesIO()
+    np.save(buffer, records, allow_pickle=False)
+    return buffer.getvalue()
+
+ENCODERS = {
+    "msgpack": _encode_msgpack,
+    "arrow": _encode_arrow,
+    "parquet": _encode_parquet,
+    "npy": _encode_npy
+}
+
+def columnar_response(fmt, columns, metadata, decimals=2):
+    """
+    Encode equal-length column arrays in a binary format
+
+    Args:
+        fmt: Format name other than "json"
+        columns: Dict of column name -> 1-D numpy array
+        metadata: JSON-serializable dict (model used, errors, notes)
+        decimals: Float columns are rounded like the JSON responses
+
+    Returns:
+        Response: Flask response with the encoded body
+    """
+    columns = {
+        name: np.round(values, decimals) if values.dtype.kind == "f" else values
+        for name, values in columns.items()
+    }
+    body = ENCODERS[fmt](columns, metadata)
+    response = Response(body, mimetype=MIME_TYPES[fmt])
+    if fmt == "npy":
+        # NPY has no room for metadata, send a summary in a header instead
+        summary = {key: value for key, value in metadata.items() if key != "errors"}
+        summary["error_count"] = len(metadata.get("errors", []))
+        response.headers["X-Result-Metadata"] = json.dumps(summary)
+    return response
+
+def not_acceptable_response():
+    """406 response listing the formats the server can produce"""
+    response = Response(
+        json.dumps({
+            "success": False,
+            "error": "Requested response format is not available",
+            "available_formats": available_formats()
+        }),
+        status=406,
+        mimetype="application/json"
+    )
+    return response
+
+def read_ndjson(stream, max_line_bytes=NDJSON_MAX_LINE_BYTES):
+    """
+    Parse newline-delimited JSON one line at a time
+    
+    Blank lines are skipped. Lines that are too long or not valid JSON are
+    reported instead of raising, so one bad record does not end the stream.
+    
+    Args:
+        stream: Binary file-like object such as request.stream
+        max_line_bytes: Longest accepted line
+        
+    Yields:
+        tuple: (line_number, record, error) with record None when error is set
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            # Discard the rest of the line without holding it in memory
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes)
+            yield line_number, None, f"Line exceeds {max_line_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+
+def compress_response(response, request):
+    """
+    Compress a response body with zstd or gzip if the client accepts it
+
+    Args:
+        response: Flask response
+        request: Flask request
+
+    Returns:
+        Response: The same response, compressed in place when worthwhile
+    """
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if zstandard is not None and accepted["zstd"]:
+        response.set_data(zstandard.ZstdCompressor(level=3).compress(body))
+        response.headers["Content-Encoding"] = "zstd"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,338 @@
+import contextlib
+import csv
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from formats import read_ndjson
+from structured_logging import get_logger, log_event
+
+logger = get_logger("jobs")
+
+JOBS_DIR = os.environ.get(
+    "JOBS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jobs")
+)
+
+# Rows scored and persisted per chunk
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", 5000))
+
+# Worker threads per process
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+
+# A running job whose heartbeat is older than this is taken over by another worker
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 60))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    input_format TEXT NOT NULL,
+    options TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    error_rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, heartbeat_at);
+"""
+
+def read_records(path, input_format, skip=0):
+    """
+    Iterate the records of a job input file
+
+    Args:
+        path: Input file
+        input_format: "ndjson" or "csv" (header row of field names)
+        skip: Number of leading records to skip, for resuming
+
+    Yields:
+        tuple: (record, error) with record None when the line could not be parsed
+    """
+    if input_format == "ndjson":
+        f = open(path, "rb")
+        rows = ((record, error) for _, record, error in read_ndjson(f))
+    else:
+        f = open(path, newline="")
+        rows = ((record, None) for record in csv.DictReader(f))
+    with f:
+        for index, row in enumerate(rows):
+            if index >= skip:
+                yield row
+
+def count_records(path, input_format):
+    """Number of records in an input file, counted without validating them"""
+    return sum(1 for _ in read_records(path, input_format))
+
+class JobManager:
+    """
+    SQLite-backed queue of scoring jobs processed in chunks by worker threads
+
+    Every chunk's results are written to their own file before the update
+    that marks the chunk done and advances the job's progress, so a job
+    interrupted by a restart resumes after its last completed chunk.
+    Workers in several processes can share one database: jobs are claimed
+    with a conditional update and a heartbeat lease.
+    """
+
+    def __init__(self, score, directory=JOBS_DIR, workers=JOB_WORKERS,
+                 chunk_size=JOB_CHUNK_SIZE, lease_seconds=JOB_LEASE_SECONDS, poll_seconds=1.0):
+        """
+        Args:
+            score: Function (records, options) -> (columns, errors) where
+                columns maps result names to arrays with one value per record
+                and errors is a list of {"index", "field", "error"} dicts
+            directory: Directory for the database, inputs and results
+            workers: Number of worker threads
+            chunk_size: Records per chunk
+            lease_seconds: Heartbeat age after which a running job is reclaimed
+            poll_seconds: Idle wait between looks for new work
+        """
+        self.score = score
+        self.directory = directory
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.db_path = os.path.join(directory, "jobs.db")
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Autocommit; every statement that changes a job is a single conditional update
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def result_path(self, job_id):
+        """CSV file holding a completed job's results"""
+        return os.path.join(self._job_dir(job_id), "result.csv")
+
+    def submit(self, options, records=None, upload=None, input_format="ndjson"):
+        """
+        Queue a job
+
+        Args:
+            options: JSON-serializable options passed to the score function
+            records: Inline list of input records
+            upload: File-like object with the input, used when records is None
+            input_format: Format of the upload, "ndjson" or "csv"
+
+        Returns:
+            str: Job id
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(os.path.join(job_dir, "parts"))
+        if records is not None:
+            input_format = "ndjson"
+            input_path = os.path.join(job_dir, "input.ndjson")
+            with open(input_path, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+        else:
+            input_path = os.path.join(job_dir, f"input.{input_format}")
+            with open(input_path, "wb") as f:
+                shutil.copyfileobj(upload, f)
+
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, input_format, options, total_rows, chunk_size, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, input_format, json.dumps(options), count_records(input_path, input_format),
+                 self.chunk_size, time.time())
+            )
+        log_event(logger, "job.submitted", f"Queued job {job_id}", job_id=job_id)
+        self._wake.set()
+        return job_id
+
+    def status(self, job_id):
+        """
+        Current state of a job
+
+        Returns:
+            dict: Status fields, or None for an unknown job
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        total_chunks = -(-row["total_rows"] // row["chunk_size"])
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "options": json.loads(row["options"]),
+            "total_rows": row["total_rows"],
+            "rows_done": row["rows_done"],
+            "error_rows": row["error_rows"],
+            "chunks_done": row["chunks_done"],
+            "total_chunks": total_chunks,
+            "progress": round(row["rows_done"] / row["total_rows"], 4) if row["total_rows"] else 1.0,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+
+    def start(self):
+        """Start the worker threads once per manager"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Ask the workers to stop after their current chunk and wait for them"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stop.clear()
+
+    def claim(self):
+        """
+        Take the oldest queued job, or a running job whose owner stopped heartbeating
+
+        Returns:
+            sqlite3.Row: The claimed job, or None when there is no work
+        """
+        now = time.time()
+        with self._connect() as db:
+            candidates = db.execute(
+                "SELECT id, status, heartbeat_at FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND heartbeat_at < ?) ORDER BY created_at",
+                (now - self.lease_seconds,)
+            ).fetchall()
+            for candidate in candidates:
+                claimed = db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ? AND status = ? AND heartbeat_at IS ?",
+                    (self.owner, now, now, candidate["id"], candidate["status"], candidate["heartbeat_at"])
+                ).rowcount
+                if claimed:
+                    return db.execute("SELECT * FROM jobs WHERE id = ?", (candidate["id"],)).fetchone()
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.claim()
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            try:
+                self.process(job)
+            except Exception as e:
+                log_event(logger, "job.failed", f"Job {job['id']} failed: {e}", level=logging.ERROR, exc_info=True, job_id=job["id"])
+                with self._connect() as db:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+                        (str(e), time.time(), job["id"], self.owner)
+                    )
+
+    def _write_chunk(self, job, chunk_index, records, errors_by_row, first_row):
+        """Score one chunk and write its result part atomically"""
+        columns, errors = self.score(records, json.loads(job["options"]))
+        messages = {}
+        for error in errors:
+            messages.setdefault(error["index"], []).append(error["error"])
+        for index, message in errors_by_row.items():
+            messages.setdefault(index, []).append(message)
+
+        frame = pd.DataFrame(columns)
+        frame.insert(0, "row", range(first_row, first_row + len(records)))
+        frame["error"] = ["; ".join(messages.get(index, [])) for index in range(len(records))]
+        part = os.path.join(self._job_dir(job["id"]), "parts", f"{chunk_index:06d}.csv")
+        frame.to_csv(part + ".tmp", index=False, float_format="%.4f")
+        os.replace(part + ".tmp", part)
+        return len(messages)
+
+    def process(self, job):
+        """Score a claimed job from its first unfinished chunk to the end"""
+        job_id = job["id"]
+        input_path = os.path.join(self._job_dir(job_id), f"input.{job['input_format']}")
+        chunk_size = job["chunk_size"]
+        chunk_index = job["chunks_done"]
+        log_event(logger, "job.started", f"Processing job {job_id} from chunk {chunk_index}", job_id=job_id, chunk=chunk_index)
+
+        rows = read_records(input_path, job["input_format"], skip=chunk_index * chunk_size)
+        while True:
+            if self._stop.is_set():
+                return
+            records, parse_errors = [], {}
+            for record, error in rows:
+                if error is not None:
+                    parse_errors[len(records)] = error
+                records.append(record if error is None else {})
+                if len(records) == chunk_size:
+                    break
+            if not records:
+                break
+
+            error_rows = self._write_chunk(job, chunk_index, records, parse_errors, chunk_index * chunk_size)
+            chunk_index += 1
+            with self._connect() as db:
+                updated = db.execute(
+                    "UPDATE jobs SET chunks_done = ?, rows_done = rows_done + ?, error_rows = error_rows + ?, "
+                    "heartbeat_at = ? WHERE id = ? AND owner = ?",
+                    (chunk_index, len(records), error_rows, time.time(), job_id, self.owner)
+                ).rowcount
+            if not updated:
+                # Another worker took the job over after our lease expired
+                log_event(logger, "job.lost", f"Lost job {job_id} to another worker", level=logging.WARNING, job_id=job_id)
+                return
+
+        self._assemble(job_id, chunk_index)
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'completed', finished_at = ? WHERE id = ? AND owner = ?",
+                (time.time(), job_id, self.owner)
+            )
+        log_event(logger, "job.completed", f"Completed job {job_id}", job_id=job_id, chunks=chunk_index)
+
+    def _assemble(self, job_id, chunks):
+        """Concatenate the part files into result.csv and remove them"""
+        parts_dir = os.path.join(self._job_dir(job_id), "parts")
+        result = self.result_path(job_id)
+        if os.path.exists(result) and not os.path.isdir(parts_dir):
+            return  # Assembled before a restart
+        with open(result + ".tmp", "wb") as out:
+            for index in range(chunks):
+                with open(os.path.join(parts_dir, f"{index:06d}.csv"), "rb") as part:
+                    if index > 0:
+                        part.readline()  # header
+                    shutil.copyfileobj(part, out)
+        os.replace(result + ".tmp", result)
+        shutil.rmtree(parts_dir, ignore_errors=True)
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Models from most to least accurate on ENB2012, used when trading accuracy for speed
+# and no measured ranking (ModelEvaluation.accuracy_ranking) is available
+ACCURACY_RANK = [
+    "XGBoost",
+    "Distilled",
+    "Random Forest",
+    "Decision Tree",
+    "K-Nearest Neighbors",
+    "SVM",
+    "Linear Regression"
+]
+
+class CircuitBreaker:
+    """
+    Per-model breaker that opens after repeated failures or deadline overruns
+
+    While open the model is skipped; after the cooldown calls are let through
+    again (half-open) and the first success closes the breaker.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    def allows(self, now):
+        if self.opened_at is None:
+            return True
+        return now - self.opened_at >= self.cooldown
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self, now):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = now
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+class ModelLatencyTracker:
+    """
+    Rolling latency profile and circuit breaker for every model
+
+    Single-row call durations and per-row costs of batch calls are kept in
+    fixed-size windows; estimates use a high quantile so choices hold for
+    the tail, not the average.
+    """
+
+    def __init__(self, window=200, quantile=0.9, failure_threshold=3, cooldown=30.0):
+        self.window = window
+        self.quantile = quantile
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._single = {}
+        self._per_row = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, model_name):
+        if model_name not in self._breakers:
+            self._breakers[model_name] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self._breakers[model_name]
+
+    def record(self, model_name, seconds, rows=1):
+        """Record the duration of a finished call of a model on a number of rows"""
+        with self._lock:
+            if rows <= 1:
+                self._single.setdefault(model_name, deque(maxlen=self.window)).append(seconds)
+            else:
+                self._per_row.setdefault(model_name, deque(maxlen=self.window)).append(seconds / rows)
+
+    def record_success(self, model_name):
+        """Record a call that finished in time, closing the model's breaker"""
+        with self._lock:
+            self._breaker(model_name).success()
+
+    def record_failure(self, model_name):
+        """Record an exception or deadline overrun of a model"""
+        with self._lock:
+            self._breaker(model_name).failure(time.monotonic())
+
+    def is_available(self, model_name):
+        """Whether the model's breaker lets a call through"""
+        with self._lock:
+            return self._breaker(model_name).allows(time.monotonic())
+
+    def estimate_ms(self, model_name, rows=1):
+        """
+        Estimate the tail latency of a call in milliseconds
+
+        Args:
+            model_name: Model name
+            rows: Number of rows in the call
+
+        Returns:
+            float: Estimated latency, or None when the model has no samples yet
+        """
+        with self._lock:
+            single = list(self._single.get(model_name, ()))
+            per_row = list(self._per_row.get(model_name, ()))
+        if not single and not per_row:
+            return None
+
+        overhead = float(np.quantile(single, self.quantile)) if single else 0.0
+        if rows <= 1:
+            return overhead * 1000 if single else float(np.quantile(per_row, self.quantile)) * 1000
+        row_cost = float(np.quantile(per_row, self.quantile)) if per_row else overhead
+        return (overhead + row_cost * rows) * 1000
+
+    def choose(self, candidates, rows, budget_ms):
+        """
+        Pick the most accurate candidate expected to finish within the budget
+
+        Args:
+            candidates: Model names ordered from most to least accurate
+            rows: Number of rows to predict
+            budget_ms: Remaining time budget in milliseconds
+
+        Returns:
+            tuple: (model_name, estimate_ms, reason), model_name is None when
+                every candidate's breaker is open
+        """
+        available = [name for name in candidates if self.is_available(name)]
+        if not available:
+            return None, None, "all candidate models are circuit-broken"
+
+        estimates = {name: self.estimate_ms(name, rows) for name in available}
+        for name in available:
+            # Models without samples are tried so the profile can learn them
+            if estimates[name] is None or estimates[name] <= budget_ms:
+                reason = "within budget" if name == candidates[0] else "downgraded to fit budget"
+                return name, estimates[name], reason
+
+        # Nothing fits: take the fastest and let the deadline cut it off
+        fastest = min(available, key=lambda name: estimates[name])
+        return fastest, estimates[fastest], "no model fits budget, using fastest"
+
+    def snapshot(self):
+        """Per-model estimates and breaker states for reporting"""
+        with self._lock:
+            names = set(self._single) | set(self._per_row) | set(self._breakers)
+            states = {name: self._breaker(name).state for name in names}
+        return {
+            name: {
+                "single_row_ms": self.estimate_ms(name, 1),
+                "per_1000_rows_ms": self.estimate_ms(name, 1000),
+                "circuit": states[name]
+            }
+            for name in sorted(names)
+        }
+
+def rank_candidates(requested, available, accuracy_rank=None):
+    """
+    Order candidate models for a deadline-bound request
+
+    Args:
+        requested: Requested model name, or "auto"/None for the most accurate
+        available: Names of loaded models
+        accuracy_rank: Model names from most to least accurate as measured,
+            ACCURACY_RANK if None or empty
+
+    Returns:
+        list: The requested model followed by every faster, less accurate model
+    """
+    ranked = [name for name in accuracy_rank or ACCURACY_RANK if name in available]
+    ranked += [name for name in available if name not in ranked]
+    if requested in ranked:
+        return ranked[ranked.index(requested):]
+    return ranked
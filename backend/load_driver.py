@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Replay building records against the API at a target request rate.
+
+Records come straight from the synthetic generator, or from a file that
+synthetic.py wrote. Requests are sent open-loop: request i is due at
+i / rate seconds, whether or not earlier ones have returned, and latency
+is measured from that due time, so a slow server shows up as latency
+instead of as a lower request rate.
+
+    python load_driver.py --rate 200 --duration 30 --jitter 0.05
+    python load_driver.py --url http://localhost:5000 --input buildings.parquet --endpoint batch --batch-size 500 --rate 20
+
+Without --url the app is loaded in this process and called through the
+Flask test client.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from synthetic import add_generator_arguments, generate, read_chunks, to_frame
+
+ENDPOINTS = {
+    "predict": "/api/predict",
+    "batch": "/api/predict/batch"
+}
+
+DEFAULT_WORKERS = 16
+
+# Bodies prepared ahead of the dispatch loop, so generating a chunk never delays a due request
+PREFETCH_BODIES = 10000
+
+def request_bodies(chunks, endpoint="predict", batch_size=100, model=None):
+    """
+    Encoded JSON bodies for an endpoint from feature chunks
+
+    Args:
+        chunks: Iterable of feature matrices
+        endpoint: "predict" for one building per request, "batch" for batch_size
+        batch_size: Buildings per batch request
+        model: Model named in every request, the server default if None
+
+    Yields:
+        bytes: Request bodies
+    """
+    pending = []
+    for chunk in chunks:
+        records = to_frame(chunk).to_dict(orient="records")
+        if endpoint == "predict":
+            for record in records:
+                if model:
+                    record["model"] = model
+                yield json.dumps(record).encode()
+            continue
+        pending.extend(records)
+        while len(pending) >= batch_size:
+            yield _batch_body(pending[:batch_size], model)
+            del pending[:batch_size]
+    if pending:
+        yield _batch_body(pending, model)
+
+def _batch_body(records, model):
+    body = {"buildings": records}
+    if model:
+        body["model"] = model
+    return json.dumps(body).encode()
+
+class HttpSender:
+    """POSTs over one keep-alive connection per driver thread"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def __call__(self, path, body):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request("POST", self.prefix + path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            connection.close()
+            self.local.connection = None
+            raise
+
+class LocalSender:
+    """POSTs through a Flask test client per driver thread, without a server"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def __call__(self, path, body):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        return client.post(path, data=body, content_type="application/json").status_code
+
+def prefetch(iterable, size=PREFETCH_BODIES):
+    """
+    Iterate on a producer thread through a bounded queue
+
+    The producer stops once the consumer closes the generator.
+    """
+    items = queue.Queue(maxsize=size)
+    done = object()
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        finally:
+            put(done)
+
+    threading.Thread(target=produce, name="load-driver-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+def _percentiles(values):
+    if not values:
+        return None
+    points = np.percentile(np.asarray(values) * 1000, [50, 90, 99])
+    return {"p50": round(float(points[0]), 2), "p90": round(float(points[1]), 2),
+            "p99": round(float(points[2]), 2), "max": round(float(max(values)) * 1000, 2)}
+
+def drive(send, path, bodies, rate, duration=None, max_requests=None, workers=DEFAULT_WORKERS):
+    """
+    Send bodies open-loop at a target rate and summarize the responses
+
+    Args:
+        send: Callable (path, body) -> HTTP status, such as HttpSender or LocalSender
+        path: Endpoint path
+        bodies: Iterable of request bodies
+        rate: Target requests per second
+        duration: Seconds of requests to schedule, unlimited if None
+        max_requests: Requests to send at most, unlimited if None
+        workers: Requests in flight at most; further due requests queue and count as latency
+
+    Returns:
+        dict: Sent and completed counts, target and achieved rates, statuses,
+            and latency percentiles in ms, from the due time ("latency_ms")
+            and from the actual send ("service_ms")
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    latencies, service_times, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def call(due, body):
+        begin = time.perf_counter()
+        try:
+            status = send(path, body)
+        except Exception as e:
+            status = type(e).__name__
+        end = time.perf_counter()
+        with lock:
+            latencies.append(end - due)
+            service_times.append(end - begin)
+            statuses[str(status)] += 1
+
+    # The clock starts once the first body is ready
+    prefetched = prefetch(bodies)
+    first = list(itertools.islice(prefetched, 1))
+    started = time.perf_counter()
+    sent = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for body in itertools.chain(first, prefetched):
+                if max_requests is not None and sent >= max_requests:
+                    break
+                due = started + sent / rate
+                if duration is not None and due - started >= duration:
+                    break
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(call, due, body)
+                sent += 1
+    finally:
+        prefetched.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "sent": sent,
+        "completed": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "target_rate": rate,
+        "achieved_rate": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "statuses": dict(sorted(statuses.items())),
+        "latency_ms": _percentiles(latencies),
+        "service_ms": _percentiles(service_times)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic buildings against the API at a target rate")
+    add_generator_arguments(parser)
+    parser.add_argument("--input", help="Replay a file written by synthetic.py instead of generating")
+    parser.add_argument("--url", help="Base URL of a running server; the app is loaded in-process if omitted")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="predict", help="Single or batch predictions")
+    parser.add_argument("--batch-size", type=int, default=100, help="Buildings per batch request")
+    parser.add_argument("--model", help="Model to request, the server default if omitted")
+    parser.add_argument("--rate", type=float, default=50.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of requests to send")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Requests in flight at most")
+    args = parser.parse_args()
+
+    if args.input:
+        chunks = read_chunks(args.input, chunk_rows=args.chunk_rows)
+    else:
+        chunks = generate(args.count, args.seed, args.jitter, args.out_of_range, args.chunk_rows)
+    bodies = request_bodies(chunks, args.endpoint, args.batch_size, args.model)
+
+    if args.url:
+        send = HttpSender(args.url)
+    else:
+        from app import app, load_models
+        load_models()
+        send = LocalSender(app)
+
+    report = drive(send, ENDPOINTS[args.endpoint], bodies, args.rate, args.duration, workers=args.workers)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
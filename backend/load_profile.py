@@ -0,0 +1,246 @@
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Degree-day base temperature the city totals are taken to use
+BASE_TEMPERATURE_C = 18.0
+
+# Day-night swing around the daily mean, and the hour of the daily maximum
+DIURNAL_AMPLITUDE_C = 4.0
+WARMEST_HOUR = 15
+
+# Coldest day of the year (mid-January); the warmest falls half a year later
+COLDEST_DAY = 15
+
+# Search range and steps of the fitted seasonal amplitude
+MAX_SEASONAL_AMPLITUDE_C = 60.0
+FIT_ITERATIONS = 40
+
+# Load-duration points reported by default, in hours
+DEFAULT_DURATIONS = (1, 10, 100, 500, 1000, 2000, 4380, 8760)
+
+def hourly_calendar():
+    """Day of year and hour of day of every hour of a non-leap year, and the month of each day"""
+    hours = np.arange(HOURS_PER_YEAR)
+    months = np.repeat(np.arange(12), MONTH_DAYS)
+    return hours // 24, hours % 24, months[hours // 24]
+
+def hourly_temperatures(mean, seasonal_amplitude, diurnal_amplitude=DIURNAL_AMPLITUDE_C):
+    """
+    Synthetic outdoor temperature of every hour, one row per city
+
+    A seasonal cosine with its minimum on COLDEST_DAY plus a daily cosine
+    peaking at WARMEST_HOUR; both average to zero over the year.
+
+    Args:
+        mean: C annual mean temperatures
+        seasonal_amplitude: C seasonal amplitudes
+        diurnal_amplitude: Day-night amplitude shared by every city
+
+    Returns:
+        ndarray: C × 8760 temperatures in °C
+    """
+    day, hour, _ = hourly_calendar()
+    seasonal = -np.cos(2 * np.pi * (day + hour / 24 - COLDEST_DAY) / 365)
+    diurnal = np.cos(2 * np.pi * (hour - WARMEST_HOUR) / 24)
+    mean = np.asarray(mean, dtype=np.float64)[:, np.newaxis]
+    amplitude = np.asarray(seasonal_amplitude, dtype=np.float64)[:, np.newaxis]
+    return mean + amplitude * seasonal + diurnal_amplitude * diurnal
+
+def fit_temperatures(hdd, cdd, base=BASE_TEMPERATURE_C, diurnal_amplitude=DIURNAL_AMPLITUDE_C):
+    """
+    Annual mean and seasonal amplitude that reproduce each city's degree-days
+
+    CDD - HDD fixes the mean exactly, since the cosines average to zero.
+    HDD + CDD grows with the seasonal amplitude, which a bisection run on
+    every city at once finds. Cities whose day-night swing alone exceeds
+    their degree-days get no seasonal swing.
+
+    Args:
+        hdd: C annual heating degree-days
+        cdd: C annual cooling degree-days
+        base: Degree-day base temperature
+        diurnal_amplitude: Day-night amplitude
+
+    Returns:
+        tuple: (mean, seasonal_amplitude), arrays of C
+    """
+    hdd = np.asarray(hdd, dtype=np.float64)
+    cdd = np.asarray(cdd, dtype=np.float64)
+    mean = base + (cdd - hdd) / 365
+    target = hdd + cdd
+    low, high = np.zeros_like(mean), np.full_like(mean, MAX_SEASONAL_AMPLITUDE_C)
+    for _ in range(FIT_ITERATIONS):
+        middle = (low + high) / 2
+        degree_days = np.abs(hourly_temperatures(mean, middle, diurnal_amplitude) - base).sum(axis=1) / 24
+        short = degree_days < target
+        low = np.where(short, middle, low)
+        high = np.where(short, high, middle)
+    return mean, (low + high) / 2
+
+def _shares(values):
+    totals = values.sum(axis=-1, keepdims=True)
+    return np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+
+class LoadProfiles:
+    """
+    Hourly heating and cooling shapes of a set of cities
+
+    Each city's year of synthetic temperatures is fitted to its degree-days
+    once. A building's hourly load is its annual energy spread over the
+    hours in proportion to their degree-hours, so heating and cooling never
+    fall in the same hour and every figure is a broadcast over the shapes.
+    """
+
+    def __init__(self, cities, hdd, cdd, base=BASE_TEMPERATURE_C, diurnal_amplitude=DIURNAL_AMPLITUDE_C):
+        """
+        Fit the city shapes
+
+        Args:
+            cities: C city names
+            hdd: C annual heating degree-days
+            cdd: C annual cooling degree-days
+            base: Degree-day base temperature
+            diurnal_amplitude: Day-night amplitude
+        """
+        self.cities = list(cities)
+        self.mean, self.seasonal_amplitude = fit_temperatures(hdd, cdd, base, diurnal_amplitude)
+        temperatures = hourly_temperatures(self.mean, self.seasonal_amplitude, diurnal_amplitude)
+        self.heating = _shares(np.maximum(base - temperatures, 0))
+        self.cooling = _shares(np.maximum(temperatures - base, 0))
+
+        _, _, months = hourly_calendar()
+        month_hours = (months[np.newaxis, :] == np.arange(12)[:, np.newaxis]).astype(np.float64)
+        self.monthly_heating = self.heating @ month_hours.T
+        self.monthly_cooling = self.cooling @ month_hours.T
+
+        # Shapes sorted from the largest hour down, for load-duration curves
+        self.heating_sorted = -np.sort(-self.heating, axis=1)
+        self.cooling_sorted = -np.sort(-self.cooling, axis=1)
+
+    @classmethod
+    def from_city_data(cls, city_data, **kwargs):
+        """Shapes of every city loaded from the climate CSV"""
+        cities = sorted(city_data)
+        return cls(
+            cities,
+            [city_data[city]['hdd'] for city in cities],
+            [city_data[city]['cdd'] for city in cities],
+            **kwargs
+        )
+
+    def indices(self, cities):
+        """Column of each city, raising ValueError for unknown ones"""
+        unknown = [city for city in cities if city not in self.cities]
+        if unknown:
+            raise ValueError(f"Unknown cities: {', '.join(map(str, unknown))}")
+        return np.array([self.cities.index(city) for city in cities], dtype=np.intp)
+
+    def hourly(self, heating_kwh, cooling_kwh, columns=None):
+        """
+        Hourly loads in kW (kWh per hour)
+
+        Args:
+            heating_kwh: N × C annual heating energy
+            cooling_kwh: N × C annual cooling energy
+            columns: City columns of the C energy columns, all cities if None
+
+        Returns:
+            tuple: (heating, cooling), N × C × 8760 arrays
+        """
+        columns = slice(None) if columns is None else columns
+        heating = np.asarray(heating_kwh, dtype=np.float64)[..., np.newaxis] * self.heating[columns]
+        cooling = np.asarray(cooling_kwh, dtype=np.float64)[..., np.newaxis] * self.cooling[columns]
+        return heating, cooling
+
+    def load_duration(self, heating_kwh, cooling_kwh, columns=None, durations=DEFAULT_DURATIONS):
+        """
+        Combined load exceeded for each duration, without building the profiles
+
+        The d-th largest hour of a building is the d-th largest value of two
+        sorted sequences, its heating shape scaled by its heating energy and
+        its cooling shape by its cooling energy. Padding zeros do not change
+        ranks up to 8760. A bisection on how many values come from heating
+        finds it for every building, city and duration at once.
+
+        Args:
+            heating_kwh: N × C annual heating energy
+            cooling_kwh: N × C annual cooling energy
+            columns: City columns of the C energy columns, all cities if None
+            durations: Hours at which the curve is read, 1 to 8760
+
+        Returns:
+            ndarray: N × C × D loads in kW
+        """
+        heating_sorted = self.heating_sorted if columns is None else self.heating_sorted[columns]
+        cooling_sorted = self.cooling_sorted if columns is None else self.cooling_sorted[columns]
+        heating_kwh = np.asarray(heating_kwh, dtype=np.float64)[..., np.newaxis]
+        cooling_kwh = np.asarray(cooling_kwh, dtype=np.float64)[..., np.newaxis]
+        shape = np.broadcast_shapes(heating_kwh.shape[:-1], cooling_kwh.shape[:-1]) + (len(durations),)
+        city = np.broadcast_to(np.arange(len(heating_sorted))[:, np.newaxis], shape)
+        rank = np.broadcast_to(np.asarray(durations, dtype=np.intp), shape)
+
+        def heating_at(index):
+            return heating_kwh * heating_sorted[city, np.clip(index, 0, HOURS_PER_YEAR - 1)]
+
+        def cooling_at(index):
+            return cooling_kwh * cooling_sorted[city, np.clip(index, 0, HOURS_PER_YEAR - 1)]
+
+        # Fewest values taken from heating such that the next heating value does not exceed the last cooling one
+        low, high = np.zeros(shape, dtype=np.intp), rank.copy()
+        for _ in range(int(np.ceil(np.log2(HOURS_PER_YEAR + 1)))):
+            active = low < high
+            middle = (low + high) // 2
+            more = heating_at(middle) > cooling_at(rank - middle - 1)
+            low = np.where(active & more, middle + 1, low)
+            high = np.where(active & ~more, middle, high)
+        taken = low
+        # The d-th largest is the smaller of the last values taken from each
+        last_heating = np.where(taken > 0, heating_at(taken - 1), np.inf)
+        last_cooling = np.where(taken < rank, cooling_at(rank - taken - 1), np.inf)
+        return np.minimum(last_heating, last_cooling)
+
+    def simulate(self, heating_kwh, cooling_kwh, columns=None, durations=DEFAULT_DURATIONS):
+        """
+        Peaks, monthly totals and load-duration points of N buildings in C cities
+
+        Args:
+            heating_kwh: N × C annual heating energy
+            cooling_kwh: N × C annual cooling energy
+            columns: City columns of the C energy columns, all cities if None
+            durations: Hours at which the load-duration curve is read
+
+        Returns:
+            dict: N × C peaks ("peakHeatingKw", "peakCoolingKw", "peakKw"),
+                N × C × 12 monthly kWh ("monthlyHeatingKwh", "monthlyCoolingKwh")
+                and N × C × D "loadDurationKw"
+        """
+        columns = slice(None) if columns is None else columns
+        heating_kwh = np.asarray(heating_kwh, dtype=np.float64)
+        cooling_kwh = np.asarray(cooling_kwh, dtype=np.float64)
+        peak_heating = heating_kwh * self.heating_sorted[columns, 0]
+        peak_cooling = cooling_kwh * self.cooling_sorted[columns, 0]
+        return {
+            "peakHeatingKw": peak_heating,
+            "peakCoolingKw": peak_cooling,
+            # Heating and cooling never share an hour, so the combined peak is the larger one
+            "peakKw": np.maximum(peak_heating, peak_cooling),
+            "monthlyHeatingKwh": heating_kwh[..., np.newaxis] * self.monthly_heating[columns],
+            "monthlyCoolingKwh": cooling_kwh[..., np.newaxis] * self.monthly_cooling[columns],
+            "loadDurationKw": self.load_duration(heating_kwh, cooling_kwh, columns, durations)
+        }
+
+def parse_durations(durations):
+    """Validate load-duration hours, DEFAULT_DURATIONS when omitted"""
+    if durations is None:
+        return list(DEFAULT_DURATIONS)
+    if not isinstance(durations, list) or not durations:
+        raise ValueError("durations must be a non-empty list")
+    try:
+        values = [int(value) for value in durations]
+    except (ValueError, TypeError):
+        raise ValueError("durations must be whole numbers of hours")
+    if any(value < 1 or value > HOURS_PER_YEAR for value in values):
+        raise ValueError(f"durations must be between 1 and {HOURS_PER_YEAR} hours")
+    return sorted(set(values))
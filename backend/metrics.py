@@ -0,0 +1,72 @@
+import threading
+
+class MetricsRegistry:
+    """
+    Minimal thread-safe registry rendered in the Prometheus text format
+
+    Counters are incremented in place; gauges are read from callbacks at
+    render time so they never go stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def counter(self, name, help_text):
+        """Declare a counter"""
+        self._help[name] = help_text
+        self._types[name] = "counter"
+
+    def gauge(self, name, help_text, callback):
+        """
+        Declare a gauge read from a callback
+
+        Args:
+            name: Metric name
+            help_text: Description
+            callback: Function returning {labels_dict_items_tuple: value}
+        """
+        self._help[name] = help_text
+        self._types[name] = "gauge"
+        self._gauges[name] = callback
+
+    def inc(self, name, labels=None, value=1):
+        """Increment a counter for a label set"""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def value(self, name, labels=None):
+        """Current value of a counter for a label set"""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    @staticmethod
+    def _format(name, labels, value):
+        if labels:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            return f"{name}{{{label_text}}} {value}"
+        return f"{name} {value}"
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+        lines = []
+        for name in sorted(self._types):
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {self._types[name]}")
+            if self._types[name] == "counter":
+                samples = [(labels, value) for (metric, labels), value in counters.items() if metric == name]
+            else:
+                samples = list(self._gauges[name]().items())
+            for labels, value in sorted(samples):
+                lines.append(self._format(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+# Registry shared by the whole API, served on /metrics
+registry = MetricsRegistry()
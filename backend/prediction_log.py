@@ -0,0 +1,266 @@
+import atexit
+import contextlib
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import registry as default_registry
+from structured_logging import get_logger, log_event
+
+logger = get_logger("prediction_log")
+
+PREDICTION_LOG_PATH = os.environ.get(
+    "PREDICTION_LOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".prediction_log", "predictions.db")
+)
+
+# Rows held in memory before the oldest are dropped
+PREDICTION_LOG_BUFFER = int(os.environ.get("PREDICTION_LOG_BUFFER", 50000))
+
+# Seconds between flushes, and the buffered rows that trigger an early flush
+PREDICTION_LOG_FLUSH_SECONDS = float(os.environ.get("PREDICTION_LOG_FLUSH_SECONDS", 1.0))
+FLUSH_ROWS = 1000
+
+# Glazing area buckets as (label, upper bound), ENB2012 uses 0, 0.1, 0.25 and 0.4
+GLAZING_BUCKETS = [("none", 0.0), ("low", 0.1), ("medium", 0.25), ("high", np.inf)]
+
+# Dimensions the stats query can group by -> column
+GROUP_COLUMNS = {"model": "model", "version": "model_version", "day": "day", "glazing": "glazing_bucket"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    endpoint TEXT,
+    request_id TEXT,
+    model TEXT NOT NULL,
+    model_version TEXT,
+    latency_ms REAL,
+    relative_compactness REAL,
+    wall_area REAL,
+    roof_area REAL,
+    overall_height REAL,
+    glazing_area REAL,
+    glazing_area_distribution INTEGER,
+    glazing_bucket TEXT NOT NULL,
+    heating_load REAL,
+    cooling_load REAL
+);
+CREATE INDEX IF NOT EXISTS predictions_day_model ON predictions (day, model, glazing_bucket);
+CREATE INDEX IF NOT EXISTS predictions_model_day ON predictions (model, day);
+"""
+
+INSERT = (
+    "INSERT INTO predictions (ts, day, endpoint, request_id, model, model_version, latency_ms, "
+    "relative_compactness, wall_area, roof_area, overall_height, glazing_area, glazing_area_distribution, "
+    "glazing_bucket, heating_load, cooling_load) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def glazing_buckets(glazing_area):
+    """Bucket label for every glazing area"""
+    labels = np.array([label for label, _ in GLAZING_BUCKETS])
+    bounds = np.array([bound for _, bound in GLAZING_BUCKETS])
+    return labels[np.searchsorted(bounds, glazing_area, side="left")]
+
+class PredictionLog:
+    """
+    Audit log of predictions, buffered in memory and written to SQLite in bulk
+
+    Request threads only append a reference to their batch to a bounded
+    buffer; a background thread turns batches into rows and inserts them in
+    one transaction per flush. When the buffer is full the oldest batches are
+    dropped and counted rather than blocking requests.
+    """
+
+    def __init__(self, path=PREDICTION_LOG_PATH, capacity=PREDICTION_LOG_BUFFER,
+                 flush_seconds=PREDICTION_LOG_FLUSH_SECONDS, registry=None):
+        self.path = path
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._batches = deque()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._ready = False
+        self.registry = registry or default_registry
+        self.registry.counter("prediction_log_written_total", "Predictions written to the prediction log")
+        self.registry.counter("prediction_log_dropped_total", "Predictions dropped because the log buffer was full")
+        self.registry.gauge("prediction_log_buffered", "Predictions waiting to be written", lambda: {(): self._buffered})
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    def _prepare(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connect() as db:
+                db.executescript(SCHEMA)
+            self._ready = True
+
+    def record(self, features, heating_loads, cooling_loads, model, version=None,
+               latency_ms=None, endpoint=None, request_id=None):
+        """
+        Queue a batch of predictions
+
+        Args:
+            features: Feature matrix in INPUT_SCHEMA column order
+            heating_loads: Predicted heating loads, one per row
+            cooling_loads: Predicted cooling loads, one per row
+            model: Model name
+            version: Model version
+            latency_ms: Duration of the model call for the whole batch
+            endpoint: Route that made the prediction
+            request_id: Request id for correlation with the logs
+        """
+        rows = len(features)
+        if rows == 0:
+            return
+        batch = (time.time(), endpoint, request_id, model, version, latency_ms, features, heating_loads, cooling_loads)
+        with self._lock:
+            self._batches.append(batch)
+            self._buffered += rows
+            while self._buffered > self.capacity and len(self._batches) > 1:
+                dropped = len(self._batches.popleft()[6])
+                self._buffered -= dropped
+                self.dropped += dropped
+                self.registry.inc("prediction_log_dropped_total", value=dropped)
+            if self._buffered >= FLUSH_ROWS:
+                self._wake.set()
+        self._start()
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log_event(logger, "prediction_log.flush_failed", f"Could not write the prediction log: {e}", level=logging.ERROR)
+
+    @staticmethod
+    def _rows(batch):
+        ts, endpoint, request_id, model, version, latency_ms, features, heating, cooling = batch
+        day = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d")
+        per_row_ms = None if latency_ms is None else latency_ms / len(features)
+        buckets = glazing_buckets(features[:, 4]).tolist()
+        for row, bucket, heating_load, cooling_load in zip(features.tolist(), buckets, np.asarray(heating).tolist(), np.asarray(cooling).tolist()):
+            yield (ts, day, endpoint, request_id, model, version, per_row_ms, *row[:5], int(row[5]), bucket, heating_load, cooling_load)
+
+    def flush(self):
+        """
+        Write every buffered prediction in one transaction
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._write_lock:
+            with self._lock:
+                batches, self._batches = self._batches, deque()
+                self._buffered = 0
+            if not batches:
+                return 0
+            self._prepare()
+            written = 0
+            with self._connect() as db:
+                with db:
+                    for batch in batches:
+                        db.executemany(INSERT, self._rows(batch))
+                        written += len(batch[6])
+            self.registry.inc("prediction_log_written_total", value=written)
+            return written
+
+    def stats(self, group_by=("model", "day"), model=None, since=None, until=None, bin_width=5.0):
+        """
+        Counts and load distributions per group
+
+        Args:
+            group_by: Names from GROUP_COLUMNS
+            model: Only this model
+            since: First day included, YYYY-MM-DD
+            until: Last day included, YYYY-MM-DD
+            bin_width: Width of the load histogram bins
+
+        Returns:
+            list: One dict per group with count, mean/min/max loads, mean
+                latency and heating/cooling histograms keyed by bin start
+
+        Raises:
+            ValueError: If a group name or date is invalid
+        """
+        unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown group_by: {', '.join(unknown)}; use {', '.join(GROUP_COLUMNS)}")
+        if not bin_width > 0:
+            raise ValueError("bin_width must be positive")
+        conditions, arguments = [], []
+        if model:
+            conditions.append("model = ?")
+            arguments.append(model)
+        for day, operator in ((since, ">="), (until, "<=")):
+            if day:
+                datetime.date.fromisoformat(day)
+                conditions.append(f"day {operator} ?")
+                arguments.append(day)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = [GROUP_COLUMNS[name] for name in group_by]
+        keys = ", ".join(columns) if columns else "'all'"
+
+        self.flush()
+        self._prepare()
+        with self._connect() as db:
+            summary = db.execute(
+                f"SELECT {keys}, COUNT(*), AVG(heating_load), MIN(heating_load), MAX(heating_load), "
+                f"AVG(cooling_load), MIN(cooling_load), MAX(cooling_load), AVG(latency_ms) "
+                f"FROM predictions {where} GROUP BY {keys} ORDER BY {keys}",
+                arguments
+            ).fetchall()
+            histograms = {}
+            for load in ("heating", "cooling"):
+                # Floor division, CAST alone truncates negative loads towards zero
+                ratio = f"({load}_load / ?)"
+                bin_expression = f"CAST({ratio} AS INTEGER) - ({ratio} < CAST({ratio} AS INTEGER))"
+                for row in db.execute(
+                    f"SELECT {keys}, {bin_expression} AS bin, COUNT(*) "
+                    f"FROM predictions {where} GROUP BY {keys}, bin",
+                    [bin_width] * 3 + arguments
+                ):
+                    key = tuple(row[:len(columns)]) if columns else ("all",)
+                    histograms.setdefault((key, load), {})[round(row[-2] * bin_width, 6)] = row[-1]
+
+        groups = []
+        for row in summary:
+            key = tuple(row[:len(columns)]) if columns else ("all",)
+            values = row[len(columns) if columns else 1:]
+            group = dict(zip(group_by, key))
+            group.update({
+                "count": values[0],
+                "heating_load": {"mean": values[1], "min": values[2], "max": values[3], "histogram": histograms.get((key, "heating"), {})},
+                "cooling_load": {"mean": values[4], "min": values[5], "max": values[6], "histogram": histograms.get((key, "cooling"), {})},
+                "mean_latency_ms": values[7]
+            })
+            groups.append(group)
+        return groups
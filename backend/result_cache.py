@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import registry as default_registry
+
+# Shared by every worker process on the host; "" disables the cache
+RESULT_CACHE_PATH = os.environ.get(
+    "RESULT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results.db")
+)
+
+# Largest batch whose rows are looked up one by one; bigger batches go straight to the model
+RESULT_CACHE_MAX_ROWS = int(os.environ.get("RESULT_CACHE_MAX_ROWS", 100))
+
+# Bytes the cache may hold before the least recently used entries are evicted
+RESULT_CACHE_MAX_BYTES = int(float(os.environ.get("RESULT_CACHE_MAX_MB", 256)) * 1024 * 1024)
+
+# Eviction brings the cache down to this share of the limit, so it does not run on every write
+LOW_WATERMARK = 0.9
+
+# Per-entry storage beyond the key and value, for size accounting
+ENTRY_OVERHEAD_BYTES = 64
+
+# Reads waiting to update their entries' access time, flushed with the next write
+MAX_PENDING_TOUCHES = 10000
+
+# Entries deleted per eviction query
+EVICTION_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_kind_version ON entries (kind, version);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes) VALUES (1, 0);
+"""
+
+# Keys per lookup query, under SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+def cache_key(*parts):
+    """16-byte digest of the parts, str or bytes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else bytes(part)
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.digest()[:16]
+
+class ResultCache:
+    """
+    Result cache shared by every worker process on the host, in WAL-mode SQLite
+
+    Lookups are plain reads: in WAL mode they never wait for a writer, and
+    they do not write themselves. The access times of hit entries are kept
+    in memory and written with the process's next insert, so eviction is
+    least-recently-used as far as the workers have reported their hits.
+
+    Keys carry the version of whatever produced the value (the model files
+    for predictions), so a stale entry is never returned. The first time a
+    process writes a kind under a new version, entries of that kind under
+    other versions are deleted.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES, registry=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._versions = {}
+        self._ready = False
+        self.registry = registry or default_registry
+        self.registry.counter("result_cache_lookups_total", "Shared result cache lookups by kind and outcome")
+        self.registry.counter("result_cache_evicted_total", "Entries evicted from the shared result cache")
+        self.registry.counter("result_cache_errors_total", "Shared result cache operations that failed")
+
+    def _connection(self):
+        # One connection per thread, opened again in a forked worker
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            if not self._ready:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            if not self._ready:
+                db.executescript(SCHEMA)
+                self._ready = True
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get_many(self, kind, keys):
+        """
+        Look up several keys
+
+        Args:
+            kind: Entry kind, such as "prediction"
+            keys: cache_key digests
+
+        Returns:
+            list: Value bytes per key, None for misses
+        """
+        found = {}
+        db = self._connection()
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(db.execute(
+                f"SELECT key, value FROM entries WHERE kind = ? AND key IN ({placeholders})", [kind, *batch]
+            ).fetchall())
+        if found:
+            now = time.time()
+            with self._lock:
+                if len(self._touched) < MAX_PENDING_TOUCHES:
+                    self._touched.update(dict.fromkeys(found, now))
+        self.registry.inc("result_cache_lookups_total", {"kind": kind, "outcome": "hit"}, len(found))
+        self.registry.inc("result_cache_lookups_total", {"kind": kind, "outcome": "miss"}, len(keys) - len(found))
+        return [found.get(key) for key in keys]
+
+    def get(self, kind, key):
+        """Value bytes of one key, or None"""
+        return self.get_many(kind, [key])[0]
+
+    def put_many(self, kind, version, items):
+        """
+        Store values, then evict down to the low watermark if over the limit
+
+        Args:
+            kind: Entry kind
+            version: Version of whatever produced the values
+            items: (key, value bytes) pairs
+        """
+        now = time.time()
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            retire = self._versions.get(kind) != version
+            self._versions[kind] = version
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if retire:
+                freed = db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries WHERE kind = ? AND version != ?", (kind, version)
+                ).fetchone()[0]
+                db.execute("DELETE FROM entries WHERE kind = ? AND version != ?", (kind, version))
+                db.execute("UPDATE usage SET bytes = bytes - ? WHERE id = 1", (freed,))
+            if touched:
+                db.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(when, key) for key, when in touched.items()])
+            added = 0
+            for key, value in items:
+                size = len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+                cursor = db.execute(
+                    "INSERT INTO entries (key, kind, version, value, size, accessed) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO NOTHING",
+                    (key, kind, version, value, size, now)
+                )
+                added += size * cursor.rowcount
+            db.execute("UPDATE usage SET bytes = bytes + ? WHERE id = 1", (added,))
+            total = db.execute("SELECT bytes FROM usage WHERE id = 1").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(db, total - int(self.max_bytes * LOW_WATERMARK))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def put(self, kind, version, key, value):
+        """Store one value"""
+        self.put_many(kind, version, [(key, value)])
+
+    def _evict(self, db, excess):
+        evicted = freed = 0
+        while freed < excess:
+            rows = db.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT ?", (EVICTION_BATCH,)).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            db.executemany("DELETE FROM entries WHERE key = ?", victims)
+            evicted += len(victims)
+        db.execute("UPDATE usage SET bytes = bytes - ? WHERE id = 1", (freed,))
+        self.registry.inc("result_cache_evicted_total", value=evicted)
+
+    def clear(self):
+        """Delete every entry"""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        db.execute("DELETE FROM entries")
+        db.execute("UPDATE usage SET bytes = 0 WHERE id = 1")
+        db.execute("COMMIT")
+        with self._lock:
+            self._touched.clear()
+
+    def stats(self):
+        """Entries and bytes per kind and version, and the size limit"""
+        db = self._connection()
+        kinds = [
+            {"kind": kind, "version": version, "entries": entries, "bytes": size}
+            for kind, version, entries, size in db.execute(
+                "SELECT kind, version, COUNT(*), SUM(size) FROM entries GROUP BY kind, version ORDER BY kind, version"
+            )
+        ]
+        return {
+            "path": self.path,
+            "bytes": db.execute("SELECT bytes FROM usage WHERE id = 1").fetchone()[0],
+            "max_bytes": self.max_bytes,
+            "kinds": kinds
+        }
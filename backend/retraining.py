@@ -0,0 +1,589 @@
+import contextlib
+import copy
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import numpy as np
+from sklearn.base import clone
+
+from data import load_dataset
+from evaluation import evaluate_models, holdout_indices
+from metrics import registry as default_registry
+from structured_logging import get_logger, log_event
+from utils import INPUT_SCHEMA, InputSchema
+
+logger = get_logger("retraining")
+
+# Measurement store, training runs and published models; "" disables retraining
+RETRAIN_DIR = os.environ.get(
+    "RETRAIN_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".retrain")
+)
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+# Minimum seconds between the starts of two training runs
+RETRAIN_INTERVAL_SECONDS = float(os.environ.get("RETRAIN_INTERVAL_SECONDS", 3600))
+
+# New measurements needed before a scheduled run
+RETRAIN_MIN_MEASUREMENTS = int(os.environ.get("RETRAIN_MIN_MEASUREMENTS", 50))
+
+# Relative RMSE increase a refitted model may show on either validation set and still be published
+RETRAIN_TOLERANCE = float(os.environ.get("RETRAIN_TOLERANCE", 0.05))
+
+# A running run whose heartbeat is older than this is taken over by another process
+RETRAIN_LEASE_SECONDS = float(os.environ.get("RETRAIN_LEASE_SECONDS", 120))
+
+# CPU threads and niceness of the training process, so it cannot crowd out request threads
+RETRAIN_THREADS = int(os.environ.get("RETRAIN_THREADS", 1))
+RETRAIN_NICE = int(os.environ.get("RETRAIN_NICE", 10))
+
+# Published model versions kept on disk, so workers still loading an older one find it
+RETRAIN_KEEP = 3
+
+# Every FIELD_HOLDOUT_EVERY-th measurement (by id) validates instead of training
+FIELD_HOLDOUT_EVERY = 5
+
+# Measured loads sent with the building fields
+LOAD_SCHEMA = InputSchema([
+    ("heatingLoad", "Heating Load", 0.0, float('inf'), float),
+    ("coolingLoad", "Cooling Load", 0.0, float('inf'), float)
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY,
+    received_at REAL NOT NULL,
+    source TEXT,
+    relative_compactness REAL NOT NULL,
+    wall_area REAL NOT NULL,
+    roof_area REAL NOT NULL,
+    overall_height REAL NOT NULL,
+    glazing_area REAL NOT NULL,
+    glazing_area_distribution INTEGER NOT NULL,
+    heating_load REAL NOT NULL,
+    cooling_load REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS training_runs (
+    id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    measurements_upto INTEGER NOT NULL,
+    version TEXT,
+    report TEXT,
+    error TEXT
+);
+"""
+
+FEATURE_COLUMNS = (
+    "relative_compactness", "wall_area", "roof_area", "overall_height", "glazing_area", "glazing_area_distribution"
+)
+
+class MeasurementStore:
+    """
+    SQLite store of labeled field measurements and of the training runs over them
+
+    Appends are single inserts, so ingestion never waits on training; runs
+    are claimed with a conditional insert under a write lock and kept alive
+    by a heartbeat, the same lease scheme as the job queue.
+    """
+
+    def __init__(self, directory=RETRAIN_DIR):
+        self.directory = directory
+        self.db_path = os.path.join(directory, "retraining.db")
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    def append(self, features, heating_loads, cooling_loads, source=None):
+        """
+        Store validated measurements
+
+        Args:
+            features: Feature matrix in INPUT_SCHEMA column order
+            heating_loads: Measured heating loads, one per row
+            cooling_loads: Measured cooling loads, one per row
+            source: Free-form origin recorded with every row
+
+        Returns:
+            int: Id of the last stored row
+        """
+        now = time.time()
+        rows = [
+            (now, source, *row[:5], int(row[5]), float(heating), float(cooling))
+            for row, heating, cooling in zip(np.asarray(features, dtype=np.float64).tolist(), heating_loads, cooling_loads)
+        ]
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                f"INSERT INTO measurements (received_at, source, {', '.join(FEATURE_COLUMNS)}, heating_load, cooling_load) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            last = db.execute("SELECT MAX(id) FROM measurements").fetchone()[0]
+            db.execute("COMMIT")
+        return last
+
+    def load(self, upto=None):
+        """
+        Measurements up to an id
+
+        Returns:
+            tuple: (ids, features, heating_loads, cooling_loads) arrays
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT id, {', '.join(FEATURE_COLUMNS)}, heating_load, cooling_load FROM measurements "
+                "WHERE id <= ? ORDER BY id",
+                (upto if upto is not None else np.iinfo(np.int64).max,)
+            ).fetchall()
+        matrix = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(len(rows), len(FEATURE_COLUMNS) + 3)
+        return matrix[:, 0].astype(np.int64), matrix[:, 1:-2], matrix[:, -2], matrix[:, -1]
+
+    def trained_upto(self, db=None):
+        """Last measurement id covered by a finished run"""
+        if db is None:
+            with self._connect() as db:
+                return self.trained_upto(db)
+        return db.execute(
+            "SELECT COALESCE(MAX(measurements_upto), 0) FROM training_runs WHERE status IN ('published', 'rejected')"
+        ).fetchone()[0]
+
+    def pending(self):
+        """Measurements not yet covered by a finished run"""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM measurements WHERE id > ?", (self.trained_upto(db),)).fetchone()[0]
+
+    def claim_run(self, owner, min_measurements, interval, lease_seconds):
+        """
+        Start a training run if one is due and no other process is running one
+
+        Args:
+            owner: Id of the claiming process
+            min_measurements: New measurements needed
+            interval: Seconds that must have passed since the last run started
+            lease_seconds: Heartbeat age after which a running run is abandoned
+
+        Returns:
+            sqlite3.Row: The claimed run, or None
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "UPDATE training_runs SET status = 'failed', error = 'lease expired', finished_at = ? "
+                    "WHERE status = 'running' AND heartbeat_at < ?",
+                    (now, now - lease_seconds)
+                )
+                busy = db.execute(
+                    "SELECT COUNT(*) FROM training_runs WHERE status = 'running' OR started_at > ?", (now - interval,)
+                ).fetchone()[0]
+                upto = db.execute("SELECT COALESCE(MAX(id), 0) FROM measurements").fetchone()[0]
+                new = db.execute("SELECT COUNT(*) FROM measurements WHERE id > ?", (self.trained_upto(db),)).fetchone()[0]
+                if busy or new == 0 or new < min_measurements:
+                    return None
+                run_id = db.execute(
+                    "INSERT INTO training_runs (status, owner, heartbeat_at, started_at, measurements_upto) "
+                    "VALUES ('running', ?, ?, ?, ?)",
+                    (owner, now, now, upto)
+                ).lastrowid
+                return db.execute("SELECT * FROM training_runs WHERE id = ?", (run_id,)).fetchone()
+            finally:
+                db.execute("COMMIT")
+
+    def heartbeat(self, run_id, owner):
+        """Extend a run's lease; False if another process took it over"""
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE training_runs SET heartbeat_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (time.time(), run_id, owner)
+            ).rowcount == 1
+
+    def finish_run(self, run_id, owner, status, version=None, report=None, error=None):
+        """Record a run's outcome"""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE training_runs SET status = ?, version = ?, report = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND owner = ?",
+                (status, version, json.dumps(report) if report is not None else None, error, time.time(), run_id, owner)
+            )
+
+    def runs(self, limit=10):
+        """Most recent training runs, newest first"""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM training_runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [
+            {
+                "run_id": row["id"],
+                "status": row["status"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+                "measurements_upto": row["measurements_upto"],
+                "version": row["version"],
+                "report": json.loads(row["report"]) if row["report"] else None,
+                "error": row["error"]
+            }
+            for row in rows
+        ]
+
+    def count(self):
+        """Number of stored measurements"""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+
+def manifest_path(directory=RETRAIN_DIR):
+    return os.path.join(directory, "current.json")
+
+def read_manifest(directory=RETRAIN_DIR):
+    """The published model version, or None while the shipped models are current"""
+    if not directory:
+        return None
+    try:
+        with open(manifest_path(directory)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not (os.path.exists(manifest["heating"]) and os.path.exists(manifest["cooling"])):
+        return None
+    return manifest
+
+def current_model_files(model_dir=MODEL_DIR, directory=RETRAIN_DIR):
+    """
+    Heating and cooling model files to serve
+
+    Returns:
+        tuple: (heating_path, cooling_path, manifest), the published version
+            when there is one, else the shipped files and None
+    """
+    manifest = read_manifest(directory)
+    if manifest is not None:
+        return manifest["heating"], manifest["cooling"], manifest
+    return os.path.join(model_dir, "heating_AL.pkl"), os.path.join(model_dir, "cooling_AL.pkl"), None
+
+def _rmse(model, X, y):
+    if len(y) == 0:
+        return None
+    return float(np.sqrt(np.mean((np.asarray(model.predict(X), dtype=np.float64) - y) ** 2)))
+
+def _with_missing_params(model):
+    """
+    Copy of a model unpickled from an older library version, with the
+    constructor parameters added since set to their defaults, so it clones
+    """
+    model = copy.copy(model)
+    for cls in type(model).__mro__:
+        if "__init__" not in cls.__dict__:
+            continue
+        for name, parameter in inspect.signature(cls.__init__).parameters.items():
+            if parameter.default is not inspect.Parameter.empty and not hasattr(model, name):
+                setattr(model, name, parameter.default)
+    return model
+
+def _refit(model, X, y, threads):
+    """Fresh copy of the model with its hyperparameters, fitted on X and y"""
+    try:
+        candidate = clone(model)
+    except AttributeError:
+        candidate = clone(_with_missing_params(model))
+    params = candidate.get_params()
+    if "n_jobs" in params:
+        candidate.set_params(n_jobs=threads)
+    candidate.fit(X, y)
+    if "n_jobs" in params:
+        candidate.set_params(n_jobs=params["n_jobs"])
+    return candidate
+
+def _within(after, before, tolerance):
+    return before is None or after is None or after <= before * (1 + tolerance)
+
+def _write_pickle(path, value):
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(value, f)
+    os.replace(path + ".tmp", path)
+
+def _publish(directory, run_id, heating, cooling, manifest):
+    """Write a version's model files, then point current.json at them"""
+    version_dir = os.path.join(directory, "models", f"run-{run_id:05d}")
+    os.makedirs(version_dir, exist_ok=True)
+    manifest = dict(manifest, heating=os.path.join(version_dir, "heating_AL.pkl"), cooling=os.path.join(version_dir, "cooling_AL.pkl"))
+    _write_pickle(manifest["heating"], heating)
+    _write_pickle(manifest["cooling"], cooling)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+    with os.fdopen(handle, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temporary, manifest_path(directory))
+
+    versions = sorted(os.listdir(os.path.join(directory, "models")))
+    for stale in versions[:-RETRAIN_KEEP]:
+        shutil.rmtree(os.path.join(directory, "models", stale), ignore_errors=True)
+    return manifest
+
+def train_and_publish(run_id, measurements_upto, directory=RETRAIN_DIR, model_dir=MODEL_DIR,
+                      tolerance=RETRAIN_TOLERANCE, threads=RETRAIN_THREADS):
+    """
+    Refit every served model on ENB2012 plus the field measurements, validate and publish
+
+    Runs in the training process. Each model is refitted from scratch with
+    its own hyperparameters on the ENB2012 training split plus the training
+    measurements, then compared with the serving model on the ENB2012
+    held-out split and on the held-out measurements. A refitted model is
+    published only if it is within `tolerance` of the serving model's RMSE
+    on both; otherwise the serving model is carried over.
+
+    Args:
+        run_id: Training run id, names the published version
+        measurements_upto: Last measurement id to train on
+        directory: Retraining directory
+        model_dir: Directory of the shipped models and transformer
+        tolerance: Relative RMSE increase allowed on either validation set
+        threads: CPU threads the refits may use
+
+    Returns:
+        dict: {"status": "published" or "rejected", "manifest", "validation"}
+    """
+    store = MeasurementStore(directory)
+    ids, features, heating_loads, cooling_loads = store.load(measurements_upto)
+    with open(os.path.join(model_dir, "col_transformer.pkl"), "rb") as f:
+        transformer = pickle.load(f)
+    heating_path, cooling_path, _ = current_model_files(model_dir, directory)
+    current = {}
+    for target, path in (("heating", heating_path), ("cooling", cooling_path)):
+        with open(path, "rb") as f:
+            current[target] = pickle.load(f)
+
+    def scale(matrix):
+        return np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(matrix)), dtype=np.float64)
+
+    dataset = load_dataset()
+    test = holdout_indices(len(dataset))
+    train = np.setdiff1d(np.arange(len(dataset)), test)
+    field_test = ids % FIELD_HOLDOUT_EVERY == 0
+    X_train = scale(np.vstack([dataset.features[train], features[~field_test]]))
+    X_reference = scale(dataset.features[test])
+    # Fewer than FIELD_HOLDOUT_EVERY measurements hold none out; _rmse then reports no field RMSE
+    X_field = scale(features[field_test]) if field_test.any() else None
+
+    published = {"heating": {}, "cooling": {}}
+    validation = []
+    for target, label, loads in (("heating", "Heating Load", heating_loads), ("cooling", "Cooling Load", cooling_loads)):
+        reference = dataset.column(label)
+        y_train = np.concatenate([reference[train], loads[~field_test]])
+        for name, model in current[target].items():
+            entry = {"target": target, "model": name}
+            try:
+                candidate = _refit(model, X_train, y_train, threads)
+            except Exception as e:
+                published[target][name] = model
+                validation.append(dict(entry, accepted=False, reason=f"not refittable: {e}"))
+                continue
+            entry.update(
+                reference_rmse_before=_rmse(model, X_reference, reference[test]),
+                reference_rmse_after=_rmse(candidate, X_reference, reference[test]),
+                field_rmse_before=_rmse(model, X_field, loads[field_test]),
+                field_rmse_after=_rmse(candidate, X_field, loads[field_test])
+            )
+            entry["accepted"] = _within(entry["reference_rmse_after"], entry["reference_rmse_before"], tolerance) \
+                and _within(entry["field_rmse_after"], entry["field_rmse_before"], tolerance)
+            published[target][name] = candidate if entry["accepted"] else model
+            validation.append(entry)
+
+    if not any(entry["accepted"] for entry in validation):
+        return {"status": "rejected", "manifest": None, "validation": validation}
+
+    # Latency is measured here, away from the serving process; students are ranked alongside as served
+    ranked = {target: dict(models) for target, models in published.items()}
+    distilled_path = os.path.join(model_dir, "distilled.pkl")
+    if os.path.exists(distilled_path):
+        with open(distilled_path, "rb") as f:
+            distilled = pickle.load(f)
+        for target in ranked:
+            ranked[target].setdefault("Distilled", distilled[target])
+    manifest = _publish(directory, run_id, published["heating"], published["cooling"], {
+        "run_id": run_id,
+        "published_at": time.time(),
+        "measurements_upto": int(measurements_upto),
+        "measurements": int(len(ids)),
+        "evaluation": evaluate_models(transformer, ranked["heating"], ranked["cooling"], dataset)
+    })
+    return {"status": "published", "manifest": manifest, "validation": validation}
+
+def _training_process_init(threads, niceness):
+    # Lowest priority and a fixed thread budget: serving keeps the CPU it had before
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(threads)
+
+class Retrainer:
+    """
+    Background retraining and hot swap of the served models
+
+    A poll thread in every server process swaps in newly published versions
+    through `on_publish`, and starts a training run once enough new
+    measurements are stored and the interval has passed. Only one process
+    trains at a time (runs are leased in SQLite), and training happens in a
+    separate low-priority process, so request threads only ever see a
+    reference swap of fully loaded models.
+    """
+
+    def __init__(self, on_publish, directory=RETRAIN_DIR, model_dir=MODEL_DIR, interval=RETRAIN_INTERVAL_SECONDS,
+                 min_measurements=RETRAIN_MIN_MEASUREMENTS, tolerance=RETRAIN_TOLERANCE,
+                 lease_seconds=RETRAIN_LEASE_SECONDS, threads=RETRAIN_THREADS, niceness=RETRAIN_NICE,
+                 poll_seconds=5.0, in_process=False, registry=None):
+        self.on_publish = on_publish
+        self.directory = directory
+        self.model_dir = model_dir
+        self.interval = interval
+        self.min_measurements = min_measurements
+        self.tolerance = tolerance
+        self.lease_seconds = lease_seconds
+        self.threads = threads
+        self.niceness = niceness
+        self.poll_seconds = poll_seconds
+        self.in_process = in_process
+        self.store = MeasurementStore(directory)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.current_run = None
+        self._force = False
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.registry = registry or default_registry
+        self.registry.counter("measurements_ingested_total", "Field measurements stored for retraining")
+        self.registry.counter("retraining_runs_total", "Training runs by outcome")
+
+    def start(self):
+        """Start the poll thread once"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="retrainer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop polling; a run in progress finishes in its own process"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._stop.clear()
+
+    def ingest(self, features, heating_loads, cooling_loads, source=None):
+        """Store measurements and wake the poll thread"""
+        last = self.store.append(features, heating_loads, cooling_loads, source)
+        self.registry.inc("measurements_ingested_total", value=len(features))
+        self._wake.set()
+        return last
+
+    def trigger(self):
+        """Train on the next poll regardless of the interval and minimum"""
+        self._force = True
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_published()
+                self.maybe_train()
+            except Exception as e:
+                log_event(logger, "retraining.poll_failed", f"Retraining poll failed: {e}", level=logging.ERROR, exc_info=True)
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def check_published(self):
+        """Hand a newly published version to on_publish"""
+        manifest = read_manifest(self.directory)
+        if manifest is not None and manifest["run_id"] != self.current_run:
+            self.on_publish(manifest)
+            self.current_run = manifest["run_id"]
+
+    def maybe_train(self):
+        """
+        Run one training if it is due and this process wins the claim
+
+        Returns:
+            dict: The run's result, or None when no run was started
+        """
+        force, self._force = self._force, False
+        run = self.store.claim_run(
+            self.owner, 1 if force else self.min_measurements, 0 if force else self.interval, self.lease_seconds
+        )
+        if run is None:
+            return None
+        log_event(logger, "retraining.started", f"Training run {run['id']} started", run_id=run["id"], measurements_upto=run["measurements_upto"])
+        args = (run["id"], run["measurements_upto"], self.directory, self.model_dir, self.tolerance, self.threads)
+        try:
+            result = train_and_publish(*args) if self.in_process else self._train_in_process(run["id"], args)
+        except Exception as e:
+            self.store.finish_run(run["id"], self.owner, "failed", error=str(e))
+            self.registry.inc("retraining_runs_total", {"status": "failed"})
+            log_event(logger, "retraining.failed", f"Training run {run['id']} failed: {e}", level=logging.ERROR, run_id=run["id"])
+            return {"status": "failed", "error": str(e)}
+
+        version = f"run-{run['id']:05d}" if result["status"] == "published" else None
+        self.store.finish_run(run["id"], self.owner, result["status"], version, {"validation": result["validation"]})
+        self.registry.inc("retraining_runs_total", {"status": result["status"]})
+        log_event(
+            logger, "retraining.finished", f"Training run {run['id']} {result['status']}", run_id=run["id"], status=result["status"],
+            accepted=[f"{entry['target']}/{entry['model']}" for entry in result["validation"] if entry["accepted"]]
+        )
+        if result["status"] == "published":
+            self.check_published()
+        return result
+
+    def _train_in_process(self, run_id, args):
+        """Train in a fresh spawned process, heartbeating the run while waiting"""
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_training_process_init, initargs=(self.threads, self.niceness)
+        ) as executor:
+            future = executor.submit(train_and_publish, *args)
+            while True:
+                try:
+                    return future.result(timeout=max(self.lease_seconds / 3, 0.1))
+                except FutureTimeout:
+                    self.store.heartbeat(run_id, self.owner)
+
+    def status(self):
+        """Measurement counts, the published version and recent runs"""
+        manifest = read_manifest(self.directory)
+        return {
+            "measurements": self.store.count(),
+            "pending": self.store.pending(),
+            "published": {
+                key: manifest[key] for key in ("run_id", "published_at", "measurements_upto", "measurements")
+            } if manifest else None,
+            "settings": {
+                "interval_seconds": self.interval,
+                "min_measurements": self.min_measurements,
+                "tolerance": self.tolerance
+            },
+            "runs": self.store.runs()
+        }
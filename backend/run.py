@@ -3,7 +3,11 @@
 Run script for the Energy Efficiency Prediction API
 This script:
 1. Can initialize models for Docker builds
-2. Can start the Flask API server
+2. Can report on the SVM fast-path approximation
+3. Can write compacted copies of the model files
+4. Can distill a teacher model into a fast student
+5. Can rank the models by held-out accuracy and latency
+6. Can start the Flask API server
 """
 
 import os
@@ -21,6 +25,11 @@ from sklearn.neighbors import KNeighborsRegressor
 from sklearn.pipeline import make_pipeline
 from xgboost import XGBRegressor
 import importlib.util
+import logging
+
+from structured_logging import get_logger, log_event, setup_logging
+
+logger = get_logger("run")
 
 def check_module_installed(module_name):
     """Check if a module is installed"""
@@ -32,7 +41,7 @@ def generate_models():
     MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
     os.makedirs(MODEL_DIR, exist_ok=True)
     
-    print("Generating models for Docker build...")
+    log_event(logger, "models.generating", "Generating models for Docker build...")
     
     # Sample data for training
     sample_data = [
@@ -151,36 +160,196 @@ def generate_models():
     with open(os.path.join(MODEL_DIR, "cooling_AL.pkl"), "wb") as f:
         pickle.dump(cooling_models, f)
     
-    print(f"Successfully generated models. Heating models: {list(heating_models.keys())}")
-    print(f"Successfully generated models. Cooling models: {list(cooling_models.keys())}")
+    log_event(
+        logger, "models.generated", "Successfully generated models",
+        heating_models=list(heating_models.keys()),
+        cooling_models=list(cooling_models.keys())
+    )
+    
+    return True
+
+def svr_report(rows):
+    """Compare the SVM models with their fast-path approximations on ENB2012"""
+    from svr_approx import approximation_report, fit_svr_approximation
+    from data import load_dataset
+    
+    MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+    with open(os.path.join(MODEL_DIR, "col_transformer.pkl"), "rb") as f:
+        transformer = pickle.load(f)
+    svrs = {}
+    for target in ("heating", "cooling"):
+        with open(os.path.join(MODEL_DIR, f"{target}_AL.pkl"), "rb") as f:
+            exact = pickle.load(f)["SVM"]
+        svrs[target] = (exact, fit_svr_approximation(exact))
+    
+    print(f"{'target':<8} {'kernel':<7} {'method':<11} {'dims':>5} {'SVs':>5} {'max |diff|':>11} "
+          f"{'RMSE exact':>11} {'RMSE approx':>12} {'exact ms':>9} {'approx ms':>10} {'speedup':>8}")
+    for entry in approximation_report(transformer, svrs, load_dataset(), rows=rows):
+        print(f"{entry['target']:<8} {entry['kernel']:<7} {entry['method']:<11} {entry['components']:>5} "
+              f"{entry['support_vectors']:>5} {entry['max_abs_diff']:>11.2e} {entry['rmse_exact']:>11.3f} "
+              f"{entry['rmse_approx']:>12.3f} {entry['exact_ms']:>9.2f} {entry['approx_ms']:>10.2f} "
+              f"{entry['speedup']:>7.1f}x")
+    print(f"Timings are the best of 5 runs on {rows} rows; RMSE is against the ENB2012 loads.")
+    return True
+
+def compact(tolerance, max_trees, suffix):
+    """Write compacted copies of heating_AL.pkl and cooling_AL.pkl and report the deltas"""
+    from compaction import compact_models, compaction_report
+    from data import load_dataset
+    from utils import INPUT_SCHEMA
+    
+    if not suffix:
+        log_event(logger, "compaction.invalid_suffix", "An output suffix is required so the original model files are kept", level=logging.ERROR)
+        return False
+    
+    MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+    with open(os.path.join(MODEL_DIR, "col_transformer.pkl"), "rb") as f:
+        transformer = pickle.load(f)
+    dataset = load_dataset()
+    reference = transformer.transform(INPUT_SCHEMA.to_frame(dataset.features))
+    
+    for target, column in (("heating", "Heating Load"), ("cooling", "Cooling Load")):
+        source = os.path.join(MODEL_DIR, f"{target}_AL.pkl")
+        output = os.path.join(MODEL_DIR, f"{target}_AL{suffix}.pkl")
+        with open(source, "rb") as f:
+            original = pickle.load(f)
+        compacted = compact_models(original, reference, tolerance, max_trees)
+        with open(output, "wb") as f:
+            pickle.dump(compacted, f)
+        
+        print(f"\n{os.path.basename(source)} ({os.path.getsize(source):,} bytes) -> "
+              f"{os.path.basename(output)} ({os.path.getsize(output):,} bytes)")
+        print(f"{'model':<20} {'size before':>12} {'size after':>11} {'memory before':>14} {'memory after':>13} "
+              f"{'RMSE before':>12} {'RMSE after':>11} {'max |diff|':>11}")
+        for entry in compaction_report(transformer, original, compacted, dataset, column):
+            if not entry["compacted"]:
+                continue
+            print(f"{entry['model']:<20} {entry['size_before']:>12,} {entry['size_after']:>11,} "
+                  f"{entry['memory_before']:>14,} {entry['memory_after']:>13,} {entry['rmse_before']:>12.4f} "
+                  f"{entry['rmse_after']:>11.4f} {entry['max_abs_diff']:>11.4f}")
+    print("\nRMSE is against the ENB2012 loads; max |diff| is between the original and compacted predictions.")
+    return True
+
+def distill_models(teacher_name, kind, depth, samples):
+    """Distill a teacher model per target into models/distilled.pkl and report fidelity and speed"""
+    from data import load_dataset
+    from distill import distill, distillation_report, sample_input_space
+    
+    MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+    with open(os.path.join(MODEL_DIR, "col_transformer.pkl"), "rb") as f:
+        transformer = pickle.load(f)
+    dataset = load_dataset()
+    training = sample_input_space(transformer, dataset.features, size=samples)
+    holdout = sample_input_space(transformer, dataset.features, size=max(samples // 4, 1), random_state=1)[-max(samples // 4, 1):]
+    
+    pairs = {}
+    for target in ("heating", "cooling"):
+        with open(os.path.join(MODEL_DIR, f"{target}_AL.pkl"), "rb") as f:
+            teachers = pickle.load(f)
+        if teacher_name not in teachers:
+            log_event(logger, "distill.unknown_teacher", f"{target}_AL.pkl has no model named {teacher_name}", level=logging.ERROR)
+            return False
+        pairs[target] = (teachers[teacher_name], distill(teachers[teacher_name], training, kind, max_depth=depth, teacher_name=teacher_name))
+    
+    output = os.path.join(MODEL_DIR, "distilled.pkl")
+    with open(output, "wb") as f:
+        pickle.dump({target: student for target, (_, student) in pairs.items()}, f)
+    
+    print(f"{os.path.basename(output)} ({os.path.getsize(output):,} bytes): {kind} students of {teacher_name} "
+          f"fitted on {len(training):,} samples")
+    print(f"{'target':<8} {'RMSE vs teacher':>16} {'max |diff|':>11} {'holdout RMSE':>13} {'RMSE teacher':>13} "
+          f"{'RMSE student':>13} {'teacher ms':>11} {'student ms':>11} {'speedup':>8}")
+    for entry in distillation_report(transformer, pairs, dataset, holdout):
+        print(f"{entry['target']:<8} {entry['rmse_vs_teacher']:>16.4f} {entry['max_abs_diff']:>11.4f} "
+              f"{entry['holdout_rmse_vs_teacher']:>13.4f} {entry['rmse_teacher']:>13.4f} {entry['rmse_student']:>13.4f} "
+              f"{entry['teacher_ms']:>11.2f} {entry['student_ms']:>11.2f} {entry['speedup']:>7.1f}x")
+    print("RMSE vs teacher and max |diff| are on ENB2012, holdout RMSE on fresh uniform samples; "
+          "RMSE teacher/student is against the ENB2012 loads. Timings are the best of 5 runs on 10000 rows.")
+    return True
+
+def leaderboard():
+    """Measure every model on the held-out ENB2012 split, refresh the cache and print the ranking"""
+    import app as app_module
+    from data import load_dataset
+    from evaluation import ModelEvaluation
+    
+    if not app_module.load_models():
+        log_event(logger, "leaderboard.no_models", "Models could not be loaded", level=logging.ERROR)
+        return False
+    state = app_module.serving
+    evaluation = ModelEvaluation.build(
+        state.transformer, state.heating, state.cooling, load_dataset(), state.version, refresh=True
+    )
     
+    print(f"{'model':<20} {'heat RMSE':>10} {'heat MAE':>9} {'cool RMSE':>10} {'cool MAE':>9} "
+          f"{'1 row ms':>9} {'us/row':>8} {'score':>7}")
+    for entry in evaluation.leaderboard:
+        print(f"{entry['model']:<20} {entry['heating']['rmse']:>10.3f} {entry['heating']['mae']:>9.3f} "
+              f"{entry['cooling']['rmse']:>10.3f} {entry['cooling']['mae']:>9.3f} {entry['single_row_ms']:>9.3f} "
+              f"{entry['per_row_us']:>8.2f} {entry['score']:>7.3f}{'' if entry['eligible'] else '  (over latency limit)'}")
+    print(f"Default model: {evaluation.default_model} (latency weight {evaluation.latency_weight}). "
+          f"Errors are on the held-out 20% of ENB2012; us/row is from {evaluation.leaderboard[0]['batch_rows']}-row batches.")
     return True
 
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Run Energy Efficiency API")
     parser.add_argument("--models-init", action="store_true", help="Initialize models for Docker build")
+    parser.add_argument("--svr-report", action="store_true", help="Report accuracy and speed of the SVM fast path and exit")
+    parser.add_argument("--report-rows", type=int, default=10000, help="Batch size timed by --svr-report")
+    parser.add_argument("--compact", action="store_true", help="Write compacted copies of the model files and exit")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="RMSE allowed between the pruned and the full random forest")
+    parser.add_argument("--max-trees", type=int, default=None, help="Upper bound on the random forest trees kept by --compact")
+    parser.add_argument("--suffix", default="_compact", help="Suffix of the files written by --compact")
+    parser.add_argument("--distill", action="store_true", help="Distill a teacher model into models/distilled.pkl and exit")
+    parser.add_argument("--teacher", default="XGBoost", help="Model distilled by --distill")
+    parser.add_argument("--student", choices=["tree", "polynomial"], default="tree", help="Student kind fitted by --distill")
+    parser.add_argument("--depth", type=int, default=14, help="Depth of tree students")
+    parser.add_argument("--samples", type=int, default=40000, help="Uniform samples labelled by the teacher, on top of the ENB2012 level grid")
+    parser.add_argument("--leaderboard", action="store_true", help="Rank the models by held-out accuracy and latency and exit")
     parser.add_argument("--port", "-p", type=int, default=5000, help="Port to run the API server on")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind the API server to")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
     
     args = parser.parse_args()
+    setup_logging()
     
     # If models-init is specified, generate models and exit
     if args.models_init:
         success = generate_models()
         return 0 if success else 1
     
+    if args.svr_report:
+        return 0 if svr_report(args.report_rows) else 1
+    
+    if args.compact:
+        return 0 if compact(args.tolerance, args.max_trees, args.suffix) else 1
+    
+    if args.distill:
+        return 0 if distill_models(args.teacher, args.student, args.depth, args.samples) else 1
+    
+    if args.leaderboard:
+        return 0 if leaderboard() else 1
+    
     # Otherwise, import app and run it
-    from app import app, load_models
+    from app import app, load_models, start_chart_renderers, start_job_workers, start_retrainer
     
     # Load models
     loaded = load_models()
     if not loaded:
-        print("Warning: Models could not be loaded. The API will use fallback calculations.")
+        log_event(logger, "models.unavailable", "Models could not be loaded. The API will use fallback calculations.", level=logging.WARNING)
+    
+    # Resume background jobs left unfinished by a restart
+    start_job_workers()
+    
+    # Spawn and warm up the chart renderers
+    start_chart_renderers()
+    
+    # Swap in retrained models as they are published and train when measurements arrive
+    start_retrainer()
     
     # Run the Flask app
-    print(f"Starting API server on {args.host}:{args.port}")
+    log_event(logger, "server.starting", f"Starting API server on {args.host}:{args.port}", host=args.host, port=args.port)
     app.run(host=args.host, port=args.port, debug=args.debug)
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+from evaluation import FALLBACK_DEFAULT_MODEL
+
+class ServingState:
+    """
+    One served model version: the models, their SVM approximations, the
+    version hash, the training run and the leaderboard
+
+    Built in full before it is served and never modified afterwards. A new
+    version replaces the whole object, so a request that reads the current
+    state once sees the models, approximations and version of one release.
+    """
+
+    def __init__(self, transformer=None, heating=None, cooling=None, version=None, run_id=None,
+                 approximations=None, evaluation=None):
+        self.transformer = transformer
+        self.heating = heating if heating is not None else {}
+        self.cooling = cooling if cooling is not None else {}
+        self.version = version
+        self.run_id = run_id
+        self.approximations = approximations if approximations is not None else {}
+        self.evaluation = evaluation
+
+    @property
+    def loaded(self):
+        """Whether the transformer and both model dicts are loaded"""
+        return self.transformer is not None
+
+    @property
+    def default_model(self):
+        """Model used when a request does not name one, chosen from the leaderboard"""
+        return self.evaluation.default_model if self.evaluation is not None else FALLBACK_DEFAULT_MODEL
+
+    def approximates(self, model_name):
+        """Whether both targets of this model have an approximation fitted"""
+        return model_name == "SVM" and len(self.approximations) == 2
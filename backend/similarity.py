@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from utils import INPUT_SCHEMA
+
+# Dataset columns returned for every match, as (response key, dataset column)
+MATCH_FIELDS = [
+    ("relativeCompactness", "Relative Compactness"),
+    ("surfaceArea", "Surface Area"),
+    ("wallArea", "Wall Area"),
+    ("roofArea", "Roof Area"),
+    ("overallHeight", "Overall Height"),
+    ("orientation", "Orientation"),
+    ("glazingArea", "Glazing Area"),
+    ("glazingAreaDistribution", "Glazing Area Distribution"),
+    ("heatingLoad", "Heating Load"),
+    ("coolingLoad", "Cooling Load")
+]
+
+class SimilarityIndex:
+    """
+    Nearest ENB2012 buildings in the served transformer's feature space
+
+    The KD-tree is built once over the scaled training rows, so a query only
+    scales the inputs and walks the tree.
+    """
+
+    def __init__(self, transformer, dataset, leaf_size=16):
+        """
+        Build the index
+
+        Args:
+            transformer: Fitted column transformer used by the models
+            dataset: ENB2012 Dataset from data.load_dataset
+            leaf_size: KD-tree leaf size
+        """
+        self.transformer = transformer
+        self.values = dataset.select([column for _, column in MATCH_FIELDS])
+        scaled = np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(dataset.features)), dtype=np.float64)
+        self.tree = KDTree(scaled, leaf_size=leaf_size)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def query(self, features, k=5):
+        """
+        Find the k nearest dataset rows for every input row
+
+        Args:
+            features: Feature matrix in INPUT_SCHEMA column order
+            k: Number of neighbours
+
+        Returns:
+            tuple: (distances, indices, query_ms), both arrays of shape (n, k)
+        """
+        scaled = np.asarray(self.transformer.transform(INPUT_SCHEMA.to_frame(features)), dtype=np.float64)
+        started = time.perf_counter()
+        distances, indices = self.tree.query(scaled, k=min(k, len(self)))
+        return distances, indices, (time.perf_counter() - started) * 1000
+
+    def matches(self, distances, indices):
+        """Convert query results to one list of match dicts per input row"""
+        rows = self.values[indices]
+        return [
+            [
+                dict(
+                    {"index": int(index), "distance": round(float(distance), 4)},
+                    **{key: float(value) for (key, _), value in zip(MATCH_FIELDS, row)}
+                )
+                for distance, index, row in zip(row_distances, row_indices, row_values)
+            ]
+            for row_distances, row_indices, row_values in zip(distances, indices, rows)
+        ]
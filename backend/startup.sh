@@ -43,5 +43,5 @@ if [ "$FLASK_ENV" = "development" ]; then
   python app.py
 else
   echo "Starting production server"
-  gunicorn --bind 0.0.0.0:${PORT:-5000} wsgi:app
+  gunicorn --bind 0.0.0.0:${PORT:-5000} --threads ${GUNICORN_THREADS:-8} --backlog 64 wsgi:app
 fi 
\ No newline at end of file
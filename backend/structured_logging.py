@@ -0,0 +1,198 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+LOGGER_NAME = "energy_api"
+
+# Fraction of records kept per event; events not listed are always kept
+DEFAULT_SAMPLING = {
+    "request.completed": 0.1,
+    "prediction.model_chosen": 0.1
+}
+
+# Error records allowed per event and interval before suppression
+ERROR_RATE_LIMIT = (5, 60.0)
+
+# Records waiting for the writer thread; new records are dropped when full
+QUEUE_SIZE = 10000
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # QueueHandler.prepare appends the traceback to the message and drops exc_info;
+        # render it into exc_text instead, while the traceback still exists
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+class RequestContextFilter(logging.Filter):
+    """Attach the request id and route while still on the request thread"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, "request_id", None)
+            record.route = request.path
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a configured fraction of records per event"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "event", None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Allow at most a number of error records per event and interval
+
+    The first record after a suppressed stretch carries the number of
+    records that were dropped.
+    """
+
+    def __init__(self, limit, interval):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.ERROR:
+            return True
+        key = getattr(record, "event", None) or record.getMessage()
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (started, count, suppressed + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage()
+        }
+        for name in ("request_id", "route", "suppressed"):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+_traceback_formatter = logging.Formatter()
+
+def parse_sampling(text):
+    """Parse "event=rate,event=rate" into a dict of rates"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+_listener = None
+_queue_handler = None
+
+def setup_logging(stream=None):
+    """
+    Route the API's logs through a bounded queue to a background writer
+
+    Safe to call more than once. LOG_LEVEL sets the level and LOG_SAMPLING
+    ("event=rate,...") overrides the default sampling rates.
+
+    Args:
+        stream: Output stream for the JSON lines, stdout by default
+
+    Returns:
+        logging.Logger: The API's root logger
+    """
+    global _listener, _queue_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    rates = dict(DEFAULT_SAMPLING)
+    rates.update(parse_sampling(os.environ.get("LOG_SAMPLING", "")))
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(rates))
+    _queue_handler.addFilter(ErrorRateLimitFilter(*ERROR_RATE_LIMIT))
+    _queue_handler.addFilter(RequestContextFilter())
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.addHandler(_queue_handler)
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    return logger
+
+def dropped_records():
+    """Number of records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def get_logger(name):
+    """Child logger of the API logger"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+def log_event(logger, event, message, level=logging.INFO, exc_info=False, **fields):
+    """
+    Log a structured event
+
+    Args:
+        logger: Logger from get_logger
+        event: Dotted event name, used for sampling and rate limiting
+        message: Human readable message
+        level: Logging level
+        exc_info: Attach the current exception
+        **fields: Extra JSON fields such as model or duration_ms
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, exc_info=exc_info, extra={"event": event, "fields": fields})
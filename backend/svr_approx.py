@@ -0,0 +1,150 @@
+import time
+
+import numpy as np
+from sklearn.kernel_approximation import Nystroem
+from sklearn.preprocessing import PolynomialFeatures
+
+from utils import INPUT_SCHEMA
+
+# Landmarks kept for kernels without a finite feature map (RBF, sigmoid)
+DEFAULT_COMPONENTS = 128
+
+# Points sampled from the scaled feature box to fit the linear weights
+DEFAULT_SAMPLES = 4000
+
+class ApproximateSVR:
+    """
+    Explicit feature map plus linear weights standing in for a fitted SVR
+
+    Prediction is one feature-map transform and one matrix-vector product,
+    independent of the number of support vectors.
+    """
+
+    def __init__(self, feature_map, coef, intercept, kernel, method):
+        self.feature_map = feature_map
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.kernel = kernel
+        self.method = method
+
+    @property
+    def n_components(self):
+        return self.coef_.shape[0]
+
+    def predict(self, X):
+        """Predict like SVR.predict for scaled inputs"""
+        return self.feature_map.transform(np.asarray(X, dtype=np.float64)) @ self.coef_ + self.intercept_
+
+    def describe(self):
+        """Summary for API responses and reports"""
+        return {"kernel": self.kernel, "method": self.method, "components": self.n_components}
+
+def sample_feature_space(svr, size=DEFAULT_SAMPLES, random_state=0):
+    """
+    Points covering the region the SVR is queried on
+
+    Uniform samples over the bounding box of the support vectors (the scaled
+    training range), followed by the support vectors themselves.
+    """
+    support = np.asarray(svr.support_vectors_, dtype=np.float64)
+    low, high = support.min(axis=0), support.max(axis=0)
+    rng = np.random.default_rng(random_state)
+    return np.vstack([rng.uniform(low, high, size=(size, support.shape[1])), support])
+
+def fit_svr_approximation(svr, samples=None, n_components=DEFAULT_COMPONENTS, random_state=0):
+    """
+    Fit an explicit feature map approximation of an SVR against its own predictions
+
+    Polynomial kernels (gamma * x.y + coef0) ** degree are polynomials of the
+    input, so the monomials up to that degree reproduce them exactly. Other
+    kernels use a Nystroem map with landmarks drawn from the support vectors.
+
+    Args:
+        svr: Fitted sklearn SVR
+        samples: Scaled inputs to fit on, sample_feature_space(svr) by default
+        n_components: Nystroem landmarks for non-polynomial kernels
+        random_state: Seed for sampling and landmark selection
+
+    Returns:
+        ApproximateSVR: The fitted approximation
+
+    Raises:
+        ValueError: If the SVR's kernel cannot be approximated
+    """
+    if samples is None:
+        samples = sample_feature_space(svr, random_state=random_state)
+    samples = np.asarray(samples, dtype=np.float64)
+
+    if svr.kernel in ("linear", "poly"):
+        degree = 1 if svr.kernel == "linear" else int(svr.degree)
+        feature_map = PolynomialFeatures(degree=degree, include_bias=False)
+        method = "polynomial"
+    elif svr.kernel in ("rbf", "sigmoid"):
+        support = np.asarray(svr.support_vectors_, dtype=np.float64)
+        feature_map = Nystroem(
+            kernel=svr.kernel, gamma=svr._gamma, coef0=svr.coef0,
+            n_components=min(n_components, support.shape[0]), random_state=random_state
+        )
+        feature_map.fit(support)
+        method = "nystroem"
+    else:
+        raise ValueError(f"Cannot approximate an SVR with a {svr.kernel!r} kernel")
+
+    phi = feature_map.fit_transform(samples) if method == "polynomial" else feature_map.transform(samples)
+    target = svr.predict(samples)
+    # Least squares on centred columns, so the intercept is solved separately
+    phi_mean, target_mean = phi.mean(axis=0), target.mean()
+    coef = np.linalg.lstsq(phi - phi_mean, target - target_mean, rcond=None)[0]
+    return ApproximateSVR(feature_map, coef, float(target_mean - phi_mean @ coef), svr.kernel, method)
+
+def _best_time(predict, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def approximation_report(transformer, svrs, dataset, rows=10000, repeats=5, random_state=0):
+    """
+    Compare exact and approximate SVR predictions for accuracy and speed
+
+    Args:
+        transformer: Fitted column transformer used by the models
+        svrs: Dict of target name -> (exact SVR, ApproximateSVR), target names
+            "heating" and "cooling" are scored against ENB2012 loads
+        dataset: ENB2012 Dataset from data.load_dataset
+        rows: Batch size used for timing
+        repeats: Timing repetitions, the best run is reported
+        random_state: Seed for the timing batch
+
+    Returns:
+        list: One dict per target with fidelity, accuracy and timing figures
+    """
+    scaled = np.asarray(transformer.transform(INPUT_SCHEMA.to_frame(dataset.features)), dtype=np.float64)
+    truth = {"heating": dataset.column("Heating Load"), "cooling": dataset.column("Cooling Load")}
+    rng = np.random.default_rng(random_state)
+    batch = scaled[rng.integers(0, len(scaled), size=rows)]
+
+    report = []
+    for target, (exact, approx) in svrs.items():
+        exact_pred, approx_pred = exact.predict(scaled), approx.predict(scaled)
+        difference = approx_pred - exact_pred
+        exact_ms = _best_time(exact.predict, batch, repeats)
+        approx_ms = _best_time(approx.predict, batch, repeats)
+        entry = dict(
+            approx.describe(),
+            target=target,
+            support_vectors=int(exact.support_vectors_.shape[0]),
+            max_abs_diff=float(np.max(np.abs(difference))),
+            rmse_vs_exact=float(np.sqrt(np.mean(difference ** 2))),
+            rows=rows,
+            exact_ms=exact_ms,
+            approx_ms=approx_ms,
+            speedup=exact_ms / approx_ms if approx_ms > 0 else float("inf")
+        )
+        if target in truth:
+            entry["rmse_exact"] = float(np.sqrt(np.mean((exact_pred - truth[target]) ** 2)))
+            entry["rmse_approx"] = float(np.sqrt(np.mean((approx_pred - truth[target]) ** 2)))
+        report.append(entry)
+    return report
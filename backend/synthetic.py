@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Synthetic building populations for scale and load testing.
+
+Samples building records from the empirical joint distribution of ENB2012
+(whole rows, so the features keep their correlations), optionally jittered
+and with a share pushed outside the ENB2012 ranges, and writes them in
+chunks to CSV, NDJSON or Parquet:
+
+    python synthetic.py --count 1000000 --output buildings.parquet --jitter 0.05 --out-of-range 0.01
+
+load_driver.py replays them against the API.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data import load_dataset
+from formats import pa, pq
+from utils import INPUT_SCHEMA
+
+SYNTHETIC_FORMATS = ("csv", "ndjson", "parquet")
+
+# Rows generated, written and read per chunk
+DEFAULT_CHUNK_ROWS = 100000
+
+# Decimals kept on jittered values, so files stay compact
+DECIMALS = 4
+
+# How far outside the ENB2012 range an out-of-range value lands, as a share of the range
+OUT_OF_RANGE_SPAN = (0.1, 0.5)
+
+def generate(count, seed=0, jitter=0.0, out_of_range=0.0, chunk_rows=DEFAULT_CHUNK_ROWS, dataset=None):
+    """
+    Sample building feature rows from ENB2012
+
+    The same arguments always give the same rows. Jittered values stay
+    inside the ENB2012 range of their column; out-of-range rows have one
+    continuous field moved outside it, in a direction the API still
+    accepts, so they reach the models and exercise the applicability domain.
+
+    Args:
+        count: Number of rows
+        seed: Random seed
+        jitter: Gaussian noise on continuous fields, as a share of each column's standard deviation
+        out_of_range: Share of rows with one field outside the ENB2012 range
+        chunk_rows: Rows per yielded chunk
+        dataset: ENB2012 Dataset, load_dataset() by default
+
+    Yields:
+        ndarray: Feature matrices in INPUT_SCHEMA column order
+    """
+    if count < 0 or chunk_rows < 1:
+        raise ValueError("count must not be negative and chunk_rows must be positive")
+    if jitter < 0 or not 0 <= out_of_range <= 1:
+        raise ValueError("jitter must not be negative and out_of_range must be between 0 and 1")
+    features = np.asarray((dataset if dataset is not None else load_dataset()).features)
+    low, high = features.min(axis=0), features.max(axis=0)
+    continuous = np.flatnonzero(~INPUT_SCHEMA.integral)
+    scale = features.std(axis=0) * jitter
+    rng = np.random.default_rng(seed)
+
+    # (column, direction) pairs with room between the ENB2012 range and the schema bounds,
+    # e.g. not below glazingArea 0; the room caps how far a value moves
+    room = np.concatenate([INPUT_SCHEMA.max_values[continuous] - high[continuous], low[continuous] - INPUT_SCHEMA.min_values[continuous]])
+    shifts = np.flatnonzero(room >= 10.0 ** (1 - DECIMALS))
+    shift_columns = np.tile(continuous, 2)[shifts]
+    shift_signs = np.repeat([1.0, -1.0], len(continuous))[shifts]
+    shift_room = room[shifts]
+
+    for start in range(0, count, chunk_rows):
+        size = min(chunk_rows, count - start)
+        chunk = features[rng.integers(0, len(features), size)]
+        if jitter > 0:
+            chunk[:, continuous] += rng.normal(0.0, scale[continuous], (size, len(continuous)))
+            np.clip(chunk, low, high, out=chunk)
+        if out_of_range > 0:
+            rows = np.flatnonzero(rng.random(size) < out_of_range)
+            picks = rng.integers(0, len(shifts), len(rows))
+            columns, signs = shift_columns[picks], shift_signs[picks]
+            width = high[columns] - low[columns]
+            largest = np.minimum(OUT_OF_RANGE_SPAN[1] * width, shift_room[picks])
+            offsets = rng.uniform(np.minimum(OUT_OF_RANGE_SPAN[0] * width, largest / 2), largest)
+            chunk[rows, columns] = np.where(signs > 0, high[columns], low[columns]) + signs * offsets
+            np.clip(chunk, INPUT_SCHEMA.min_values, INPUT_SCHEMA.max_values, out=chunk)
+        chunk[:, continuous] = np.round(chunk[:, continuous], DECIMALS)
+        yield chunk
+
+def to_frame(chunk):
+    """DataFrame keyed by request field, whole-number fields as integers"""
+    df = pd.DataFrame(chunk, columns=INPUT_SCHEMA.fields)
+    for field, integral in zip(INPUT_SCHEMA.fields, INPUT_SCHEMA.integral):
+        if integral:
+            df[field] = df[field].astype(np.int64)
+    return df
+
+def output_format(path, fmt=None):
+    """Format named explicitly or by the file extension"""
+    fmt = fmt or {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}.get(
+        os.path.splitext(path)[1].lower()
+    )
+    if fmt not in SYNTHETIC_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(SYNTHETIC_FORMATS)}")
+    if fmt == "parquet" and pq is None:
+        raise ValueError("Parquet needs pyarrow")
+    return fmt
+
+def write_chunks(chunks, path, fmt=None):
+    """
+    Write feature chunks to one file, a chunk at a time
+
+    Args:
+        chunks: Iterable of feature matrices, such as generate() output
+        path: Output file
+        fmt: "csv", "ndjson" or "parquet", from the extension if None
+
+    Returns:
+        int: Rows written
+    """
+    fmt = output_format(path, fmt)
+    rows = 0
+    writer = None
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                df = to_frame(chunk)
+                if fmt == "csv":
+                    f.write(df.to_csv(index=False, header=rows == 0).encode())
+                elif fmt == "ndjson":
+                    f.write(df.to_json(orient="records", lines=True).encode())
+                else:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    writer = writer or pq.ParquetWriter(f, table.schema)
+                    writer.write_table(table)
+                rows += len(df)
+            if writer is not None:
+                writer.close()
+    except BaseException:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
+    return rows
+
+def read_chunks(path, fmt=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read a written population back as feature chunks
+
+    Args:
+        path: File written by write_chunks (or any with the same columns)
+        fmt: "csv", "ndjson" or "parquet", from the extension if None
+        chunk_rows: Rows per yielded chunk
+
+    Yields:
+        ndarray: Feature matrices in INPUT_SCHEMA column order
+    """
+    fmt = output_format(path, fmt)
+    if fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=INPUT_SCHEMA.fields):
+            yield batch.to_pandas()[INPUT_SCHEMA.fields].to_numpy(dtype=np.float64)
+        return
+    if fmt == "csv":
+        reader = pd.read_csv(path, chunksize=chunk_rows, usecols=INPUT_SCHEMA.fields)
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunk_rows)
+    with reader:
+        for df in reader:
+            yield df[INPUT_SCHEMA.fields].to_numpy(dtype=np.float64)
+
+def add_generator_arguments(parser):
+    """Generator options shared with load_driver.py"""
+    parser.add_argument("--count", type=int, default=1000000, help="Buildings to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Noise on continuous fields, as a share of each column's standard deviation")
+    parser.add_argument("--out-of-range", type=float, default=0.0, help="Share of buildings with one field outside the ENB2012 range")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic buildings from ENB2012")
+    add_generator_arguments(parser)
+    parser.add_argument("--output", required=True, help="Output file (.csv, .ndjson or .parquet)")
+    parser.add_argument("--format", choices=SYNTHETIC_FORMATS, help="Output format, from the extension by default")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    chunks = generate(args.count, args.seed, args.jitter, args.out_of_range, args.chunk_rows)
+    rows = write_chunks(chunks, args.output, args.format)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {rows:,} buildings to {args.output} in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
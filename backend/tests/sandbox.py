@@ -0,0 +1,23 @@
+"""
+Point the app's on-disk state at a temporary directory for the test run.
+
+The app's module-level services read their paths from the environment at
+import time, so test modules import this before the app; the tests then
+never write prediction logs or caches into the source tree. Processes
+spawned by a test reuse the parent's directory.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+DIRECTORY = os.environ.get("TEST_STATE_DIR")
+if DIRECTORY is None:
+    DIRECTORY = os.environ["TEST_STATE_DIR"] = tempfile.mkdtemp(prefix="energy-api-tests-")
+    atexit.register(shutil.rmtree, DIRECTORY, ignore_errors=True)
+
+os.environ["PREDICTION_LOG_PATH"] = os.path.join(DIRECTORY, "prediction_log", "predictions.db")
+os.environ["EVALUATION_CACHE_PATH"] = os.path.join(DIRECTORY, "cache", "evaluation.json")
+os.environ["RESULT_CACHE_PATH"] = os.path.join(DIRECTORY, "cache", "results.db")
+os.environ["ENB2012_CACHE_DIR"] = os.path.join(DIRECTORY, "cache")
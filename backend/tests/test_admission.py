@@ -0,0 +1,128 @@
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+from app import app
+from admission import AdmissionController, default_limits
+from metrics import MetricsRegistry
+
+class AdmissionControllerTest(unittest.TestCase):
+    """Test cases for admission control and load shedding"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.controller = AdmissionController(
+            limits={"cheap": (1, 1, 0.05), "heavy": (1, 0, 0.05)},
+            registry=self.registry
+        )
+
+    def test_queue_full_is_rejected_immediately(self):
+        """Test that a full queue sheds with 429 and Retry-After"""
+        pool, rejection = self.controller.admit("heavy")
+        self.assertIsNone(rejection)
+
+        _, rejection = self.controller.admit("heavy")
+        self.assertEqual(rejection[:2], (429, "queue_full"))
+        self.assertGreaterEqual(rejection[2], 1)
+        pool.release()
+
+    def test_wait_timeout(self):
+        """Test that waiting longer than max_wait sheds with 503"""
+        pool, _ = self.controller.admit("cheap")
+        started = time.monotonic()
+        _, rejection = self.controller.admit("cheap")
+
+        self.assertEqual(rejection[0], 503)
+        self.assertLess(time.monotonic() - started, 1.0)
+        pool.release()
+
+    def test_waiter_gets_released_slot(self):
+        """Test that a queued request is admitted when a slot frees up"""
+        pool, _ = self.controller.admit("cheap")
+        threading.Timer(0.01, pool.release).start()
+
+        second, rejection = self.controller.admit("cheap")
+        self.assertIsNone(rejection)
+        second.release()
+
+    def test_heavy_work_yields_to_queued_cheap_requests(self):
+        """Test that heavy requests are shed while cheap ones are waiting"""
+        self.controller.pools["cheap"].waiting = 1
+        _, rejection = self.controller.admit("heavy")
+        self.controller.pools["cheap"].waiting = 0
+
+        self.assertEqual(rejection[1], "priority")
+
+    def test_default_limits_fit_the_threads(self):
+        """Test that cheap concurrency binds before the threads run out and heavy work stays within the budget"""
+        for threads in (2, 4, 8, 16, 32):
+            budget = threads - 1
+            limits = default_limits(budget)
+            cheap_concurrency, cheap_queue, _ = limits["cheap"]
+            heavy_concurrency, heavy_queue, _ = limits["heavy"]
+            self.assertLess(cheap_concurrency, threads)
+            self.assertLessEqual(heavy_concurrency + heavy_queue, budget)
+            self.assertLessEqual(cheap_concurrency + cheap_queue, budget)
+            if budget > 2:
+                self.assertLess(cheap_concurrency + heavy_concurrency, budget)
+
+    def test_saturation_keeps_a_thread_for_critical_routes(self):
+        """Test that running and queued requests never take the reserved thread, and heavy work yields to queued cheap requests"""
+        controller = AdmissionController(registry=MetricsRegistry(), budget=3, limits=default_limits(3))
+        heavy, _ = controller.admit("heavy")
+        cheap, _ = controller.admit("cheap")
+        queued = threading.Thread(target=lambda: controller.admit("cheap")[0].release())
+        queued.start()
+        deadline = time.monotonic() + 1
+        while controller.pools["cheap"].waiting == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(controller.pools["cheap"].waiting, 1)
+
+        # Three threads are held: another heavy request is shed for priority, another cheap one for threads
+        self.assertEqual(controller.admit("heavy")[1][:2], (429, "priority"))
+        self.assertEqual(controller.admit("cheap")[1][:2], (429, "threads"))
+        self.assertEqual(controller.admit("critical"), (None, None))
+
+        cheap.release()
+        queued.join()
+        heavy.release()
+        pool, rejection = controller.admit("cheap")
+        self.assertIsNone(rejection)
+        pool.release()
+
+    def test_critical_routes_are_not_limited(self):
+        """Test that critical routes bypass the pools"""
+        self.assertEqual(self.controller.admit("critical"), (None, None))
+
+    def test_metrics(self):
+        """Test that shed counts and queue depths are exposed"""
+        pool, _ = self.controller.admit("heavy")
+        self.controller.admit("heavy")
+        pool.release()
+        text = self.registry.render()
+
+        self.assertIn('admission_shed_total{reason="queue_full",route_class="heavy"} 1', text)
+        self.assertIn('admission_queue_depth{route_class="cheap"} 0', text)
+
+class MetricsEndpointTest(unittest.TestCase):
+    """Test cases for the metrics endpoint"""
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves Prometheus text"""
+        client = app.test_client()
+        client.get('/health')
+        response = client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'admission_in_flight', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,8 @@ import sys
 # Add the parent directory to the path so we can import the app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
 from app import app, load_models
 
 class EnergyEfficiencyAPITest(unittest.TestCase):
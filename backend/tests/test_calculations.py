@@ -0,0 +1,67 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+from app import app
+from calculations import compute_derived_metrics, resolve_parameters
+
+class DerivedMetricsTest(unittest.TestCase):
+    """Test cases for the vectorized derived-metrics engine"""
+
+    def test_matches_scalar_formulas(self):
+        """Test that the vectorized results match the Streamlit tab formulas"""
+        heating = np.array([8.0, 12.0, 20.0])
+        cooling = np.array([9.0, 14.0, 25.0])
+        area = 404.25
+        metrics = compute_derived_metrics(heating, cooling, area)
+
+        for i in range(3):
+            total_energy = (heating[i] + cooling[i]) * area
+            self.assertAlmostEqual(metrics["heatingPowerKw"][i], heating[i] * area / 1000)
+            self.assertAlmostEqual(metrics["annualCost"][i], total_energy * 3000)
+            self.assertAlmostEqual(metrics["co2EmissionKg"][i], total_energy * 0.5)
+            self.assertAlmostEqual(metrics["requiredPanels"][i], total_energy / 350)
+        self.assertEqual(metrics["rating"].tolist(), ["A", "B", "C"])
+
+    def test_parameters_override_defaults(self):
+        """Test configurable tariffs and validation of parameters"""
+        parameters = resolve_parameters({"pricePerKwh": 2500, "ratingThresholds": [12, 20]})
+        metrics = compute_derived_metrics(11.0, 11.0, 100.0, parameters)
+
+        self.assertAlmostEqual(float(metrics["annualCost"]), 2200 * 2500)
+        self.assertEqual(str(metrics["rating"]), "A")
+        with self.assertRaises(ValueError):
+            resolve_parameters({"pricePerKwh": -1})
+        with self.assertRaises(ValueError):
+            resolve_parameters({"unknown": 1})
+
+    def test_endpoint(self):
+        """Test the derived-metrics endpoint with wall and roof areas"""
+        client = app.test_client()
+        payload = {
+            "heatingLoad": [15.0, 30.0],
+            "coolingLoad": [20.0, 35.0],
+            "wallArea": [294.0, 318.5],
+            "roofArea": [110.25, 122.5],
+            "parameters": {"emissionFactor": 0.6}
+        }
+        response = client.post('/api/derived-metrics', data=json.dumps(payload), content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['data']['rating'], ["C", "C"])
+        self.assertAlmostEqual(data['data']['co2EmissionKg'][0], round(35.0 * 404.25 * 0.6, 2))
+
+        response = client.post('/api/derived-metrics', data=json.dumps({"heatingLoad": [1]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
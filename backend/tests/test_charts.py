@@ -0,0 +1,164 @@
+import unittest
+import base64
+import json
+import os
+import sys
+import threading
+from unittest import mock
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+import charts
+from charts import ChartRejected, ChartService, render_chart
+from metrics import MetricsRegistry
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+class ChartRenderersTest(unittest.TestCase):
+    """Test cases for the Figure API renderers"""
+
+    def test_every_kind_renders_png(self):
+        """Test that each chart kind renders to a PNG"""
+        specs = {
+            "co2_comparison": {"labels": ["a", "b"], "values": [1200, 2500]},
+            "model_comparison": {"models": ["A", "B"], "heating": [10.0, 12.0], "cooling": [14.0, 13.0]},
+            "sweep": {"feature": "glazingArea", "model": "A", "x": [0.0, 0.2, 0.4], "heating": [8.0, 10.0, 12.0], "cooling": [11.0, 12.0, 13.0]},
+            "portfolio": {"model": "A", "bins": 5, "heating": [8.0, 10.0, 30.0], "cooling": [11.0, 20.0, 33.0]}
+        }
+        self.assertEqual(set(specs), set(charts.CHART_RENDERERS))
+        for kind, spec in specs.items():
+            self.assertTrue(render_chart(kind, spec).startswith(PNG_SIGNATURE), kind)
+
+class ChartServiceTest(unittest.TestCase):
+    """Test cases for the bounded chart service"""
+
+    def test_process_pool_renders(self):
+        """Test that a chart comes back from a renderer process"""
+        service = ChartService(workers=1, queue_size=0, timeout=60, registry=MetricsRegistry()).start()
+        try:
+            png = service.render("co2_comparison", {"labels": ["a", "b"], "values": [1, 2]})
+        finally:
+            service.stop()
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+        self.assertEqual(service.registry.value("charts_rendered_total", {"kind": "co2_comparison"}), 1)
+
+    def test_renderers_replaced_without_native_max_tasks(self):
+        """Test that before Python 3.11 the pool is replaced after max_tasks charts per renderer"""
+        service = ChartService(workers=1, queue_size=0, timeout=60, max_tasks=2, registry=MetricsRegistry())
+        with mock.patch.object(charts, "NATIVE_MAX_TASKS", False):
+            with mock.patch.object(charts, "ProcessPoolExecutor", wraps=charts.ProcessPoolExecutor) as executor:
+                try:
+                    pools = []
+                    for _ in range(5):
+                        png = service.render("co2_comparison", {"labels": ["a", "b"], "values": [1, 2]})
+                        self.assertTrue(png.startswith(PNG_SIGNATURE))
+                        pools.append(service._pool)
+                finally:
+                    service.stop()
+        self.assertNotIn("max_tasks_per_child", executor.call_args.kwargs)
+        self.assertEqual(executor.call_count, 3)
+        self.assertEqual(len({id(pool) for pool in pools}), 3)
+
+    def test_full_pool_rejects_at_once(self):
+        """Test that a chart finding every slot taken is rejected with 429"""
+        service = ChartService(workers=0, queue_size=0, registry=MetricsRegistry())
+        started, release = threading.Event(), threading.Event()
+        original = charts.CHART_RENDERERS["co2_comparison"]
+
+        def blocking(spec):
+            started.set()
+            release.wait(5)
+            return original(spec)
+        charts.CHART_RENDERERS["co2_comparison"] = blocking
+        try:
+            thread = threading.Thread(target=service.render, args=("co2_comparison", {"labels": ["a"], "values": [1]}))
+            thread.start()
+            started.wait(5)
+            with self.assertRaises(ChartRejected) as context:
+                service.render("co2_comparison", {"labels": ["a"], "values": [1]})
+            release.set()
+            thread.join()
+        finally:
+            charts.CHART_RENDERERS["co2_comparison"] = original
+        self.assertEqual((context.exception.status, context.exception.reason), (429, "queue_full"))
+        self.assertEqual(service.in_flight, 0)
+
+    def test_unknown_kind(self):
+        """Test that an unknown chart kind is a ValueError"""
+        with self.assertRaises(ValueError):
+            ChartService(workers=0, registry=MetricsRegistry()).render("pie", {})
+
+class ChartApiTest(unittest.TestCase):
+    """Test cases for the chart endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.original = app_module.chart_service
+        app_module.chart_service = ChartService(workers=0, registry=MetricsRegistry())
+
+    @classmethod
+    def tearDownClass(cls):
+        app_module.chart_service = cls.original
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def post(self, path, body, **kwargs):
+        return self.client.post(path, data=json.dumps(body), content_type='application/json', **kwargs)
+
+    def test_model_comparison(self):
+        """Test that every loaded model appears in the comparison"""
+        data = json.loads(self.post('/api/charts/model-comparison', {"building": BUILDING}).data)
+        self.assertTrue(data['success'])
+        self.assertEqual(set(data['data']['models']), set(app_module.serving.heating))
+        self.assertTrue(base64.b64decode(data['chart_image']).startswith(PNG_SIGNATURE))
+
+    def test_sweep_over_training_range(self):
+        """Test that a sweep without values covers the ENB2012 range of the feature"""
+        data = json.loads(self.post('/api/charts/sweep', {"building": BUILDING, "feature": "glazingArea", "steps": 5}).data)
+        self.assertEqual(data['data']['x'], [0.0, 0.1, 0.2, 0.30000000000000004, 0.4])
+        self.assertEqual(len(data['data']['heating']), 5)
+
+    def test_portfolio_png(self):
+        """Test that the portfolio histogram can be returned as a raw PNG"""
+        response = self.post('/api/charts/portfolio?format=png', {"buildings": [BUILDING, dict(BUILDING, glazingArea=0.4), {}]})
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertTrue(response.data.startswith(PNG_SIGNATURE))
+
+    def test_chart_inputs_are_not_logged(self):
+        """Test that chart predictions stay out of the prediction log and drift monitor"""
+        with mock.patch.object(app_module, "log_predictions") as log:
+            self.assertEqual(self.post('/api/charts/model-comparison', {"building": BUILDING}).status_code, 200)
+            self.assertEqual(self.post('/api/charts/sweep', {"building": BUILDING, "feature": "glazingArea"}).status_code, 200)
+            self.assertEqual(self.post('/api/charts/portfolio', {"buildings": [BUILDING] * 3}).status_code, 200)
+        log.assert_not_called()
+
+    def test_invalid_requests(self):
+        """Test that bad sweeps and unknown chart kinds are rejected"""
+        self.assertEqual(self.post('/api/charts/sweep', {"building": BUILDING, "feature": "orientation"}).status_code, 400)
+        too_many = app_module.MAX_SWEEP_POINTS + 1
+        for sweep in ({"range": [0.0, 0.4], "steps": too_many}, {"values": [0.1] * too_many}, {"values": []}, {"values": [[0.1]]}):
+            response = self.post('/api/charts/sweep', dict(sweep, building=BUILDING, feature="glazingArea"))
+            self.assertEqual(response.status_code, 400, sweep)
+        for bins in (0, app_module.MAX_PORTFOLIO_BINS + 1, 1000000):
+            response = self.post('/api/charts/portfolio', {"buildings": [BUILDING], "bins": bins})
+            self.assertEqual(response.status_code, 400, bins)
+        self.assertEqual(self.post('/api/charts/pie', {}).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
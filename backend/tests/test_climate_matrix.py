@@ -0,0 +1,70 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from app import app, resolve_region
+from calculations import climate_adjusted_loads
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class ClimateMatrixTest(unittest.TestCase):
+    """Test cases for the city-by-building load matrix"""
+
+    def test_broadcast_matches_outer_product(self):
+        """Test that each cell is the load times the city's degree-day ratio"""
+        heating, cooling = climate_adjusted_loads([10.0, 20.0], [5.0, 8.0], [800.0, 1600.0, 0.0], [1000.0, 500.0, 2000.0], 800.0, 1000.0)
+
+        self.assertEqual(heating.shape, (2, 3))
+        np.testing.assert_allclose(heating, [[10, 20, 0], [20, 40, 0]])
+        np.testing.assert_allclose(cooling, [[5, 2.5, 10], [8, 4, 16]])
+
+    def test_resolve_region(self):
+        """Test region lookup from city names"""
+        self.assertEqual(resolve_region("Hue (Central)"), ("Central", "Da Nang (Central)"))
+        self.assertEqual(resolve_region("Paris"), (None, None))
+
+    def test_endpoint_shapes(self):
+        """Test that the endpoint returns one row per building and one column per city"""
+        client = app.test_client()
+        payload = {"buildings": [BUILDING, dict(BUILDING, glazingArea=0.4)], "cities": ["Hanoi (Northern)", "Hue (Central)"]}
+        response = client.post('/api/climate-matrix', data=json.dumps(payload), content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['cities'], ["Hanoi (Northern)", "Hue (Central)"])
+        self.assertEqual(len(data['heating_load']), 2)
+        self.assertEqual(len(data['heating_load'][0]), 2)
+        self.assertEqual(sorted(data['ranking'][0]), sorted(data['cities']))
+
+        response = client.post('/api/climate-matrix', data=json.dumps({"buildings": [BUILDING], "cities": ["Atlantis"]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_valid_buildings(self):
+        """Test that a request without a valid building is rejected with the per-row errors"""
+        app_module.load_models()
+        client = app.test_client()
+        for buildings in ([dict(BUILDING, glazingArea=-1)], []):
+            response = client.post('/api/climate-matrix', data=json.dumps({"buildings": buildings}), content_type='application/json')
+            data = json.loads(response.data)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual({error['index'] for error in data['errors']}, set(range(len(buildings))))
+
+if __name__ == '__main__':
+    unittest.main()
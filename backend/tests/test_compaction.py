@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from compaction import CompactForest, CompactKNN, _float32_floor, compact_forest, compact_knn, compact_models, select_trees
+
+class CompactionTest(unittest.TestCase):
+    """Test cases for the model compaction tool"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.uniform(size=(300, 6))
+        self.y = self.X @ np.arange(1, 7) + rng.normal(scale=0.1, size=300)
+
+    def test_float32_floor_keeps_splits(self):
+        """Test that rounded thresholds send float32 inputs the same way"""
+        low, high = np.float32(0.1), np.nextafter(np.float32(0.1), np.float32(1))
+        threshold = np.array([(float(low) + float(high)) / 2])
+
+        rounded = _float32_floor(threshold)[0]
+        self.assertTrue(low <= rounded)
+        self.assertFalse(high <= rounded)
+
+    def test_full_forest_is_reproduced(self):
+        """Test that flattening every tree matches sklearn up to float32 leaf values"""
+        forest = RandomForestRegressor(n_estimators=20, random_state=0).fit(self.X, self.y)
+        compact = compact_forest(forest, self.X, tolerance=0)
+
+        self.assertIsInstance(compact, CompactForest)
+        self.assertEqual(compact.n_trees, 20)
+        np.testing.assert_allclose(compact.predict(self.X), forest.predict(self.X), atol=1e-4)
+
+    def test_identical_leaves_are_collapsed(self):
+        """Test that a split whose leaves agree becomes a single leaf"""
+        X = np.array([[0.0], [1.0], [2.0], [3.0]])
+        tree = DecisionTreeRegressor().fit(X, [1.0, 1.0, 5.0, 5.0])
+        tree.tree_.value[:] = 2.0
+
+        compact = compact_forest(tree, X)
+        self.assertEqual(compact.node_count, 1)
+        np.testing.assert_allclose(compact.predict(X), 2.0)
+
+    def test_select_trees_stops_at_tolerance(self):
+        """Test that pruning keeps trees until the full forest is tracked"""
+        predictions = np.array([[2.0, 2.0], [6.0, 6.0], [4.1, 4.1], [3.8, 3.8]])
+
+        self.assertEqual(select_trees(predictions, tolerance=0.5), [2])
+        self.assertEqual(len(select_trees(predictions, tolerance=0, max_trees=2)), 2)
+
+    def test_knn_without_duplicates_matches(self):
+        """Test that a KNN model without repeated points is unchanged"""
+        for weights in ("uniform", "distance"):
+            knn = KNeighborsRegressor(n_neighbors=5, weights=weights).fit(self.X, self.y)
+            compact = compact_knn(knn)
+            np.testing.assert_allclose(compact.predict(self.X[:50] + 0.01), knn.predict(self.X[:50] + 0.01))
+
+    def test_knn_duplicates_are_merged(self):
+        """Test that repeated points are stored once and whole groups predict the same"""
+        X = np.repeat(self.X[:30], 3, axis=0)
+        y = np.repeat(self.y[:30], 3)
+        knn = KNeighborsRegressor(n_neighbors=6, weights="distance").fit(X, y)
+        compact = compact_knn(knn)
+
+        self.assertIsInstance(compact, CompactKNN)
+        self.assertEqual(compact.points.shape[0], 30)
+        query = self.X[:30] + 0.01
+        np.testing.assert_allclose(compact.predict(query), knn.predict(query))
+        np.testing.assert_allclose(compact.predict(self.X[:30]), self.y[:30])
+
+    def test_compact_models_copies_other_models(self):
+        """Test that models without a compact form are kept as they are"""
+        linear = LinearRegression().fit(self.X, self.y)
+        models = {"Linear Regression": linear, "Decision Tree": DecisionTreeRegressor().fit(self.X, self.y)}
+
+        compacted = compact_models(models, self.X)
+        self.assertIs(compacted["Linear Regression"], linear)
+        self.assertIsInstance(compacted["Decision Tree"], CompactForest)
+        self.assertIsInstance(models["Decision Tree"], DecisionTreeRegressor)
+
+if __name__ == '__main__':
+    unittest.main()
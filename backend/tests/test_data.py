@@ -0,0 +1,73 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data import ENB2012_PATH, load_dataset
+from utils import INPUT_SCHEMA, load_enb2012
+
+class DatasetCacheTest(unittest.TestCase):
+    """Test cases for the cached ENB2012 data-access layer"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, "ENB2012_data.csv")
+        shutil.copyfile(ENB2012_PATH, self.source)
+        self.cache_dir = os.path.join(self.directory, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache_files(self):
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_matches_csv(self):
+        """Test that the cached arrays hold the CSV values under feature names"""
+        dataset = load_dataset(self.source, self.cache_dir)
+        frame = load_enb2012(self.source)
+
+        self.assertEqual(len(dataset), 768)
+        np.testing.assert_array_equal(dataset.features, frame[INPUT_SCHEMA.columns].to_numpy(dtype=np.float64))
+        np.testing.assert_array_equal(dataset.column("Cooling Load"), frame["Cooling Load"].to_numpy())
+        self.assertEqual(frame["Orientation"].dtype, np.int64)
+
+    def test_views_are_zero_copy(self):
+        """Test that features, targets and columns are read-only views of the mapped file"""
+        dataset = load_dataset(self.source, self.cache_dir)
+
+        self.assertIsInstance(dataset.matrix, np.memmap)
+        for view in (dataset.features, dataset.targets, dataset.column("Wall Area")):
+            self.assertTrue(np.shares_memory(view, dataset.matrix))
+            self.assertFalse(view.flags.writeable)
+        self.assertTrue(dataset.column("Wall Area").flags.c_contiguous)
+
+    def test_cache_is_reused(self):
+        """Test that an unchanged source is parsed once"""
+        first = load_dataset(self.source, self.cache_dir)
+        files = self.cache_files()
+
+        self.assertIs(load_dataset(self.source, self.cache_dir), first)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(self.cache_files(), files)
+
+    def test_source_change_invalidates_cache(self):
+        """Test that editing the CSV replaces the cache file"""
+        first = load_dataset(self.source, self.cache_dir)
+        with open(self.source) as f:
+            lines = f.readlines()
+        with open(self.source, "w") as f:
+            f.writelines(lines[:11])
+
+        second = load_dataset(self.source, self.cache_dir)
+        self.assertNotEqual(second.checksum, first.checksum)
+        self.assertEqual(len(second), 10)
+        self.assertEqual(len(self.cache_files()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
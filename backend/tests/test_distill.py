@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from data import load_dataset
+from distill import DISTILLED_MODEL, distill, distillation_report, sample_input_space
+from latency import rank_candidates
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+class DistillationTest(unittest.TestCase):
+    """Test cases for distilling a teacher model into a student"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.transformer = app_module.serving.transformer
+        cls.dataset = load_dataset()
+
+    def test_samples_cover_the_level_grid(self):
+        """Test that every ENB2012 level combination is sampled before the uniform points"""
+        samples = sample_input_space(self.transformer, self.dataset.features, size=100)
+        levels = [len(np.unique(self.dataset.features[:, index])) for index in range(6)]
+        self.assertEqual(samples.shape, (int(np.prod(levels)) + 100, 6))
+        # Whole-number features stay whole in the uniform part
+        np.testing.assert_array_equal(samples[-100:, 5], np.round(samples[-100:, 5]))
+
+    def test_tree_student_tracks_teacher(self):
+        """Test that a tree student reproduces a forest teacher on the training rows"""
+        scaled = self.transformer.transform(app_module.INPUT_SCHEMA.to_frame(self.dataset.features))
+        teacher = RandomForestRegressor(n_estimators=20, random_state=0).fit(scaled, self.dataset.column("Heating Load"))
+        samples = sample_input_space(self.transformer, self.dataset.features, size=2000)
+        student = distill(teacher, samples, "tree", teacher_name="Random Forest")
+
+        self.assertEqual(student.describe()["teacher"], "Random Forest")
+        self.assertLessEqual(student.describe()["depth"], 14)
+        report = distillation_report(self.transformer, {"heating": (teacher, student)}, self.dataset, samples[-500:], rows=500, repeats=1)
+        self.assertLess(report[0]["rmse_vs_teacher"], 0.25)
+        self.assertIn("rmse_student", report[0])
+
+    def test_unknown_student_kind(self):
+        """Test that unknown student kinds raise"""
+        with self.assertRaises(ValueError):
+            distill(RandomForestRegressor(n_estimators=1).fit([[0.0]], [0.0]), np.zeros((1, 1)), "lookup")
+
+    def test_distilled_model_is_ranked_after_its_teacher(self):
+        """Test that deadline downgrades go from XGBoost to the student first"""
+        available = ["Linear Regression", "XGBoost", DISTILLED_MODEL, "Random Forest"]
+        self.assertEqual(rank_candidates("XGBoost", available)[:2], ["XGBoost", DISTILLED_MODEL])
+
+class DistilledServingTest(unittest.TestCase):
+    """Test cases for serving a student as a model name"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        dataset = load_dataset()
+        samples = sample_input_space(app_module.serving.transformer, dataset.features, size=2000)
+        for models in (app_module.serving.heating, app_module.serving.cooling):
+            models[DISTILLED_MODEL] = distill(models["Random Forest"], samples, "tree", max_depth=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        for models in (app_module.serving.heating, app_module.serving.cooling):
+            models.pop(DISTILLED_MODEL, None)
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def test_predict_with_student(self):
+        """Test that the student answers under its model name and is listed"""
+        response = self.client.post('/api/predict', data=json.dumps(dict(BUILDING, model=DISTILLED_MODEL)), content_type='application/json')
+        data = json.loads(response.data)
+        self.assertEqual(data['model_used'], DISTILLED_MODEL)
+        self.assertGreater(data['data']['heatingLoad'], 0)
+
+        models = json.loads(self.client.get('/api/models').data)
+        self.assertIn(DISTILLED_MODEL, models['models'])
+        self.assertEqual(models['distilled']['kind'], "tree")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+import domain
+from data import load_dataset
+from domain import ApplicabilityDomain
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+class ApplicabilityDomainTest(unittest.TestCase):
+    """Test cases for the training-data applicability domain"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = np.array(load_dataset().features)
+        cls.domain = ApplicabilityDomain(cls.reference)
+
+    def test_training_rows_are_inside(self):
+        """Test that no ENB2012 building is flagged"""
+        result = self.domain.assess(self.reference)
+        self.assertFalse(result["extrapolation"].any())
+        self.assertLessEqual(result["score"].max(), 1.0)
+        self.assertEqual(result["nearest"].max(), 0.0)
+
+    def test_out_of_range_feature(self):
+        """Test that a wall area beyond the training range is flagged by the bounds check"""
+        row = self.reference[:1].copy()
+        row[0, 1] = 900.0
+        result = self.domain.assess(row)
+        self.assertTrue(result["extrapolation"][0])
+        self.assertAlmostEqual(result["bounds"][0], 1 + (900.0 - 416.5) / (416.5 - 245.0))
+
+    def test_in_range_but_unseen_combination(self):
+        """Test that a combination of in-range values far from every building is flagged"""
+        row = np.array([[0.62, 245.0, 110.25, 3.5, 0.1, 1]])
+        result = self.domain.assess(row)
+        self.assertEqual(result["bounds"][0], 0.0)
+        self.assertTrue(result["extrapolation"][0])
+        self.assertGreater(result["mahalanobis"][0], 1.0)
+
+    def test_brute_force_matches_kd_tree(self):
+        """Test that small batches searched by brute force get the KD-tree's distances"""
+        rows = self.reference[:50] + np.random.default_rng(0).normal(0, 5, size=(50, 6))
+        brute = self.domain.assess(rows)["nearest"]
+        original = domain.BRUTE_FORCE_PAIRS
+        domain.BRUTE_FORCE_PAIRS = 0
+        try:
+            tree = self.domain.assess(rows)["nearest"]
+        finally:
+            domain.BRUTE_FORCE_PAIRS = original
+        np.testing.assert_allclose(brute, tree)
+
+    def test_empty_batch(self):
+        """Test that an empty batch gives empty arrays"""
+        self.assertEqual(self.domain.assess(np.empty((0, 6)))["extrapolation"].shape, (0,))
+
+class ApplicabilityApiTest(unittest.TestCase):
+    """Test cases for extrapolation flags in prediction responses"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def test_single_prediction(self):
+        """Test that a single prediction carries the flag, score and check ratios"""
+        response = self.client.post('/api/predict', data=json.dumps(dict(BUILDING, wallArea=900.0)), content_type='application/json')
+        data = json.loads(response.data)
+        self.assertTrue(data['data']['extrapolation'])
+        self.assertGreater(data['data']['extrapolationScore'], 1.0)
+        self.assertEqual(set(data['applicability']), {"bounds", "mahalanobis", "nearest"})
+
+    def test_batch_prediction(self):
+        """Test that batch results are flagged per row, with invalid rows left as None"""
+        buildings = [BUILDING, dict(BUILDING, wallArea=900.0), dict(BUILDING, wallArea=-1)]
+        response = self.client.post('/api/predict/batch', data=json.dumps({"buildings": buildings}), content_type='application/json')
+        data = json.loads(response.data)
+        self.assertFalse(data['data'][0]['extrapolation'])
+        self.assertTrue(data['data'][1]['extrapolation'])
+        self.assertIsNone(data['data'][2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from data import load_dataset
+from drift import DriftMonitor, QuantileSketch, jensen_shannon, population_stability_index, reference_edges
+from metrics import MetricsRegistry
+
+class DriftMonitorTest(unittest.TestCase):
+    """Test cases for the streaming input drift monitor"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = np.array(load_dataset().features)
+
+    def make_monitor(self, **kwargs):
+        return DriftMonitor(self.reference, interval=3600, registry=MetricsRegistry(), **kwargs)
+
+    def test_reference_edges(self):
+        """Test that discrete features get one bin per value and continuous ones quantile bins"""
+        self.assertEqual(reference_edges(np.array([0.0, 0.1, 0.25, 0.4, 0.4])).tolist(), [0.05, 0.175, 0.325])
+        self.assertEqual(len(reference_edges(np.arange(100.0), bins=4)), 3)
+
+    def test_divergences(self):
+        """Test PSI and Jensen-Shannon divergence on identical and disjoint distributions"""
+        p = np.array([0.5, 0.5, 0.0])
+        self.assertEqual(population_stability_index(p, p), 0.0)
+        self.assertEqual(jensen_shannon(p, p), 0.0)
+        self.assertAlmostEqual(jensen_shannon(np.array([1.0, 0.0]), np.array([0.0, 1.0])), 1.0)
+
+    def test_quantile_sketch_relative_error(self):
+        """Test that sketch quantiles are within the relative accuracy and memory stays bounded"""
+        values = np.random.default_rng(0).lognormal(3, 2, size=(20000, 2))
+        values[:100, 1] = 0.0
+        sketch = QuantileSketch(2, relative_accuracy=0.01, max_buckets=600)
+        for chunk in np.array_split(values, 10):
+            sketch.update(chunk)
+        self.assertLessEqual(max(len(buckets) for buckets in sketch.buckets), 600)
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(sketch.quantile(0, q) / np.quantile(values[:, 0], q), 1, delta=0.03)
+        self.assertEqual(sketch.quantile(1, 0.001), 0.0)
+
+    def test_training_data_is_stable(self):
+        """Test that traffic drawn from ENB2012 scores as stable"""
+        monitor = self.make_monitor()
+        monitor.update(self.reference)
+        snapshot = monitor.compute()
+        self.assertEqual(snapshot["observed"], len(self.reference))
+        for entry in snapshot["features"].values():
+            self.assertEqual(entry["status"], "stable")
+            self.assertLess(entry["psi"], 1e-6)
+            self.assertEqual(entry["out_of_range"], 0.0)
+
+    def test_shifted_feature_drifts(self):
+        """Test that larger wall areas than in training are reported on that feature only"""
+        monitor = self.make_monitor()
+        shifted = self.reference.copy()
+        shifted[:, 1] *= 2
+        monitor.update(shifted)
+        features = monitor.compute()["features"]
+        self.assertEqual(features["wallArea"]["status"], "drift")
+        self.assertGreater(features["wallArea"]["out_of_range"], 0.5)
+        self.assertEqual(features["roofArea"]["status"], "stable")
+        self.assertIn('input_drift_psi{feature="wallArea"}', monitor.registry.render())
+
+    def test_decay_and_minimum_count(self):
+        """Test that scores need enough recent traffic and earlier traffic is decayed"""
+        monitor = self.make_monitor(decay=0.5, min_count=30)
+        monitor.update(self.reference[:20])
+        self.assertEqual(monitor.compute()["features"]["wallArea"]["status"], "insufficient_data")
+        monitor.update(self.reference[:25])
+        self.assertEqual(monitor.compute()["features"]["wallArea"]["weight"], 35.0)
+
+class DriftApiTest(unittest.TestCase):
+    """Test cases for the drift endpoint"""
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+        self.original = app_module.drift_monitor
+        app_module.drift_monitor = DriftMonitor(load_dataset().features, interval=3600, registry=MetricsRegistry())
+
+    def tearDown(self):
+        app_module.drift_monitor = self.original
+
+    def test_predictions_feed_the_monitor(self):
+        """Test that batch prediction inputs show up in the drift report"""
+        buildings = [{
+            "relativeCompactness": 0.98,
+            "wallArea": 900.0,
+            "roofArea": 110.25,
+            "overallHeight": 7.0,
+            "glazingArea": 0.1,
+            "glazingAreaDistribution": 1
+        }] * 40
+        response = self.client.post('/api/predict/batch', data=json.dumps({"buildings": buildings}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(self.client.get('/api/drift').data)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['observed'], 40)
+        self.assertEqual(data['features']['wallArea']['status'], "drift")
+        self.assertEqual(data['features']['wallArea']['out_of_range'], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
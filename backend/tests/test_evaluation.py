@@ -0,0 +1,124 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+from sklearn.dummy import DummyRegressor
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from data import load_dataset
+from evaluation import FALLBACK_DEFAULT_MODEL, ModelEvaluation, holdout_indices, rank_models
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+def entry(model, rmse, single_row_ms):
+    return {
+        "model": model,
+        "heating": {"rmse": rmse, "mae": rmse},
+        "cooling": {"rmse": rmse, "mae": rmse},
+        "single_row_ms": single_row_ms,
+        "batch_ms": single_row_ms,
+        "batch_rows": 1000,
+        "per_row_us": single_row_ms
+    }
+
+LEADERBOARD = [entry("Accurate", 0.5, 20.0), entry("Balanced", 0.6, 0.5), entry("Fast", 5.0, 0.1)]
+
+class ObjectiveTest(unittest.TestCase):
+    """Test cases for ranking models by the accuracy/latency objective"""
+
+    def test_weight_moves_the_choice(self):
+        """Test that the latency weight moves the default from the most accurate to the fastest model"""
+        choices = [ModelEvaluation(LEADERBOARD, "v1", latency_weight=weight, pinned="").default_model for weight in (0.0, 0.3, 1.0)]
+        self.assertEqual(choices, ["Accurate", "Balanced", "Fast"])
+
+    def test_latency_limit_and_pin(self):
+        """Test that models over the latency limit are not chosen and a pinned model wins"""
+        ranked = rank_models(LEADERBOARD, latency_weight=0.0, max_latency_ms=1.0)
+        self.assertEqual([e["model"] for e in ranked], ["Balanced", "Fast", "Accurate"])
+        self.assertFalse(ranked[-1]["eligible"])
+        self.assertEqual(ModelEvaluation(LEADERBOARD, "v1", latency_weight=0.0, pinned="Fast").default_model, "Fast")
+        self.assertEqual(ModelEvaluation(LEADERBOARD, "v1", latency_weight=0.0, max_latency_ms=0.01, pinned="").default_model, FALLBACK_DEFAULT_MODEL)
+
+    def test_accuracy_ranking_ignores_latency(self):
+        """Test that the deadline ranking orders models by held-out RMSE alone"""
+        evaluation = ModelEvaluation([entry("Fast", 5.0, 0.1), entry("Accurate", 0.5, 20.0), entry("Balanced", 0.6, 0.5)], "v1", latency_weight=1.0)
+        self.assertEqual(evaluation.accuracy_ranking(), ["Accurate", "Balanced", "Fast"])
+
+    def test_invalid_weight(self):
+        """Test that weights outside [0, 1] raise"""
+        with self.assertRaises(ValueError):
+            rank_models(LEADERBOARD, latency_weight=1.5)
+
+class EvaluationCacheTest(unittest.TestCase):
+    """Test cases for measuring models and caching the figures"""
+
+    def test_holdout_matches_the_notebook_split(self):
+        """Test that the held-out rows are the 20% test split with random_state 42"""
+        test = holdout_indices(768)
+        self.assertEqual(len(test), 154)
+        self.assertEqual(len(np.unique(test)), 154)
+
+    def test_measured_once_per_version(self):
+        """Test that figures are cached per model version and measured again for a new one"""
+        dataset = load_dataset()
+        heating = dataset.column("Heating Load")
+        models = {
+            "Tree": DecisionTreeRegressor(random_state=0).fit(dataset.features, heating),
+            "Mean": DummyRegressor().fit(dataset.features, heating)
+        }
+        transformer = FunctionTransformer()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "evaluation.json")
+            first = ModelEvaluation.build(transformer, models, models, dataset, "v1", cache_path=path, latency_weight=0.0, pinned="")
+            second = ModelEvaluation.build(transformer, models, models, dataset, "v1", cache_path=path, latency_weight=0.0, pinned="")
+            third = ModelEvaluation.build(transformer, models, models, dataset, "v2", cache_path=path, latency_weight=0.0, pinned="")
+        self.assertEqual((first.cached, second.cached, third.cached), (False, True, False))
+        self.assertEqual(first.default_model, "Tree")
+        self.assertEqual(first.leaderboard, second.leaderboard)
+        mean = [e for e in first.leaderboard if e["model"] == "Mean"][0]
+        self.assertAlmostEqual(mean["heating"]["rmse"], np.std(heating[holdout_indices(len(dataset))]), delta=1.0)
+
+class LeaderboardApiTest(unittest.TestCase):
+    """Test cases for the leaderboard and default model in the API"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def test_models_report_leaderboard(self):
+        """Test that /api/models carries the leaderboard of every loaded model"""
+        data = json.loads(self.client.get('/api/models').data)
+        evaluation = data['evaluation']
+        self.assertEqual(data['default_model'], evaluation['default_model'])
+        self.assertEqual(evaluation['model_version'], data['model_version'])
+        self.assertEqual({e['model'] for e in evaluation['leaderboard']}, set(app_module.serving.heating))
+        self.assertTrue(all(e['single_row_ms'] > 0 for e in evaluation['leaderboard']))
+
+    def test_prediction_without_model_uses_default(self):
+        """Test that requests naming no model get the chosen default"""
+        response = self.client.post('/api/predict', data=json.dumps(BUILDING), content_type='application/json')
+        self.assertEqual(json.loads(response.data)['model_used'], app_module.serving.default_model)
+
+if __name__ == '__main__':
+    unittest.main()
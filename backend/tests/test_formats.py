@@ -0,0 +1,96 @@
+import unittest
+import gzip
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+from app import app
+from formats import available_formats
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class ResponseFormatTest(unittest.TestCase):
+    """Test cases for response content negotiation"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        self.payload = json.dumps({"buildings": [BUILDING, {}, BUILDING]})
+
+    def post(self, query="", headers=None):
+        return self.app.post('/api/predict/batch' + query, data=self.payload, content_type='application/json', headers=headers or {})
+
+    def test_default_is_json(self):
+        """Test that clients without preferences still get JSON"""
+        response = self.post(headers={"Accept": "*/*"})
+
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(len(json.loads(response.data)['data']), 3)
+
+    def test_npy_matches_json(self):
+        """Test that the NPY columns hold the same rounded values as JSON"""
+        rows = json.loads(self.post().data)['data']
+        response = self.post(headers={"Accept": "application/x-npy"})
+        records = np.load(io.BytesIO(response.data))
+
+        self.assertEqual(response.mimetype, "application/x-npy")
+        self.assertEqual(records['heatingLoad'][0], rows[0]['heatingLoad'])
+        self.assertTrue(np.isnan(records['coolingLoad'][1]))
+        self.assertEqual(json.loads(response.headers['X-Result-Metadata'])['error_count'], 6)
+
+    def test_unknown_format_is_rejected(self):
+        """Test that an unsupported format gives 406"""
+        response = self.post("?format=xml")
+
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(json.loads(response.data)['available_formats'], available_formats())
+
+    def test_gzip_compression(self):
+        """Test that large bodies are gzip encoded when accepted"""
+        self.payload = json.dumps({"buildings": [BUILDING] * 100})
+        response = self.post(headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))['data']), 100)
+
+    @unittest.skipUnless("arrow" in available_formats(), "pyarrow not installed")
+    def test_arrow_stream(self):
+        """Test that Arrow IPC responses carry nulls and metadata"""
+        import pyarrow as pa
+        response = self.post("?format=arrow")
+        table = pa.ipc.open_stream(response.data).read_all()
+
+        self.assertEqual(table.column('heatingLoad').null_count, 1)
+        self.assertIn(b'metadata', table.schema.metadata)
+
+    def test_co2_chart_as_png(self):
+        """Test raw PNG chart responses"""
+        response = self.app.post(
+            '/api/co2-comparison?format=png',
+            data=json.dumps({"city": "Hue (Central)", "buildingCO2": 5000}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertTrue(response.data.startswith(b'\x89PNG'))
+        self.assertEqual(response.headers['X-Reference-City'], 'Da Nang (Central)')
+
+if __name__ == '__main__':
+    unittest.main()
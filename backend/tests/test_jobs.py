@@ -0,0 +1,170 @@
+import unittest
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from jobs import JobManager
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+def double(records, options):
+    """Score function returning twice each record's value"""
+    values = np.array([record.get("x", np.nan) for record in records], dtype=np.float64)
+    errors = [{"index": index, "field": "x", "error": "Missing x"} for index in np.flatnonzero(np.isnan(values))]
+    return {"doubled": values * 2}, errors
+
+class JobManagerTest(unittest.TestCase):
+    """Test cases for the SQLite-backed job queue"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_result(self, manager, job_id):
+        with open(manager.result_path(job_id), newline="") as f:
+            return list(csv.DictReader(f))
+
+    def test_processes_in_chunks(self):
+        """Test that a job is scored chunk by chunk into one result file"""
+        manager = JobManager(double, self.directory, workers=0, chunk_size=2)
+        job_id = manager.submit({}, records=[{"x": 1}, {"x": 2}, {}, {"x": 4}, {"x": 5}])
+
+        manager.process(manager.claim())
+        status = manager.status(job_id)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual((status["rows_done"], status["error_rows"], status["total_chunks"]), (5, 1, 3))
+
+        rows = self.read_result(manager, job_id)
+        self.assertEqual([row["row"] for row in rows], ["0", "1", "2", "3", "4"])
+        self.assertEqual(rows[1]["doubled"], "4.0000")
+        self.assertEqual(rows[2]["error"], "Missing x")
+
+    def test_resumes_after_last_completed_chunk(self):
+        """Test that a job abandoned mid-way is taken over and not rescored from the start"""
+        first = JobManager(double, self.directory, workers=0, chunk_size=2, lease_seconds=0)
+        job_id = first.submit({}, upload=io.BytesIO(b"x\n1\n2\n3\n4\n5\n"), input_format="csv")
+
+        def stop_after_first_chunk(records, options):
+            first._stop.set()
+            return double(records, options)
+        first.score = stop_after_first_chunk
+        first.process(first.claim())
+        self.assertEqual(first.status(job_id)["chunks_done"], 1)
+        self.assertEqual(first.status(job_id)["status"], "running")
+
+        scored = []
+        second = JobManager(lambda records, options: scored.append(records) or double(records, options),
+                            self.directory, workers=0, chunk_size=2, lease_seconds=0)
+        second.process(second.claim())
+
+        self.assertEqual(scored, [[{"x": "3"}, {"x": "4"}], [{"x": "5"}]])
+        self.assertEqual([row["doubled"] for row in self.read_result(second, job_id)],
+                         ["2.0000", "4.0000", "6.0000", "8.0000", "10.0000"])
+
+    def test_running_job_is_not_claimed_twice(self):
+        """Test that a job with a live lease is left alone"""
+        manager = JobManager(double, self.directory, workers=0, lease_seconds=60)
+        manager.submit({}, records=[{"x": 1}])
+
+        self.assertIsNotNone(manager.claim())
+        self.assertIsNone(manager.claim())
+
+class JobApiTest(unittest.TestCase):
+    """Test cases for the job endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.client = app_module.app.test_client()
+        cls.directory = tempfile.mkdtemp()
+        cls.original_manager = app_module.job_manager
+        app_module.job_manager = JobManager(app_module.score_job_chunk, cls.directory, workers=1, chunk_size=3, poll_seconds=0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        app_module.job_manager.stop(timeout=5)
+        app_module.job_manager = cls.original_manager
+        shutil.rmtree(cls.directory)
+
+    def wait_for(self, job_id):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            status = json.loads(self.client.get(f'/api/jobs/{job_id}').data)
+            if status["status"] in ("completed", "failed"):
+                return status
+            time.sleep(0.05)
+        self.fail("Job did not finish")
+
+    def test_inline_job_with_derived_metrics(self):
+        """Test submitting inline buildings, polling and downloading the results"""
+        body = {"buildings": [BUILDING] * 4 + [dict(BUILDING, wallArea="x")], "derivedMetrics": True}
+        response = self.client.post('/api/jobs', data=json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.data)["job_id"]
+
+        status = self.wait_for(job_id)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual((status["rows_done"], status["error_rows"]), (5, 1))
+
+        result = self.client.get(f'/api/jobs/{job_id}/result')
+        self.assertEqual(result.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(result.data.decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertIn("annualCost", rows[0])
+        self.assertIn("wallArea", rows[4]["error"])
+
+    def test_chunk_without_valid_rows(self):
+        """Test that a chunk of invalid records is written with its errors and the job goes on"""
+        body = {"buildings": [BUILDING] * 3 + [dict(BUILDING, glazingArea=-1)] * 3 + [BUILDING], "derivedMetrics": True}
+        response = self.client.post('/api/jobs', data=json.dumps(body), content_type='application/json')
+        status = self.wait_for(json.loads(response.data)["job_id"])
+        self.assertEqual((status["status"], status["rows_done"], status["error_rows"]), ("completed", 7, 3))
+
+        rows = list(csv.DictReader(io.StringIO(self.client.get(f'/api/jobs/{status["job_id"]}/result').data.decode())))
+        self.assertEqual([bool(row["error"]) for row in rows], [False] * 3 + [True] * 3 + [False])
+        self.assertEqual(rows[3]["heatingLoad"], "")
+        self.assertEqual(rows[6]["heatingLoad"], rows[0]["heatingLoad"])
+
+    def test_uploaded_csv(self):
+        """Test submitting a CSV file"""
+        text = ",".join(BUILDING) + "\n" + ",".join(str(value) for value in BUILDING.values()) + "\n"
+        response = self.client.post('/api/jobs', data={"file": (io.BytesIO(text.encode()), "buildings.csv"), "model": "XGBoost"})
+        self.assertEqual(response.status_code, 202)
+
+        status = self.wait_for(json.loads(response.data)["job_id"])
+        self.assertEqual((status["status"], status["rows_done"], status["error_rows"]), ("completed", 1, 0))
+
+    def test_unknown_job_and_bad_input(self):
+        """Test 404 for unknown jobs and 400 for invalid submissions"""
+        self.assertEqual(self.client.get('/api/jobs/missing').status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/missing/result').status_code, 404)
+        response = self.client.post('/api/jobs', data=json.dumps({"buildings": []}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        body = {"buildings": [BUILDING], "parameters": {"unknown": 1}}
+        response = self.client.post('/api/jobs', data=json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from latency import ModelLatencyTracker, rank_candidates
+
+class ModelLatencyTrackerTest(unittest.TestCase):
+    """Test cases for deadline-aware model selection"""
+
+    def setUp(self):
+        self.tracker = ModelLatencyTracker(window=10, failure_threshold=2, cooldown=60.0)
+        for _ in range(10):
+            self.tracker.record("XGBoost", 0.050)
+            self.tracker.record("Linear Regression", 0.001)
+
+    def test_downgrades_to_fit_budget(self):
+        """Test that the most accurate model within the budget is chosen"""
+        candidates = ["XGBoost", "Linear Regression"]
+
+        self.assertEqual(self.tracker.choose(candidates, 1, 100)[0], "XGBoost")
+        model_name, _, reason = self.tracker.choose(candidates, 1, 10)
+        self.assertEqual(model_name, "Linear Regression")
+        self.assertEqual(reason, "downgraded to fit budget")
+
+    def test_circuit_breaker_skips_failing_model(self):
+        """Test that repeated overruns open the breaker until a success"""
+        self.tracker.record_failure("XGBoost")
+        self.tracker.record_failure("XGBoost")
+
+        self.assertFalse(self.tracker.is_available("XGBoost"))
+        self.assertEqual(self.tracker.choose(["XGBoost", "Linear Regression"], 1, 1000)[0], "Linear Regression")
+        self.assertEqual(self.tracker.snapshot()["XGBoost"]["circuit"], "open")
+
+    def test_rank_candidates(self):
+        """Test that only equal or less accurate models are candidates"""
+        available = ["Linear Regression", "SVM", "XGBoost", "Decision Tree"]
+
+        self.assertEqual(rank_candidates("Decision Tree", available), ["Decision Tree", "SVM", "Linear Regression"])
+        self.assertEqual(rank_candidates("auto", available)[0], "XGBoost")
+
+    def test_rank_candidates_from_measured_accuracy(self):
+        """Test that a measured ranking replaces the built-in order"""
+        available = ["Linear Regression", "SVM", "XGBoost", "Decision Tree"]
+        measured = ["Decision Tree", "XGBoost", "Linear Regression", "SVM"]
+
+        self.assertEqual(rank_candidates("auto", available, measured), measured)
+        self.assertEqual(rank_candidates("XGBoost", available, measured), ["XGBoost", "Linear Regression", "SVM"])
+        self.assertEqual(rank_candidates("auto", available, [])[0], "XGBoost")
+
+class DeadlinePredictTest(unittest.TestCase):
+    """Test cases for latency-budget mode on /api/predict"""
+
+    def setUp(self):
+        self.app = app_module.app.test_client()
+        self.building = {
+            "relativeCompactness": 0.98,
+            "wallArea": 294.0,
+            "roofArea": 110.25,
+            "overallHeight": 7.0,
+            "glazingArea": 0.0,
+            "glazingAreaDistribution": 0,
+        }
+        app_module.load_models()
+
+    def test_reports_selection(self):
+        """Test that the response reports the model actually used"""
+        response = self.app.post('/api/predict', data=json.dumps(dict(self.building, deadlineMs=5000)), content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('model_selection', data)
+        self.assertEqual(data['model_used'] is None, data['model_selection']['cut_off'])
+
+    def test_auto_starts_from_the_measured_ranking(self):
+        """Test that "auto" starts from the most accurate model on the leaderboard"""
+        data = json.loads(self.app.post('/api/predict', data=json.dumps(dict(self.building, deadlineMs=5000)), content_type='application/json').data)
+
+        self.assertEqual(data['model_used'], app_module.serving.evaluation.accuracy_ranking()[0])
+
+    def test_slow_model_is_cut_off(self):
+        """Test that a call still running at the deadline is abandoned"""
+        original = app_module.serving.heating["Linear Regression"]
+
+        class SlowModel:
+            def predict(self, X):
+                time.sleep(0.3)
+                return original.predict(X)
+
+        app_module.serving.heating["Linear Regression"] = SlowModel()
+        try:
+            with mock.patch.object(app_module.latency_tracker, "record_failure") as record_failure:
+                payload = dict(self.building, model="Linear Regression", deadlineMs=50)
+                started = time.perf_counter()
+                data = json.loads(self.app.post('/api/predict', data=json.dumps(payload), content_type='application/json').data)
+                elapsed = time.perf_counter() - started
+                record_failure.assert_not_called()
+                # The overrun counts against the breaker once the abandoned call finishes
+                time.sleep(0.4)
+                record_failure.assert_called_once_with("Linear Regression")
+        finally:
+            app_module.serving.heating["Linear Regression"] = original
+
+        self.assertLess(elapsed, 0.25)
+        self.assertTrue(data['model_selection']['cut_off'])
+        self.assertIsNone(data['model_used'])
+
+    def test_queued_call_is_cancelled(self):
+        """Test that a call still queued at the deadline is cancelled and not counted against the model"""
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        executor.submit(release.wait)
+        try:
+            with mock.patch.object(app_module, "PREDICTION_EXECUTOR", executor), \
+                    mock.patch.object(app_module, "prediction_slots", threading.BoundedSemaphore(2)), \
+                    mock.patch.object(app_module.latency_tracker, "record_failure") as record_failure, \
+                    mock.patch.object(app_module, "predict_loads", wraps=app_module.predict_loads) as predict:
+                payload = dict(self.building, model="Linear Regression", deadlineMs=50)
+                data = json.loads(self.app.post('/api/predict', data=json.dumps(payload), content_type='application/json').data)
+                release.set()
+                executor.shutdown(wait=True)
+                predict.assert_not_called()
+                record_failure.assert_not_called()
+        finally:
+            release.set()
+            executor.shutdown(wait=True)
+
+        self.assertTrue(data['model_selection']['cut_off'])
+
+    def test_saturated_executor_degrades(self):
+        """Test that a request answers with the fallback at once while every prediction thread is busy"""
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch.object(app_module, "prediction_slots", slots), \
+                mock.patch.object(app_module, "predict_loads", wraps=app_module.predict_loads) as predict:
+            data = json.loads(self.app.post('/api/predict', data=json.dumps(dict(self.building, deadlineMs=5000)), content_type='application/json').data)
+            predict.assert_not_called()
+
+        self.assertTrue(data['model_selection']['cut_off'])
+        self.assertEqual(data['model_selection']['reason'], "prediction executor saturated")
+        self.assertIsNone(data['model_used'])
+
+    def test_invalid_deadline(self):
+        """Test that a non-positive deadline is rejected"""
+        response = self.app.post('/api/predict', data=json.dumps(dict(self.building, deadlineMs=-1)), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
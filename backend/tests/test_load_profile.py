@@ -0,0 +1,136 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from load_profile import BASE_TEMPERATURE_C, HOURS_PER_YEAR, LoadProfiles, hourly_temperatures, parse_durations
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+CITIES = ["Cold", "Mild", "Hot"]
+HDD = [2600.0, 700.0, 12.8]
+CDD = [330.0, 1050.0, 1500.0]
+
+class LoadProfilesTest(unittest.TestCase):
+    """Test cases for fitting city shapes and deriving figures from them"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.profiles = LoadProfiles(CITIES, HDD, CDD)
+        rng = np.random.default_rng(0)
+        cls.heating_kwh = rng.uniform(0, 20000, (20, 3))
+        cls.cooling_kwh = rng.uniform(0, 20000, (20, 3))
+        cls.heating_kwh[0] = 0
+
+    def test_fit_reproduces_degree_days(self):
+        """Test that the synthetic temperatures give back each city's HDD and CDD"""
+        temperatures = hourly_temperatures(self.profiles.mean, self.profiles.seasonal_amplitude)
+        np.testing.assert_allclose(np.maximum(BASE_TEMPERATURE_C - temperatures, 0).sum(axis=1) / 24, HDD, rtol=1e-6)
+        np.testing.assert_allclose(np.maximum(temperatures - BASE_TEMPERATURE_C, 0).sum(axis=1) / 24, CDD, rtol=1e-6)
+        self.assertGreater(self.profiles.seasonal_amplitude[0], self.profiles.seasonal_amplitude[2])
+
+    def test_profiles_keep_annual_energy(self):
+        """Test that hourly and monthly profiles add up to the annual energy and never overlap"""
+        heating, cooling = self.profiles.hourly(self.heating_kwh, self.cooling_kwh)
+        self.assertEqual(heating.shape, (20, 3, HOURS_PER_YEAR))
+        np.testing.assert_allclose(heating.sum(axis=-1), self.heating_kwh)
+        self.assertFalse(np.any((heating > 0) & (cooling > 0)))
+        figures = self.profiles.simulate(self.heating_kwh, self.cooling_kwh)
+        np.testing.assert_allclose(figures["monthlyCoolingKwh"].sum(axis=-1), self.cooling_kwh)
+        np.testing.assert_allclose(figures["peakKw"], (heating + cooling).max(axis=-1))
+        np.testing.assert_allclose(figures["peakHeatingKw"], heating.max(axis=-1))
+
+    def test_load_duration_matches_sorted_profile(self):
+        """Test that the load-duration points equal the sorted hourly profile, for a subset of cities"""
+        columns = self.profiles.indices(["Hot", "Cold"])
+        durations = [1, 2, 50, 3000, 8000, 8760]
+        curve = self.profiles.load_duration(self.heating_kwh[:, :2], self.cooling_kwh[:, :2], columns, durations)
+        heating, cooling = self.profiles.hourly(self.heating_kwh[:, :2], self.cooling_kwh[:, :2], columns)
+        ordered = -np.sort(-(heating + cooling), axis=-1)
+        np.testing.assert_allclose(curve, ordered[..., np.array(durations) - 1])
+
+    def test_invalid_arguments(self):
+        """Test that unknown cities and out-of-range durations raise"""
+        with self.assertRaises(ValueError):
+            self.profiles.indices(["Atlantis"])
+        for durations in ([0], [8761], "10", []):
+            with self.assertRaises(ValueError):
+                parse_durations(durations)
+        self.assertEqual(parse_durations([100, 1, 100]), [1, 100])
+
+class LoadProfileApiTest(unittest.TestCase):
+    """Test cases for the load profile endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        app_module.load_city_data()
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def post(self, body):
+        response = self.client.post('/api/load-profile', data=json.dumps(body), content_type='application/json')
+        return response.status_code, json.loads(response.data)
+
+    def test_profiles_per_city(self):
+        """Test that every valid building gets figures per city and invalid ones are reported"""
+        cities = ["Hanoi (Northern)", "Ho Chi Minh City (Southern)"]
+        status, data = self.post({"buildings": [BUILDING, dict(BUILDING, wallArea=-1)], "cities": cities, "durations": [1, 8760]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data['cities'], cities)
+        self.assertIsNone(data['profiles'][1])
+        self.assertEqual(data['errors'][0]['index'], 1)
+        hanoi = data['profiles'][0]['Hanoi (Northern)']
+        self.assertEqual(hanoi['loadDurationKw'][0], hanoi['peakKw'])
+        self.assertEqual(len(hanoi['monthlyHeatingKwh']), 12)
+        self.assertAlmostEqual(sum(hanoi['monthlyHeatingKwh']), hanoi['heatingKwh'], delta=0.1)
+        # Hanoi heats in winter, Ho Chi Minh City barely at all
+        self.assertGreater(hanoi['monthlyHeatingKwh'][0], hanoi['monthlyHeatingKwh'][6])
+        self.assertGreater(data['climate']['Hanoi (Northern)']['heatingFullLoadHours'], 0)
+
+    def test_hourly_profile(self):
+        """Test that a single building can get its 8760-hour profile"""
+        status, data = self.post({"buildings": [BUILDING], "cities": ["Hue (Central)"], "hourly": True})
+        self.assertEqual(status, 200)
+        hourly = data['hourly']['Hue (Central)']
+        self.assertEqual(len(hourly['heatingKw']), HOURS_PER_YEAR)
+        self.assertAlmostEqual(max(hourly['heatingKw']), data['profiles'][0]['Hue (Central)']['peakHeatingKw'], delta=0.01)
+
+    def test_invalid_requests(self):
+        """Test that unknown cities, bad durations and hourly batches are rejected"""
+        for body in (
+            {"cities": ["Hanoi (Northern)"]},
+            {"buildings": [BUILDING], "cities": ["Atlantis"]},
+            {"buildings": [BUILDING], "durations": [0]},
+            {"buildings": [BUILDING, BUILDING], "hourly": True}
+        ):
+            status, data = self.post(body)
+            self.assertEqual(status, 400, body)
+            self.assertFalse(data['success'])
+
+    def test_no_valid_buildings(self):
+        """Test that a request without a valid building is rejected with the per-row errors"""
+        for buildings in ([dict(BUILDING, wallArea=-1)], []):
+            status, data = self.post({"buildings": buildings, "cities": ["Hanoi (Northern)"]})
+            self.assertEqual(status, 400)
+            self.assertEqual({error['index'] for error in data['errors']}, set(range(len(buildings))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,11 @@ import json
 # Add the parent directory to the path so we can import the app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import app, load_models, models
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from app import app, load_models
+from serving import ServingState
 
 class ModelLoadingTest(unittest.TestCase):
     """Test cases for model loading"""
@@ -17,7 +21,7 @@ class ModelLoadingTest(unittest.TestCase):
         self.app.testing = True
         
         # Clear existing models
-        models.clear()
+        app_module.serving = ServingState()
     
     def test_model_loading(self):
         """Test that models load correctly"""
@@ -27,10 +31,9 @@ class ModelLoadingTest(unittest.TestCase):
         # Check that models loaded successfully
         self.assertTrue(result, "Model loading should return True")
         
-        # Check that models dictionary has expected keys
-        self.assertIn("transformer", models, "Column transformer should be loaded")
-        self.assertIn("heating", models, "Heating models should be loaded")
-        self.assertIn("cooling", models, "Cooling models should be loaded")
+        # Check that the served state has the transformer and both model dicts
+        models = {"heating": app_module.serving.heating, "cooling": app_module.serving.cooling}
+        self.assertIsNotNone(app_module.serving.transformer, "Column transformer should be loaded")
         
         # Check that heating and cooling models are loaded
         self.assertTrue(len(models["heating"]) > 0, "At least one heating model should be loaded")
@@ -0,0 +1,130 @@
+import unittest
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from metrics import MetricsRegistry
+from prediction_log import PredictionLog, glazing_buckets
+
+FEATURES = np.array([
+    [0.98, 294.0, 110.25, 7.0, 0.0, 0],
+    [0.90, 318.5, 122.5, 7.0, 0.1, 1],
+    [0.74, 245.0, 220.5, 3.5, 0.25, 3],
+    [0.62, 367.5, 220.5, 3.5, 0.4, 5]
+])
+
+class PredictionLogTest(unittest.TestCase):
+    """Test cases for the buffered SQLite prediction log"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "predictions.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_log(self, **kwargs):
+        return PredictionLog(self.path, flush_seconds=3600, registry=MetricsRegistry(), **kwargs)
+
+    def test_glazing_buckets(self):
+        """Test that the ENB2012 glazing areas fall in one bucket each"""
+        self.assertEqual(glazing_buckets(np.array([0.0, 0.1, 0.25, 0.4])).tolist(), ["none", "low", "medium", "high"])
+
+    def test_flush_writes_rows(self):
+        """Test that buffered batches are written with their inputs and outputs"""
+        log = self.make_log()
+        log.record(FEATURES, np.arange(4.0), np.arange(4.0) * 2, "Linear Regression", "abc", 8.0, "/api/predict/batch", "req-1")
+        self.assertEqual(log.flush(), 4)
+        self.assertEqual(log.flush(), 0)
+
+        with sqlite3.connect(self.path) as db:
+            rows = db.execute(
+                "SELECT model, model_version, endpoint, request_id, latency_ms, glazing_area_distribution, "
+                "glazing_bucket, cooling_load FROM predictions ORDER BY id"
+            ).fetchall()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[3], ("Linear Regression", "abc", "/api/predict/batch", "req-1", 2.0, 5, "high", 6.0))
+
+    def test_full_buffer_drops_oldest(self):
+        """Test that the oldest batches are dropped and counted once the buffer is full"""
+        log = self.make_log(capacity=6)
+        for index in range(3):
+            log.record(FEATURES, np.full(4, float(index)), np.zeros(4), "Linear Regression")
+        self.assertEqual(log.dropped, 8)
+        self.assertEqual(log.registry.value("prediction_log_dropped_total"), 8)
+        self.assertEqual(log.flush(), 4)
+
+    def test_stats_groups_and_histograms(self):
+        """Test counts, load distributions and filters of the aggregation query"""
+        log = self.make_log()
+        log.record(FEATURES, np.array([1.0, 6.0, 7.0, -1.0]), np.zeros(4), "Linear Regression")
+        log.record(FEATURES[:2], np.array([20.0, 30.0]), np.zeros(2), "Random Forest")
+
+        groups = log.stats(group_by=["model"])
+        self.assertEqual([(group["model"], group["count"]) for group in groups], [("Linear Regression", 4), ("Random Forest", 2)])
+        self.assertEqual(groups[0]["heating_load"]["histogram"], {-5.0: 1, 0.0: 1, 5.0: 2})
+        self.assertEqual(groups[0]["heating_load"]["max"], 7.0)
+
+        glazing = log.stats(group_by=["glazing"], model="Random Forest")
+        self.assertEqual([(group["glazing"], group["count"]) for group in glazing], [("low", 1), ("none", 1)])
+
+        self.assertEqual(log.stats(group_by=[])[0]["count"], 6)
+        self.assertEqual(log.stats(since="2999-01-01"), [])
+        with self.assertRaises(ValueError):
+            log.stats(group_by=["orientation"])
+        with self.assertRaises(ValueError):
+            log.stats(since="yesterday")
+
+class PredictionLogApiTest(unittest.TestCase):
+    """Test cases for prediction logging through the API"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.original = app_module.prediction_log
+        app_module.prediction_log = PredictionLog(
+            os.path.join(self.directory, "predictions.db"), flush_seconds=3600, registry=MetricsRegistry()
+        )
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.prediction_log = self.original
+        shutil.rmtree(self.directory)
+
+    def test_batch_predictions_are_logged(self):
+        """Test that a batch prediction shows up in the stats endpoint"""
+        buildings = [{
+            "relativeCompactness": 0.98,
+            "wallArea": 294.0,
+            "roofArea": 110.25,
+            "overallHeight": 7.0,
+            "glazingArea": glazing,
+            "glazingAreaDistribution": 1
+        } for glazing in (0.1, 0.25, 0.4)]
+        response = self.client.post('/api/predict/batch', data=json.dumps({"buildings": buildings}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/predictions/stats?group_by=glazing')
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual(sorted((group["glazing"], group["count"]) for group in data['groups']), [("high", 1), ("low", 1), ("medium", 1)])
+
+    def test_invalid_group_by(self):
+        """Test that an unknown grouping is rejected"""
+        response = self.client.get('/api/predictions/stats?group_by=orientation')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(json.loads(response.data)['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from metrics import MetricsRegistry
+from result_cache import ENTRY_OVERHEAD_BYTES, RESULT_CACHE_MAX_ROWS, ResultCache, cache_key
+from serving import ServingState
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+def store_in_other_process(path):
+    """Worker-side half of the cross-process test"""
+    ResultCache(path, registry=MetricsRegistry()).put("prediction", "v1", cache_key("shared"), b"from another worker")
+    return os.getpid()
+
+class ResultCacheTest(unittest.TestCase):
+    """Test cases for the shared result cache"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "results.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache(self, **kwargs):
+        return ResultCache(self.path, registry=MetricsRegistry(), **kwargs)
+
+    def stored_bytes(self):
+        with sqlite3.connect(self.path) as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def test_keys(self):
+        """Test that keys differ by every part and by how the parts are split"""
+        self.assertEqual(cache_key("v1", "SVM", b"row"), cache_key("v1", "SVM", b"row"))
+        self.assertNotEqual(cache_key("v1", "SVM", b"row"), cache_key("v2", "SVM", b"row"))
+        self.assertNotEqual(cache_key("ab", "c"), cache_key("a", "bc"))
+
+    def test_shared_between_instances_and_processes(self):
+        """Test that an entry stored by one worker is read by another"""
+        first, second = self.cache(), self.cache()
+        first.put_many("prediction", "v1", [(cache_key(1), b"one"), (cache_key(2), b"two")])
+        self.assertEqual(second.get_many("prediction", [cache_key(2), cache_key(3), cache_key(1)]), [b"two", None, b"one"])
+        self.assertIsNone(second.get("chart", cache_key(1)))
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            self.assertNotEqual(pool.submit(store_in_other_process, self.path).result(), os.getpid())
+        self.assertEqual(first.get("prediction", cache_key("shared")), b"from another worker")
+
+    def test_new_version_retires_old_entries(self):
+        """Test that writing a kind under a new version drops that kind's other versions"""
+        cache = self.cache()
+        cache.put("prediction", "v1", cache_key("old"), b"x")
+        cache.put("chart", "c1", cache_key("chart"), b"png")
+        self.cache().put("prediction", "v2", cache_key("new"), b"y")
+        self.assertIsNone(cache.get("prediction", cache_key("old")))
+        self.assertEqual(cache.get("chart", cache_key("chart")), b"png")
+        self.assertEqual(cache.stats()["bytes"], self.stored_bytes())
+
+    def test_eviction_keeps_recently_read_entries(self):
+        """Test that the size limit evicts the least recently used entries first"""
+        entry = 16 + 100 + ENTRY_OVERHEAD_BYTES
+        cache = self.cache(max_bytes=entry * 10)
+        cache.put_many("prediction", "v1", [(cache_key(i), bytes(100)) for i in range(10)])
+        self.assertEqual(cache.get("prediction", cache_key(0)), bytes(100))
+
+        cache.put("prediction", "v1", cache_key(10), bytes(100))
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], entry * 10)
+        self.assertEqual(stats["bytes"], self.stored_bytes())
+        self.assertIsNotNone(cache.get("prediction", cache_key(0)))
+        self.assertIsNotNone(cache.get("prediction", cache_key(10)))
+        # Down to the low watermark: two of the entries nobody read are gone
+        remaining = cache.get_many("prediction", [cache_key(i) for i in range(1, 10)])
+        self.assertEqual(sum(value is None for value in remaining), 2)
+
+        # Storing an entry again does not count its size twice
+        cache.put("prediction", "v1", cache_key(10), bytes(100))
+        self.assertEqual(cache.stats()["bytes"], self.stored_bytes())
+
+class CachedPredictionApiTest(unittest.TestCase):
+    """Test cases for the result cache behind the prediction and chart endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.directory = tempfile.mkdtemp()
+        cls.original = app_module.result_cache
+
+    @classmethod
+    def tearDownClass(cls):
+        app_module.result_cache = cls.original
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        app_module.result_cache = ResultCache(os.path.join(self.directory, "results.db"), registry=MetricsRegistry())
+        app_module.result_cache.clear()
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def post(self, path, body):
+        response = self.client.post(path, data=json.dumps(body), content_type='application/json')
+        return response.status_code, json.loads(response.data)
+
+    def test_repeated_buildings_skip_the_model(self):
+        """Test that cached buildings are answered without a model call, and only misses are predicted"""
+        buildings = [dict(BUILDING, wallArea=250.0 + i) for i in range(10)]
+        _, first = self.post('/api/predict/batch', {"buildings": buildings, "model": "Decision Tree"})
+        with mock.patch.object(app_module, "predict_loads", wraps=app_module.predict_loads) as predict:
+            _, second = self.post('/api/predict/batch', {"buildings": buildings, "model": "Decision Tree"})
+            predict.assert_not_called()
+            self.assertEqual(second['data'], first['data'])
+
+            _, third = self.post('/api/predict/batch', {"buildings": buildings[:5] + [dict(BUILDING, wallArea=300.5)], "model": "Decision Tree"})
+            self.assertEqual(len(predict.call_args[0][0]), 1)
+            self.assertEqual(third['data'][:5], first['data'][:5])
+
+            # Another model is another entry
+            self.post('/api/predict', dict(buildings[0], model="Linear Regression"))
+            self.assertEqual(predict.call_count, 2)
+
+    def test_model_version_invalidates(self):
+        """Test that a new model version misses and retires the old entries"""
+        self.post('/api/predict', BUILDING)
+        state = app_module.serving
+        retrained = ServingState(state.transformer, state.heating, state.cooling, "retrained", state.run_id, state.approximations, state.evaluation)
+        with mock.patch.object(app_module, "serving", retrained):
+            with mock.patch.object(app_module, "predict_loads", wraps=app_module.predict_loads) as predict:
+                self.post('/api/predict', BUILDING)
+                predict.assert_called_once()
+            versions = {entry["version"] for entry in app_module.result_cache.stats()["kinds"]}
+        self.assertEqual(versions, {"retrained"})
+
+    def test_version_published_mid_request(self):
+        """Test that results computed by one version are not stored under a version published meanwhile"""
+        state = app_module.serving
+        retrained = ServingState(state.transformer, state.heating, state.cooling, "retrained", state.run_id, state.approximations, state.evaluation)
+        predict_loads = app_module.predict_loads
+
+        def publish_then_predict(*args, **kwargs):
+            app_module.serving = retrained
+            return predict_loads(*args, **kwargs)
+
+        try:
+            with mock.patch.object(app_module, "predict_loads", side_effect=publish_then_predict):
+                self.post('/api/predict', BUILDING)
+        finally:
+            app_module.serving = state
+        versions = {entry["version"] for entry in app_module.result_cache.stats()["kinds"]}
+        self.assertEqual(versions, {state.version})
+
+    def test_large_batches_bypass(self):
+        """Test that batches over the row limit go straight to the model"""
+        buildings = [dict(BUILDING, wallArea=250.0 + i * 0.1) for i in range(RESULT_CACHE_MAX_ROWS + 1)]
+        status, _ = self.post('/api/predict/batch', {"buildings": buildings})
+        self.assertEqual(status, 200)
+        self.assertEqual(app_module.result_cache.stats()["kinds"], [])
+
+    def test_broken_cache_falls_back(self):
+        """Test that a failing cache does not fail predictions"""
+        with mock.patch.object(app_module.result_cache, "get_many", side_effect=sqlite3.OperationalError("disk I/O error")):
+            status, data = self.post('/api/predict', BUILDING)
+        self.assertEqual(status, 200)
+        self.assertTrue(data['success'])
+
+    def test_cache_endpoint(self):
+        """Test that the cache reports its usage and can be emptied"""
+        self.post('/api/predict', BUILDING)
+        data = json.loads(self.client.get('/api/cache').data)
+        self.assertEqual(data['kinds'][0]['kind'], 'prediction')
+        self.assertEqual(data['model_version'], app_module.serving.version)
+        self.assertTrue(json.loads(self.client.delete('/api/cache').data)['cleared'])
+        self.assertEqual(json.loads(self.client.get('/api/cache').data)['bytes'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
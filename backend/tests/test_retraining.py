@@ -0,0 +1,210 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from data import load_dataset
+from metrics import MetricsRegistry
+from retraining import FIELD_HOLDOUT_EVERY, MeasurementStore, Retrainer, read_manifest, train_and_publish
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+def enb_measurements(count, scale=1.0, seed=0):
+    """ENB2012 buildings with their loads scaled, standing in for field measurements"""
+    dataset = load_dataset()
+    rows = np.random.default_rng(seed).integers(0, len(dataset), size=count)
+    return dataset.features[rows], dataset.column("Heating Load")[rows] * scale, dataset.column("Cooling Load")[rows] * scale
+
+class MeasurementStoreTest(unittest.TestCase):
+    """Test cases for the measurement store and run leases"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = MeasurementStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_append_and_load(self):
+        """Test that measurements come back in order with their loads"""
+        features, heating, cooling = enb_measurements(3)
+        self.assertEqual(self.store.append(features, heating, cooling, source="meter"), 3)
+        ids, loaded, loaded_heating, _ = self.store.load()
+        np.testing.assert_array_equal(ids, [1, 2, 3])
+        np.testing.assert_allclose(loaded, features)
+        np.testing.assert_allclose(loaded_heating, heating)
+        self.assertEqual(self.store.load(upto=2)[0].tolist(), [1, 2])
+
+    def test_claim_needs_new_measurements_and_one_run_at_a_time(self):
+        """Test that runs are claimed once enough measurements arrive, by one owner at a time"""
+        self.store.append(*enb_measurements(5))
+        self.assertIsNone(self.store.claim_run("a", 10, 0, 60))
+        run = self.store.claim_run("a", 5, 0, 60)
+        self.assertEqual(run["measurements_upto"], 5)
+        self.assertIsNone(self.store.claim_run("b", 1, 0, 60))
+
+        self.store.finish_run(run["id"], "a", "rejected")
+        self.assertEqual(self.store.pending(), 0)
+        self.store.append(*enb_measurements(1))
+        self.assertIsNone(self.store.claim_run("b", 1, 3600, 60))
+        self.assertIsNotNone(self.store.claim_run("b", 1, 0, 60))
+
+    def test_expired_lease_is_failed(self):
+        """Test that a run without a heartbeat is failed so another process can train"""
+        self.store.append(*enb_measurements(1))
+        run = self.store.claim_run("a", 1, 0, 60)
+        time.sleep(0.01)
+        self.assertIsNotNone(self.store.claim_run("b", 1, 0, 0.001))
+        self.assertEqual(self.store.runs()[-1]["status"], "failed")
+        self.assertFalse(self.store.heartbeat(run["id"], "a"))
+
+class RetrainingTest(unittest.TestCase):
+    """Test cases for training, validating and hot-swapping models"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        # Back to the shipped models, so the next run publishing run 1 is swapped in again
+        app_module.load_models()
+
+    def test_publish_and_swap(self):
+        """Test that a forced run publishes a version and the app swaps it in"""
+        retrainer = Retrainer(
+            app_module.publish_models, self.directory, app_module.MODEL_DIR,
+            min_measurements=1000, in_process=True, registry=MetricsRegistry()
+        )
+        retrainer.ingest(*enb_measurements(100, scale=1.05))
+        self.assertIsNone(retrainer.maybe_train())
+        old_state = app_module.serving
+        old_version, old_heating = old_state.version, old_state.heating
+
+        retrainer.trigger()
+        result = retrainer.maybe_train()
+        self.assertEqual(result["status"], "published")
+        self.assertEqual(len(result["validation"]), 2 * len(old_heating))
+        self.assertEqual(read_manifest(self.directory)["run_id"], 1)
+
+        self.assertEqual(app_module.serving.run_id, 1)
+        self.assertNotEqual(app_module.serving.version, old_version)
+        self.assertIsNot(app_module.serving.heating, old_heating)
+        self.assertEqual(set(app_module.serving.heating), set(old_heating))
+        self.assertEqual(app_module.serving.evaluation.model_version, app_module.serving.version)
+        self.assertEqual(retrainer.status()["runs"][0]["version"], "run-00001")
+        # The old snapshot is replaced, not modified, so requests holding it finish on one version
+        self.assertEqual(old_state.version, old_version)
+        self.assertIs(old_state.heating, old_heating)
+
+    def test_publish_drops_old_approximations(self):
+        """Test that a version published without SVM approximations does not serve the old ones"""
+        with mock.patch.object(app_module, "SVR_FAST_PATH", True):
+            app_module.load_models()
+        self.assertTrue(app_module.serving.approximations)
+        store = MeasurementStore(self.directory)
+        store.append(*enb_measurements(100, scale=1.05))
+        result = train_and_publish(1, 100, self.directory, app_module.MODEL_DIR)
+        self.assertEqual(result["status"], "published")
+
+        self.assertTrue(app_module.publish_models(result["manifest"]))
+        self.assertEqual(app_module.serving.run_id, 1)
+        self.assertEqual(app_module.serving.approximations, {})
+        self.assertFalse(app_module.svr_fast_path("SVM"))
+
+    def test_forced_run_without_field_holdout(self):
+        """Test that a forced run with too few measurements to hold any out validates on ENB2012 alone"""
+        retrainer = Retrainer(
+            app_module.publish_models, self.directory, app_module.MODEL_DIR,
+            min_measurements=1000, in_process=True, registry=MetricsRegistry()
+        )
+        retrainer.ingest(*enb_measurements(FIELD_HOLDOUT_EVERY - 1))
+        retrainer.trigger()
+        result = retrainer.maybe_train()
+        self.assertIn(result["status"], ("published", "rejected"))
+        for entry in result["validation"]:
+            self.assertIsNone(entry.get("field_rmse_after"))
+
+    def test_poisoned_measurements_are_not_published(self):
+        """Test that refits made worse on ENB2012 by bad labels keep the serving model"""
+        store = MeasurementStore(self.directory)
+        store.append(*enb_measurements(300, scale=3.0))
+        result = train_and_publish(1, 300, self.directory, app_module.MODEL_DIR)
+        rejected = {(entry["target"], entry["model"]) for entry in result["validation"] if not entry["accepted"]}
+        for name in ("Random Forest", "Decision Tree", "K-Nearest Neighbors"):
+            self.assertIn(("heating", name), rejected)
+            self.assertIn(("cooling", name), rejected)
+
+class MeasurementApiTest(unittest.TestCase):
+    """Test cases for the measurement and retraining endpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.directory = tempfile.mkdtemp()
+        cls.original = app_module.retrainer
+        app_module.retrainer = Retrainer(
+            app_module.publish_models, cls.directory, app_module.MODEL_DIR,
+            min_measurements=10 ** 6, poll_seconds=3600, registry=MetricsRegistry()
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        app_module.retrainer.stop()
+        app_module.retrainer = cls.original
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def test_ingest_and_status(self):
+        """Test that valid measurements are stored and invalid ones reported"""
+        measurements = [
+            dict(BUILDING, heatingLoad=15.2, coolingLoad=19.1),
+            dict(BUILDING, heatingLoad=14.0),
+            dict(BUILDING, wallArea=-1, heatingLoad=15.0, coolingLoad=19.0),
+            dict(BUILDING, glazingArea=0.25, heatingLoad=17.5, coolingLoad=20.3)
+        ]
+        response = self.client.post('/api/measurements', data=json.dumps({"measurements": measurements, "source": "survey"}), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        self.assertEqual(data['stored'], 2)
+        self.assertEqual(sorted({error['index'] for error in data['errors']}), [1, 2])
+        self.assertEqual(app_module.retrainer.store.load()[2].tolist(), [15.2, 17.5])
+
+        status = json.loads(self.client.get('/api/retraining').data)
+        self.assertEqual(status['measurements'], 2)
+        self.assertIsNone(status['published'])
+        self.assertEqual(status['serving']['model_version'], app_module.serving.version)
+
+    def test_no_valid_measurements(self):
+        """Test that a body without a valid measurement is rejected"""
+        response = self.client.post('/api/measurements', data=json.dumps(BUILDING), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['errors'][0]['field'], 'heatingLoad')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import json
+import os
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from utils import load_enb2012
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class SimilarBuildingsTest(unittest.TestCase):
+    """Test cases for the similar-buildings search"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.client = app_module.app.test_client()
+
+    def test_load_enb2012_names_columns(self):
+        """Test that the dataset columns are mapped to feature names"""
+        data = load_enb2012()
+
+        self.assertEqual(len(data), 768)
+        self.assertIn("Wall Area", data.columns)
+        self.assertIn("Heating Load", data.columns)
+
+    def test_exact_match_comes_first(self):
+        """Test that a dataset building is its own nearest neighbour"""
+        response = self.client.post('/api/similar-buildings', data=json.dumps(dict(BUILDING, k=3)), content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data['data']), 3)
+        self.assertEqual(data['data'][0]['distance'], 0.0)
+        self.assertEqual(data['data'][0]['wallArea'], 294.0)
+        self.assertIn('heatingLoad', data['data'][0])
+
+    def test_batch_query(self):
+        """Test batched queries with an invalid row"""
+        payload = {"buildings": [BUILDING, {"wallArea": 1}], "k": 2}
+        response = self.client.post('/api/similar-buildings', data=json.dumps(payload), content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertEqual(len(data['data'][0]), 2)
+        self.assertIsNone(data['data'][1])
+        self.assertTrue(data['errors'])
+
+    def test_batch_without_valid_buildings(self):
+        """Test that a batch with no valid building is rejected with the per-row errors"""
+        for buildings in ([{"wallArea": 1}, dict(BUILDING, glazingArea=-1)], []):
+            response = self.client.post('/api/similar-buildings', data=json.dumps({"buildings": buildings}), content_type='application/json')
+            data = json.loads(response.data)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(data['success'])
+            self.assertEqual({error['index'] for error in data['errors']}, set(range(len(buildings))))
+
+    def test_invalid_k(self):
+        """Test that k outside 1..50 is rejected"""
+        response = self.client.post('/api/similar-buildings', data=json.dumps(dict(BUILDING, k=0)), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
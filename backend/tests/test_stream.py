@@ -0,0 +1,91 @@
+import unittest
+import io
+import json
+import os
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from formats import read_ndjson
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class ReadNdjsonTest(unittest.TestCase):
+    """Test cases for the NDJSON reader"""
+
+    def test_reports_bad_lines_and_continues(self):
+        """Test that invalid and oversized lines are reported inline"""
+        body = b'{"a": 1}\n\nnot json\n' + b'x' * 50 + b'\n{"b": 2}'
+        lines = list(read_ndjson(io.BytesIO(body), max_line_bytes=20))
+
+        self.assertEqual([line for line, _, _ in lines], [1, 3, 4, 5])
+        self.assertEqual(lines[0][1], {"a": 1})
+        self.assertTrue(lines[1][2].startswith("Invalid JSON"))
+        self.assertIn("exceeds", lines[2][2])
+        self.assertEqual(lines[3][1], {"b": 2})
+
+class PredictStreamTest(unittest.TestCase):
+    """Test cases for the streaming prediction endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+        cls.client = app_module.app.test_client()
+
+    def post_stream(self, lines, **kwargs):
+        body = "".join(line + "\n" for line in lines).encode()
+        return self.client.post(
+            '/api/predict/stream?model=Linear Regression',
+            input_stream=io.BytesIO(body),
+            headers={"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked"},
+            environ_overrides={"wsgi.input_terminated": True},
+            **kwargs
+        )
+
+    def test_results_and_inline_errors(self):
+        """Test that every line gets a result in input order, errors included"""
+        lines = [
+            json.dumps(dict(BUILDING, id="a")),
+            "{broken",
+            json.dumps(dict(BUILDING, wallArea=-1)),
+            json.dumps(BUILDING)
+        ]
+        response = self.post_stream(lines)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        self.assertEqual([result.get("line") for result in results[:-1]], [1, 2, 3, 4])
+        self.assertEqual(results[0]["id"], "a")
+        self.assertIn("heatingLoad", results[0])
+        self.assertTrue(results[1]["errors"][0]["error"].startswith("Invalid JSON"))
+        self.assertEqual(results[2]["errors"][0]["field"], "wallArea")
+        self.assertEqual(results[3]["heatingLoad"], results[0]["heatingLoad"])
+        self.assertEqual(results[-1]["summary"], {"records": 4, "predicted": 2, "errors": 2, "model_used": "Linear Regression"})
+
+    def test_output_is_incremental(self):
+        """Test that results are written batch by batch"""
+        original = app_module.STREAM_BATCH_SIZE
+        app_module.STREAM_BATCH_SIZE = 2
+        try:
+            response = self.post_stream([json.dumps(BUILDING)] * 5, buffered=False)
+            chunks = [chunk for chunk in response.response if chunk]
+            response.close()
+        finally:
+            app_module.STREAM_BATCH_SIZE = original
+
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2, 1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import io
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+from app import app
+from structured_logging import DroppingQueueHandler, ErrorRateLimitFilter, JsonFormatter, SamplingFilter, log_event, parse_sampling
+
+def make_record(event, level=logging.INFO, **fields):
+    record = logging.LogRecord("energy_api.test", level, __file__, 1, "message", None, None)
+    record.event = event
+    record.fields = fields
+    return record
+
+class StructuredLoggingTest(unittest.TestCase):
+    """Test cases for the structured logging subsystem"""
+
+    def test_json_formatter(self):
+        """Test that records become one JSON object with their fields"""
+        record = make_record("prediction.model_chosen", model="SVM", duration_ms=1.5)
+        record.request_id = "abc"
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry["event"], "prediction.model_chosen")
+        self.assertEqual(entry["model"], "SVM")
+        self.assertEqual(entry["request_id"], "abc")
+
+    def test_exception_survives_the_queue(self):
+        """Test that an exception logged through the queue comes out as its own field"""
+        log_queue, output = queue.Queue(), io.StringIO()
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(JsonFormatter())
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        logger = logging.getLogger("energy_api.test_queue")
+        logger.addHandler(DroppingQueueHandler(log_queue))
+        logger.propagate = False
+        listener.start()
+        try:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                log_event(logger, "test.failed", "Division failed for %s", logging.ERROR, exc_info=True, model="SVM")
+        finally:
+            listener.stop()
+            logger.handlers.clear()
+        entry = json.loads(output.getvalue())
+
+        self.assertIn("ZeroDivisionError", entry["exception"])
+        self.assertEqual(entry["message"], "Division failed for %s")
+        self.assertEqual(entry["model"], "SVM")
+
+    def test_sampling(self):
+        """Test per-event sampling rates"""
+        sampling = SamplingFilter({"noisy": 0.0})
+
+        self.assertFalse(sampling.filter(make_record("noisy")))
+        self.assertTrue(sampling.filter(make_record("other")))
+        self.assertEqual(parse_sampling("a=0.5, b=1"), {"a": 0.5, "b": 1.0})
+
+    def test_error_rate_limit(self):
+        """Test that repeated errors are suppressed within the interval"""
+        limiter = ErrorRateLimitFilter(limit=2, interval=60.0)
+        results = [limiter.filter(make_record("boom", logging.ERROR)) for _ in range(5)]
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertTrue(limiter.filter(make_record("boom", logging.WARNING)))
+
+    def test_request_id_header(self):
+        """Test that the request id is echoed back"""
+        response = app.test_client().get('/health', headers={"X-Request-ID": "trace-1"})
+
+        self.assertEqual(response.headers["X-Request-ID"], "trace-1")
+
+if __name__ == '__main__':
+    unittest.main()
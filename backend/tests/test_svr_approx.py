@@ -0,0 +1,97 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.svm import SVR
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from svr_approx import fit_svr_approximation
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class SvrApproximationTest(unittest.TestCase):
+    """Test cases for the SVM fast-path approximation"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.uniform(size=(200, 6))
+        self.y = np.sin(3 * self.X).sum(axis=1)
+
+    def test_poly_kernel_is_reproduced_exactly(self):
+        """Test that a polynomial kernel SVR is matched to rounding error"""
+        svr = SVR(kernel="poly", degree=3, C=10).fit(self.X, self.y)
+        approx = fit_svr_approximation(svr)
+
+        np.testing.assert_allclose(approx.predict(self.X), svr.predict(self.X), atol=1e-6)
+        self.assertEqual(approx.describe()["method"], "polynomial")
+
+    def test_rbf_kernel_is_approximated(self):
+        """Test that an RBF SVR is approximated with a Nystroem map"""
+        svr = SVR(kernel="rbf", gamma=1.0, C=10).fit(self.X, self.y)
+        approx = fit_svr_approximation(svr, n_components=32)
+        difference = approx.predict(self.X) - svr.predict(self.X)
+
+        self.assertEqual(approx.describe(), {"kernel": "rbf", "method": "nystroem", "components": 32})
+        self.assertLess(np.sqrt(np.mean(difference ** 2)), 0.2 * self.y.std())
+
+    def test_all_support_vectors_as_landmarks_is_exact(self):
+        """Test that landmarks are capped at the support vectors, which makes the map exact"""
+        svr = SVR(kernel="rbf", gamma=1.0, C=10).fit(self.X, self.y)
+        approx = fit_svr_approximation(svr, n_components=10000)
+
+        self.assertEqual(approx.n_components, svr.support_vectors_.shape[0])
+        np.testing.assert_allclose(approx.predict(self.X), svr.predict(self.X), atol=1e-6)
+
+    def test_precomputed_kernel_is_rejected(self):
+        """Test that kernels without a feature map raise"""
+        svr = SVR(kernel="precomputed").fit(self.X @ self.X.T, self.y)
+
+        with self.assertRaises(ValueError):
+            fit_svr_approximation(svr)
+
+class SvrFastPathApiTest(unittest.TestCase):
+    """Test cases for the SVM fast path in the batch endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Fit the approximations, then leave the switch off until a test turns it on
+        app_module.SVR_FAST_PATH = True
+        app_module.load_models()
+        app_module.SVR_FAST_PATH = False
+        cls.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.SVR_FAST_PATH = False
+
+    def post_batch(self):
+        body = {"buildings": [BUILDING, dict(BUILDING, glazingArea=0.4)], "model": "SVM"}
+        response = self.client.post('/api/predict/batch', data=json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_fast_path_matches_exact_model(self):
+        """Test that the switch changes the model call but not the results"""
+        exact = self.post_batch()
+        app_module.SVR_FAST_PATH = True
+        fast = self.post_batch()
+
+        self.assertNotIn("approximation", exact)
+        self.assertEqual(fast["approximation"]["method"], "polynomial")
+        self.assertEqual(fast["data"], exact["data"])
+
+if __name__ == '__main__':
+    unittest.main()
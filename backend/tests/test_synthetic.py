@@ -0,0 +1,123 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+from werkzeug.serving import make_server
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from data import load_dataset
+from formats import pa
+from load_driver import HttpSender, LocalSender, drive, prefetch, request_bodies
+from synthetic import generate, read_chunks, write_chunks
+from utils import INPUT_SCHEMA
+
+class GeneratorTest(unittest.TestCase):
+    """Test cases for sampling synthetic buildings"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.features = np.asarray(load_dataset().features)
+
+    def test_seeded_rows_from_enb2012(self):
+        """Test that the same seed gives the same rows, all of them ENB2012 buildings without jitter"""
+        first = np.concatenate(list(generate(2500, seed=3, chunk_rows=1000)))
+        second = np.concatenate(list(generate(2500, seed=3, chunk_rows=1000)))
+        self.assertEqual(first.shape, (2500, len(INPUT_SCHEMA.fields)))
+        np.testing.assert_array_equal(first, second)
+        known = {tuple(row) for row in self.features.tolist()}
+        self.assertTrue(all(tuple(row) in known for row in first.tolist()))
+
+    def test_jitter_and_out_of_range(self):
+        """Test that jitter stays in the ENB2012 ranges and out-of-range rows leave them but stay valid"""
+        low, high = self.features.min(axis=0), self.features.max(axis=0)
+        jittered = np.concatenate(list(generate(5000, jitter=0.1)))
+        self.assertTrue(np.all((jittered >= low) & (jittered <= high)))
+        self.assertGreater(len(np.unique(jittered[:, 1])), 100)
+        integral = jittered[:, INPUT_SCHEMA.integral]
+        np.testing.assert_array_equal(integral, np.round(integral))
+
+        shifted = np.concatenate(list(generate(20000, out_of_range=0.1)))
+        outside = np.any((shifted < low) | (shifted > high), axis=1).mean()
+        self.assertAlmostEqual(outside, 0.1, delta=0.01)
+
+        # Every row leaves the range, and each leaves it in one field only
+        shifted = np.concatenate(list(generate(20000, jitter=0.1, out_of_range=1.0)))
+        fields_outside = ((shifted < low) | (shifted > high)).sum(axis=1)
+        self.assertTrue(np.all(fields_outside == 1))
+        self.assertTrue(np.any(shifted[:, 0] > high[0]))
+        self.assertFalse(np.any(shifted[:, 4] < low[4]))
+        _, valid, _ = INPUT_SCHEMA.validate([dict(zip(INPUT_SCHEMA.fields, row)) for row in shifted[:2000].tolist()])
+        self.assertTrue(valid.all())
+
+    def test_round_trip(self):
+        """Test that every format reads back the rows it was written with"""
+        expected = np.concatenate(list(generate(1200, jitter=0.05, chunk_rows=500)))
+        formats = ["csv", "ndjson"] + (["parquet"] if pa is not None else [])
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in formats:
+                path = os.path.join(directory, f"buildings.{fmt}")
+                self.assertEqual(write_chunks(generate(1200, jitter=0.05, chunk_rows=500), path), 1200)
+                loaded = np.concatenate(list(read_chunks(path, chunk_rows=700)))
+                np.testing.assert_allclose(loaded, expected, err_msg=fmt)
+            with self.assertRaises(ValueError):
+                write_chunks(generate(1), os.path.join(directory, "buildings.xlsx"))
+
+class LoadDriverTest(unittest.TestCase):
+    """Test cases for replaying buildings against the API"""
+
+    def test_bodies(self):
+        """Test that batch bodies carry batch_size buildings across chunk boundaries"""
+        bodies = [json.loads(body) for body in request_bodies(generate(250, chunk_rows=60), "batch", 100, "Decision Tree")]
+        self.assertEqual([len(body["buildings"]) for body in bodies], [100, 100, 50])
+        self.assertEqual(bodies[0]["model"], "Decision Tree")
+        single = json.loads(next(request_bodies(generate(1))))
+        self.assertEqual(set(single), set(INPUT_SCHEMA.fields))
+
+    def test_open_loop_rate(self):
+        """Test that requests go out at the target rate and failures are counted by type"""
+        def send(path, body):
+            if int(body) % 5 == 4:
+                raise ConnectionError("refused")
+            return 200
+
+        report = drive(send, "/api/predict", (str(i).encode() for i in range(1000)), rate=200, duration=0.5)
+        self.assertEqual(report["sent"], 100)
+        self.assertEqual(report["completed"], 100)
+        self.assertEqual(report["statuses"], {"200": 80, "ConnectionError": 20})
+        self.assertAlmostEqual(report["elapsed_s"], 0.5, delta=0.2)
+        self.assertEqual(drive(send, "/", iter([b"0"] * 10), rate=1000, max_requests=3)["sent"], 3)
+
+    def test_prefetch_stops_with_consumer(self):
+        """Test that closing a prefetched iterator stops its producer"""
+        items = prefetch(iter(range(10 ** 9)), size=4)
+        self.assertEqual([next(items) for _ in range(3)], [0, 1, 2])
+        items.close()
+
+    def test_local_and_http(self):
+        """Test that both senders reach the app and get predictions"""
+        app_module.load_models()
+        # Few requests in flight, so admission control never sheds them
+        report = drive(LocalSender(app_module.app), "/api/predict", request_bodies(generate(20)), rate=500, workers=2)
+        self.assertEqual(report["statuses"], {"200": 20})
+
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            sender = HttpSender(f"http://127.0.0.1:{server.server_port}")
+            report = drive(sender, "/api/predict/batch", request_bodies(generate(200), "batch", 50), rate=100, workers=2)
+        finally:
+            server.shutdown()
+        self.assertEqual(report["statuses"], {"200": 4})
+
+if __name__ == '__main__':
+    unittest.main()
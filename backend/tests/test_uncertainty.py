@@ -0,0 +1,142 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from uncertainty import (
+    PILOT_SAMPLES, affordable_samples, draw_inputs, parse_distribution,
+    parse_parameter_distributions, parse_tolerances, summarize
+)
+from utils import INPUT_SCHEMA
+
+BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.1,
+    "glazingAreaDistribution": 1
+}
+
+NOMINAL = np.array([BUILDING[field] for field in INPUT_SCHEMA.fields])
+
+class DistributionTest(unittest.TestCase):
+    """Test cases for parsing and sampling tolerances"""
+
+    def test_distribution_forms(self):
+        """Test that numbers, ranges and relative widths are normalized"""
+        self.assertEqual(parse_distribution(5, "wallArea"), {"type": "uniform", "relative": False, "halfWidth": 5.0})
+        self.assertEqual(parse_distribution({"type": "normal", "sd": 0.1, "relative": True}, "x")["sd"], 0.1)
+        self.assertEqual(parse_distribution({"type": "triangular", "low": 1, "high": 3, "mode": 2}, "x")["mode"], 2.0)
+
+    def test_malformed_distributions(self):
+        """Test that unknown types, negative widths and inverted ranges raise"""
+        for spec in ({"type": "lognormal", "sd": 1}, -1, {"type": "normal"}, {"low": 3, "high": 1}, "wide"):
+            with self.assertRaises(ValueError):
+                parse_distribution(spec, "x")
+        with self.assertRaises(ValueError):
+            parse_tolerances({"floorArea": 5})
+        with self.assertRaises(ValueError):
+            parse_parameter_distributions({"heatingCop": 0.1})
+
+    def test_draws_stay_in_range_and_integral(self):
+        """Test that drawn inputs are clipped to the schema and whole-number fields rounded"""
+        tolerances = parse_tolerances({"overallHeight": 10, "glazingAreaDistribution": 2, "glazingArea": {"type": "normal", "sd": 0.2}})
+        drawn = draw_inputs(NOMINAL, tolerances, np.random.default_rng(0), 2000)
+        self.assertTrue(np.all(drawn >= INPUT_SCHEMA.min_values) and np.all(drawn <= INPUT_SCHEMA.max_values))
+        integral = drawn[:, INPUT_SCHEMA.integral]
+        np.testing.assert_array_equal(integral, np.round(integral))
+        np.testing.assert_array_equal(drawn[:, 0], NOMINAL[0])
+
+    def test_affordable_samples(self):
+        """Test that the budget, minus the call overhead, bounds the samples"""
+        self.assertEqual(affordable_samples(100, 20, 0.01, 10 ** 6), 6000)
+        self.assertEqual(affordable_samples(100, 20, 0.01, 50), 50)
+        self.assertEqual(affordable_samples(10, 20, 0.01, 50), 0)
+
+    def test_summary_percentiles(self):
+        """Test that bands are the percentiles of each figure and ratings their shares"""
+        values = np.arange(101, dtype=np.float64)
+        figures = {name: values for name in ("heatingLoad", "coolingLoad", "heatingPowerKw", "coolingPowerKw",
+                                             "totalEnergyKwh", "annualCost", "co2EmissionKg", "requiredPanels")}
+        figures["rating"] = np.array(["A"] * 25 + ["B"] * 76)
+        bands, ratings = summarize(figures, [5, 50, 95])
+        self.assertEqual((bands["annualCost"]["p5"], bands["annualCost"]["p50"], bands["annualCost"]["p95"]), (5.0, 50.0, 95.0))
+        self.assertEqual(ratings, {"A": 0.2475, "B": 0.7525})
+
+class UncertaintyApiTest(unittest.TestCase):
+    """Test cases for the uncertainty endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        app_module.load_models()
+
+    def setUp(self):
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def post(self, body):
+        response = self.client.post('/api/uncertainty', data=json.dumps(body), content_type='application/json')
+        return response.status_code, json.loads(response.data)
+
+    def test_bands(self):
+        """Test that a seeded run gives ordered bands around the nominal prediction"""
+        body = {
+            "building": BUILDING,
+            "tolerances": {"wallArea": {"halfWidth": 0.05, "relative": True}, "glazingArea": {"type": "normal", "sd": 0.03}},
+            "parameterDistributions": {"pricePerKwh": {"type": "triangular", "low": 2500, "high": 4000}},
+            "samples": 2000,
+            "budgetMs": 5000,
+            "seed": 7
+        }
+        status, data = self.post(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['samples'], 2000)
+        self.assertFalse(data['truncated'])
+        self.assertEqual(data['model_used'], app_module.serving.default_model)
+        for name, band in data['bands'].items():
+            self.assertLessEqual(band['p5'], band['p50'], name)
+            self.assertLessEqual(band['p50'], band['p95'], name)
+        self.assertAlmostEqual(sum(data['ratingProbabilities'].values()), 1.0, places=3)
+        self.assertEqual(self.post(body)[1]['bands'], data['bands'])
+
+    def test_without_tolerances_bands_collapse(self):
+        """Test that a building without tolerances has bands equal to its prediction"""
+        status, data = self.post({"building": BUILDING, "samples": 50, "seed": 1})
+        self.assertEqual(status, 200)
+        band = data['bands']['heatingLoad']
+        self.assertEqual(band['p5'], band['p95'])
+        self.assertAlmostEqual(band['p50'], data['nominal']['heatingLoad'], places=2)
+
+    def test_tiny_budget_truncates(self):
+        """Test that a budget too small for the samples still returns a pilot's worth"""
+        status, data = self.post({"building": BUILDING, "tolerances": {"wallArea": 10}, "samples": 100000, "budgetMs": 0.001, "seed": 1})
+        self.assertEqual(status, 200)
+        self.assertTrue(data['truncated'])
+        self.assertGreaterEqual(data['samples'], PILOT_SAMPLES)
+        self.assertLess(data['samples'], 100000)
+
+    def test_invalid_requests(self):
+        """Test that unknown fields, unsampled parameters and bad sizes are rejected"""
+        for body in (
+            {"tolerances": {}},
+            {"building": BUILDING, "tolerances": {"floorArea": 5}},
+            {"building": BUILDING, "parameterDistributions": {"heatingCop": 0.1}},
+            {"building": BUILDING, "samples": 0},
+            {"building": BUILDING, "budgetMs": -1},
+            {"building": dict(BUILDING, wallArea=-1)}
+        ):
+            status, data = self.post(body)
+            self.assertEqual(status, 400, body)
+            self.assertFalse(data['success'])
+
+if __name__ == '__main__':
+    unittest.main()
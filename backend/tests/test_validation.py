@@ -0,0 +1,136 @@
+import unittest
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sandbox  # Before the app, so its logs and caches go to a temporary directory
+
+import app as app_module
+from app import app
+from utils import INPUT_SCHEMA, validate_input_data
+
+VALID_BUILDING = {
+    "relativeCompactness": 0.98,
+    "wallArea": 294.0,
+    "roofArea": 110.25,
+    "overallHeight": 7.0,
+    "glazingArea": 0.0,
+    "glazingAreaDistribution": 0
+}
+
+class InputSchemaTest(unittest.TestCase):
+    """Test cases for the column-wise input validator"""
+
+    def test_valid_batch_returns_typed_matrix(self):
+        """Test that valid records, including numeric strings, are coerced column-wise"""
+        record = dict(VALID_BUILDING, wallArea="318.5", glazingAreaDistribution="3")
+        features, valid, errors = INPUT_SCHEMA.validate([VALID_BUILDING, record])
+
+        self.assertEqual(errors, [])
+        self.assertTrue(valid.all())
+        self.assertEqual(features.dtype, np.float64)
+        self.assertEqual(features.shape, (2, len(INPUT_SCHEMA.fields)))
+        self.assertEqual(features[1, 1], 318.5)
+        self.assertEqual(INPUT_SCHEMA.to_records(features)[1]["glazingAreaDistribution"], 3)
+
+    def test_invalid_rows_are_reported_per_row(self):
+        """Test missing, non-numeric, non-finite and out-of-range values"""
+        records = [
+            VALID_BUILDING,
+            dict(VALID_BUILDING, wallArea="abc"),
+            dict(VALID_BUILDING, roofArea=float("inf")),
+            dict(VALID_BUILDING, glazingArea=1.5),
+            dict(VALID_BUILDING, glazingAreaDistribution=2.5),
+            {k: v for k, v in VALID_BUILDING.items() if k != "overallHeight"},
+            "not a record"
+        ]
+        features, valid, errors = INPUT_SCHEMA.validate(records)
+
+        self.assertEqual(features.shape[0], 1)
+        self.assertEqual(valid.tolist(), [True] + [False] * 6)
+        self.assertEqual([error["index"] for error in errors], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(errors[0]["field"], "wallArea")
+        self.assertIn("finite", errors[1]["error"])
+        self.assertIn("between", errors[2]["error"])
+        self.assertIn("must be a int", errors[3]["error"])
+        self.assertEqual(errors[4]["error"], "Missing required field: overallHeight")
+
+    def test_list_and_dict_values_are_type_errors(self):
+        """Test that a list or dict in place of a number is reported, not converted"""
+        for value in ([300.0], {"value": 300.0}):
+            records = [dict(VALID_BUILDING, wallArea=value), dict(VALID_BUILDING, wallArea=value)]
+            features, valid, errors = INPUT_SCHEMA.validate(records)
+
+            self.assertEqual(features.shape, (0, len(INPUT_SCHEMA.fields)))
+            self.assertEqual([(error["index"], error["error"]) for error in errors], [(0, "Field wallArea must be a float"), (1, "Field wallArea must be a float")])
+
+        response = app.test_client().post('/api/predict', data=json.dumps(dict(VALID_BUILDING, wallArea=[300])), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("must be a float", json.loads(response.data)["error"])
+
+    def test_validate_input_data_does_not_mutate(self):
+        """Test that the single-record wrapper leaves the request dict untouched"""
+        record = dict(VALID_BUILDING, wallArea="294")
+        is_valid, _ = validate_input_data(record)
+
+        self.assertTrue(is_valid)
+        self.assertEqual(record["wallArea"], "294")
+
+class BatchPredictTest(unittest.TestCase):
+    """Test cases for the batch prediction endpoint"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def test_batch_predict_keeps_row_positions(self):
+        """Test that invalid rows get an error and a null result in place"""
+        payload = {"buildings": [VALID_BUILDING, dict(VALID_BUILDING, glazingArea=-1), VALID_BUILDING]}
+        response = self.app.post(
+            '/api/predict/batch',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['data']), 3)
+        self.assertIsNone(data['data'][1])
+        self.assertEqual(data['data'][0], data['data'][2])
+        self.assertEqual(data['errors'][0]['index'], 1)
+
+    def test_batch_predict_without_valid_rows(self):
+        """Test that an empty or all-invalid batch returns the per-row errors without a model call"""
+        app_module.load_models()
+        for buildings in ([dict(VALID_BUILDING, glazingArea=-1), "not a record"], []):
+            response = self.app.post(
+                '/api/predict/batch',
+                data=json.dumps({"buildings": buildings}),
+                content_type='application/json'
+            )
+            data = json.loads(response.data)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(data['success'])
+            self.assertEqual(data['data'], [None] * len(buildings))
+            self.assertEqual([error['index'] for error in data['errors']], list(range(len(buildings))))
+
+    def test_batch_predict_requires_list(self):
+        """Test that a missing buildings list is rejected"""
+        response = self.app.post(
+            '/api/predict/batch',
+            data=json.dumps(VALID_BUILDING),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
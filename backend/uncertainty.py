@@ -0,0 +1,235 @@
+import os
+
+import numpy as np
+
+from calculations import compute_derived_metrics
+from utils import INPUT_SCHEMA
+
+# Samples drawn when a request does not ask for a number, and the most it may ask for
+UNCERTAINTY_SAMPLES = int(os.environ.get("UNCERTAINTY_SAMPLES", 5000))
+UNCERTAINTY_MAX_SAMPLES = int(os.environ.get("UNCERTAINTY_MAX_SAMPLES", 100000))
+
+# Time budget of a request, and the most a request may ask for
+UNCERTAINTY_BUDGET_MS = float(os.environ.get("UNCERTAINTY_BUDGET_MS", 500))
+UNCERTAINTY_MAX_BUDGET_MS = float(os.environ.get("UNCERTAINTY_MAX_BUDGET_MS", 5000))
+
+# Samples predicted first to measure a model's per-row cost when the leaderboard has no timings for it
+PILOT_SAMPLES = 256
+
+# Share of the remaining budget spent on the main model call, leaving room for the tail and the summary
+BUDGET_SHARE = 0.8
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+DISTRIBUTIONS = ("uniform", "normal", "triangular")
+
+# Parameters of calculations.compute_derived_metrics that can be given a distribution
+SAMPLED_PARAMETERS = ("hoursPerYear", "pricePerKwh", "emissionFactor", "panelOutput")
+
+# Figures reported as bands: the predicted loads and the continuous derived metrics
+BAND_FIGURES = (
+    "heatingLoad", "coolingLoad", "heatingPowerKw", "coolingPowerKw",
+    "totalEnergyKwh", "annualCost", "co2EmissionKg", "requiredPanels"
+)
+
+def _number(value, name):
+    try:
+        value = float(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"{name} must be a number")
+    if not np.isfinite(value):
+        raise ValueError(f"{name} must be a finite number")
+    return value
+
+def parse_distribution(spec, name):
+    """
+    Validate a distribution around a nominal value
+
+    A number is a uniform tolerance of ± that amount. Objects name a `type`:
+    "uniform" with `halfWidth` or `low` and `high`, "normal" with `sd`, or
+    "triangular" with `halfWidth` or `low` and `high` (peaking at the
+    nominal value unless `mode` is given). With `"relative": true`,
+    `halfWidth` and `sd` are fractions of the nominal value.
+
+    Args:
+        spec: Number or distribution object
+        name: Field or parameter name, for error messages
+
+    Returns:
+        dict: Normalized distribution
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    if not isinstance(spec, dict):
+        spec = {"type": "uniform", "halfWidth": spec}
+    kind = spec.get("type", "uniform")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Distribution of {name} must be one of {', '.join(DISTRIBUTIONS)}")
+    distribution = {"type": kind, "relative": bool(spec.get("relative", False))}
+
+    if kind == "normal":
+        distribution["sd"] = _number(spec.get("sd"), f"sd of {name}")
+        if distribution["sd"] < 0:
+            raise ValueError(f"sd of {name} must not be negative")
+        return distribution
+
+    if "low" in spec or "high" in spec:
+        distribution["low"] = _number(spec.get("low"), f"low of {name}")
+        distribution["high"] = _number(spec.get("high"), f"high of {name}")
+        if distribution["low"] > distribution["high"]:
+            raise ValueError(f"low of {name} must not exceed high")
+    else:
+        distribution["halfWidth"] = _number(spec.get("halfWidth"), f"halfWidth of {name}")
+        if distribution["halfWidth"] < 0:
+            raise ValueError(f"halfWidth of {name} must not be negative")
+    if kind == "triangular" and "mode" in spec:
+        distribution["mode"] = _number(spec["mode"], f"mode of {name}")
+    return distribution
+
+def sample(distribution, nominal, rng, size):
+    """Draw `size` values of a parsed distribution around a nominal value"""
+    scale = abs(nominal) if distribution["relative"] else 1.0
+    if distribution["type"] == "normal":
+        return rng.normal(nominal, distribution["sd"] * scale, size)
+
+    if "low" in distribution:
+        low, high = distribution["low"], distribution["high"]
+    else:
+        low, high = nominal - distribution["halfWidth"] * scale, nominal + distribution["halfWidth"] * scale
+    if low == high:
+        return np.full(size, low)
+    if distribution["type"] == "uniform":
+        return rng.uniform(low, high, size)
+    mode = min(max(distribution.get("mode", nominal), low), high)
+    return rng.triangular(low, mode, high, size)
+
+def parse_tolerances(tolerances):
+    """
+    Parse per-field input tolerances
+
+    Returns:
+        dict: Column index -> parsed distribution
+
+    Raises:
+        ValueError: If a field is unknown or a distribution malformed
+    """
+    if not tolerances:
+        return {}
+    if not isinstance(tolerances, dict):
+        raise ValueError("tolerances must be an object")
+    parsed = {}
+    for field, spec in tolerances.items():
+        if field not in INPUT_SCHEMA.fields:
+            raise ValueError(f"Unknown tolerance field: {field}")
+        parsed[INPUT_SCHEMA.fields.index(field)] = parse_distribution(spec, field)
+    return parsed
+
+def parse_parameter_distributions(distributions):
+    """
+    Parse distributions of the derived-metric parameters
+
+    Returns:
+        dict: Parameter name -> parsed distribution
+
+    Raises:
+        ValueError: If a parameter cannot be sampled or a distribution is malformed
+    """
+    if not distributions:
+        return {}
+    if not isinstance(distributions, dict):
+        raise ValueError("parameterDistributions must be an object")
+    unknown = [name for name in distributions if name not in SAMPLED_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Parameters without a distribution: {', '.join(unknown)}; use {', '.join(SAMPLED_PARAMETERS)}")
+    return {name: parse_distribution(spec, name) for name, spec in distributions.items()}
+
+def parse_percentiles(percentiles):
+    """Validate the requested percentiles, DEFAULT_PERCENTILES when omitted"""
+    if percentiles is None:
+        return list(DEFAULT_PERCENTILES)
+    if not isinstance(percentiles, list) or not percentiles:
+        raise ValueError("percentiles must be a non-empty list")
+    values = [_number(value, "Each percentile") for value in percentiles]
+    if any(value <= 0 or value >= 100 for value in values):
+        raise ValueError("percentiles must be between 0 and 100")
+    return sorted(set(values))
+
+def draw_inputs(nominal, tolerances, rng, size):
+    """
+    Perturbed copies of one building as a feature matrix
+
+    Values are clipped to the schema's ranges and whole-number fields rounded.
+
+    Args:
+        nominal: Feature row in INPUT_SCHEMA column order
+        tolerances: parse_tolerances output
+        rng: numpy Generator
+        size: Number of rows
+
+    Returns:
+        ndarray: size × features matrix
+    """
+    matrix = np.tile(np.asarray(nominal, dtype=np.float64), (size, 1))
+    for column, distribution in tolerances.items():
+        matrix[:, column] = sample(distribution, nominal[column], rng, size)
+    np.clip(matrix, INPUT_SCHEMA.min_values, INPUT_SCHEMA.max_values, out=matrix)
+    matrix[:, INPUT_SCHEMA.integral] = np.round(matrix[:, INPUT_SCHEMA.integral])
+    return matrix
+
+def draw_parameters(parameters, distributions, rng, size):
+    """
+    Parameter set with the distributed parameters replaced by sample arrays
+
+    Samples are kept strictly positive, as resolve_parameters requires of fixed values.
+    """
+    drawn = dict(parameters)
+    for name, distribution in distributions.items():
+        drawn[name] = np.maximum(sample(distribution, parameters[name], rng, size), 1e-9)
+    return drawn
+
+def affordable_samples(remaining_ms, overhead_ms, per_row_ms, wanted):
+    """Rows one model call can predict within the remaining budget, at most `wanted`"""
+    if per_row_ms is None or per_row_ms <= 0:
+        return wanted
+    return max(0, min(wanted, int((remaining_ms * BUDGET_SHARE - overhead_ms) / per_row_ms)))
+
+def propagate(features, heating_loads, cooling_loads, parameters):
+    """
+    Loads and derived metrics of every sample
+
+    Args:
+        features: Sampled feature matrix
+        heating_loads: Predicted heating load per sample
+        cooling_loads: Predicted cooling load per sample
+        parameters: draw_parameters output, arrays aligned with the samples
+
+    Returns:
+        dict: Arrays keyed by figure name
+    """
+    areas = features[:, 1] + features[:, 2]
+    figures = compute_derived_metrics(heating_loads, cooling_loads, areas, parameters)
+    figures["heatingLoad"] = np.asarray(heating_loads, dtype=np.float64)
+    figures["coolingLoad"] = np.asarray(cooling_loads, dtype=np.float64)
+    return figures
+
+def summarize(figures, percentiles, decimals=2):
+    """
+    Percentile bands, mean and standard deviation of every figure, in one percentile call
+
+    Returns:
+        tuple: (bands, rating_probabilities) where bands maps figure name to
+            {"mean", "std", "p<percentile>"...}
+    """
+    stacked = np.vstack([figures[name] for name in BAND_FIGURES])
+    quantiles = np.percentile(stacked, percentiles, axis=1)
+    means, deviations = stacked.mean(axis=1), stacked.std(axis=1)
+    bands = {}
+    for row, name in enumerate(BAND_FIGURES):
+        band = {"mean": round(float(means[row]), decimals), "std": round(float(deviations[row]), decimals)}
+        for column, percentile in enumerate(percentiles):
+            band[f"p{percentile:g}"] = round(float(quantiles[column, row]), decimals)
+        bands[name] = band
+    labels, counts = np.unique(figures["rating"], return_counts=True)
+    ratings = {str(label): round(float(count) / len(figures["rating"]), 4) for label, count in zip(labels, counts)}
+    return bands, ratings
@@ -2,6 +2,11 @@ import os
 import pickle
 import numpy as np
 import pandas as pd
+import logging
+
+from structured_logging import get_logger, log_event
+
+logger = get_logger("utils")
 
 def copy_model_file(source_path, dest_dir, file_name):
     """
@@ -17,7 +22,7 @@ def copy_model_file(source_path, dest_dir, file_name):
     """
     try:
         if not os.path.exists(source_path):
-            print(f"Source file not found: {source_path}")
+            log_event(logger, "models.copy_missing", f"Source file not found: {source_path}", level=logging.WARNING, path=source_path)
             return False
             
         os.makedirs(dest_dir, exist_ok=True)
@@ -30,13 +35,143 @@ def copy_model_file(source_path, dest_dir, file_name):
         with open(dest_path, 'wb') as dest_file:
             dest_file.write(model_data)
             
-        print(f"Successfully copied model to {dest_path}")
+        log_event(logger, "models.copied", f"Successfully copied model to {dest_path}", path=dest_path)
         return True
         
     except Exception as e:
-        print(f"Error copying model file: {e}")
+        log_event(logger, "models.copy_failed", f"Error copying model file: {e}", level=logging.ERROR)
         return False
         
+# Prediction input fields: (request field, model column, min, max, type)
+INPUT_FIELDS = [
+    ("relativeCompactness", "Relative Compactness", 0.0, 1.0, float),
+    ("wallArea", "Wall Area", 0.0, float('inf'), float),
+    ("roofArea", "Roof Area", 0.0, float('inf'), float),
+    ("overallHeight", "Overall Height", 0.0, float('inf'), float),
+    ("glazingArea", "Glazing Area", 0.0, 1.0, float),
+    ("glazingAreaDistribution", "Glazing Area Distribution", 0, 5, int)
+]
+
+class InputSchema:
+    """
+    Column-wise validator compiled once from a list of field specs
+    
+    Validates a whole batch of records one field at a time with NumPy
+    instead of looping over fields per record, and never mutates the input.
+    """
+    
+    def __init__(self, fields=INPUT_FIELDS):
+        """
+        Compile the field specs into arrays
+        
+        Args:
+            fields: List of (field, column, min, max, type) tuples
+        """
+        self.fields = [spec[0] for spec in fields]
+        self.columns = [spec[1] for spec in fields]
+        self.types = [spec[4] for spec in fields]
+        self.min_values = np.array([spec[2] for spec in fields], dtype=np.float64)
+        self.max_values = np.array([spec[3] for spec in fields], dtype=np.float64)
+        self.integral = np.array([spec[4] is int for spec in fields])
+        self.type_errors = [f"Field {spec[0]} must be a {spec[4].__name__}" for spec in fields]
+        self.range_errors = [f"Field {spec[0]} must be between {spec[2]} and {spec[3]}" for spec in fields]
+    
+    def _coerce_column(self, values):
+        """Convert one column to float64, marking values that cannot be converted"""
+        try:
+            column = np.array(values, dtype=np.float64)
+            # Lists as values convert to a 2-D array; the slow path reports them
+            if column.ndim == 1:
+                # None converts silently to NaN, but it is not a number
+                bad_type = np.array([value is None for value in values], dtype=bool)
+                return column, bad_type
+        except (ValueError, TypeError):
+            pass
+        
+        # Slow path: at least one value is malformed, convert element by element
+        column = np.full(len(values), np.nan)
+        bad_type = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (ValueError, TypeError):
+                bad_type[i] = True
+        return column, bad_type
+    
+    def validate(self, records):
+        """
+        Validate a batch of records
+        
+        Args:
+            records: List of input dicts
+            
+        Returns:
+            tuple: (features, valid, errors) where features is a float64 matrix
+                holding one row per valid record in column order, valid is a
+                boolean mask over records and errors is a list of
+                {"index", "field", "error"} dicts sorted by record index
+        """
+        n_rows = len(records)
+        valid = np.ones(n_rows, dtype=bool)
+        errors = []
+        matrix = np.empty((n_rows, len(self.fields)), dtype=np.float64)
+        
+        is_object = np.array([isinstance(record, dict) for record in records], dtype=bool)
+        for i in np.flatnonzero(~is_object):
+            errors.append({"index": int(i), "field": None, "error": "Record must be a JSON object"})
+        valid &= is_object
+        
+        for j, field in enumerate(self.fields):
+            present = np.array([is_object[i] and field in records[i] for i in range(n_rows)], dtype=bool)
+            values = [records[i][field] if present[i] else None for i in range(n_rows)]
+            column, bad_type = self._coerce_column(values)
+            
+            with np.errstate(invalid='ignore'):
+                if self.integral[j]:
+                    bad_type |= np.isfinite(column) & (column != np.floor(column))
+                non_finite = ~bad_type & ~np.isfinite(column)
+                out_of_range = ~bad_type & ~non_finite & (
+                    (column < self.min_values[j]) | (column > self.max_values[j])
+                )
+            
+            checks = [
+                (is_object & ~present, f"Missing required field: {field}"),
+                (present & bad_type, self.type_errors[j]),
+                (present & non_finite, f"Field {field} must be a finite number"),
+                (present & out_of_range, self.range_errors[j])
+            ]
+            for mask, message in checks:
+                for i in np.flatnonzero(mask):
+                    errors.append({"index": int(i), "field": field, "error": message})
+                valid &= ~mask
+            
+            matrix[:, j] = column
+        
+        errors.sort(key=lambda error: error["index"])
+        return matrix[valid], valid, errors
+    
+    def to_records(self, features):
+        """
+        Convert validated feature rows back to typed request dicts
+        
+        Args:
+            features: Feature matrix returned by validate
+            
+        Returns:
+            list: One dict per row keyed by request field
+        """
+        return [
+            {field: field_type(value) for field, field_type, value in zip(self.fields, self.types, row)}
+            for row in features.tolist()
+        ]
+
+    def to_frame(self, features):
+        """Wrap a feature matrix in the DataFrame layout the column transformer expects"""
+        return pd.DataFrame(features, columns=self.columns)
+
+# Default schema shared by every prediction endpoint
+INPUT_SCHEMA = InputSchema()
+
 def validate_input_data(data):
     """
     Validate input data for prediction
@@ -47,48 +182,22 @@ def validate_input_data(data):
     Returns:
         tuple: (is_valid, error_message)
     """
-    required_fields = [
-        "relativeCompactness",
-        "wallArea",
-        "roofArea",
-        "overallHeight",
-        "glazingArea",
-        "glazingAreaDistribution"
-    ]
-    
-    # Check if all required fields are present
-    for field in required_fields:
-        if field not in data:
-            return False, f"Missing required field: {field}"
+    _, _, errors = INPUT_SCHEMA.validate([data])
+    if errors:
+        return False, errors[0]["error"]
     
-    # Validate data types and ranges
-    validations = [
-        ("relativeCompactness", 0.0, 1.0, float),
-        ("wallArea", 0.0, float('inf'), float),
-        ("roofArea", 0.0, float('inf'), float),
-        ("overallHeight", 0.0, float('inf'), float),
-        ("glazingArea", 0.0, 1.0, float),
-        ("glazingAreaDistribution", 0, 5, int)
-    ]
+    return True, "Valid input data"
+
+def load_enb2012(path=None):
+    """
+    Load the ENB2012 dataset with named columns
     
-    for field, min_val, max_val, field_type in validations:
-        value = data.get(field)
-        
-        # Check type
-        if not isinstance(value, field_type):
-            try:
-                # Try to convert
-                if field_type == int:
-                    value = int(value)
-                else:
-                    value = float(value)
-                # Update the value
-                data[field] = value
-            except (ValueError, TypeError):
-                return False, f"Field {field} must be a {field_type.__name__}"
+    Args:
+        path: Path to ENB2012_data.csv, data.ENB2012_PATH by default
         
-        # Check range
-        if value < min_val or value > max_val:
-            return False, f"Field {field} must be between {min_val} and {max_val}"
-    
-    return True, "Valid input data" 
\ No newline at end of file
+    Returns:
+        DataFrame: One row per building, columns named as in data.ENB2012_COLUMNS
+    """
+    # data builds on INPUT_SCHEMA, so it is imported here rather than at the top
+    from data import ENB2012_PATH, load_dataset
+    return load_dataset(path or ENB2012_PATH).frame()
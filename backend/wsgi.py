@@ -1,7 +1,16 @@
-from app import app, load_models
+from app import app, load_models, start_chart_renderers, start_job_workers, start_retrainer
 
 # Load models on startup
 load_models()
+
+# Resume background jobs left unfinished by a restart
+start_job_workers()
+
+# Spawn and warm up the chart renderers before the first chart request
+start_chart_renderers()
+
+# Swap in retrained models as they are published and train when measurements arrive
+start_retrainer()
  
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file
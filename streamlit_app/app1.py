@@ -3,8 +3,11 @@ import pandas as pd
 
 from preprocess import scale
 from load_model import load
+from resources import model_version, predict, start_rerun, report_latency
 
-# Load models
+rerun_started = start_rerun()
+
+# Load models (cached once per process)
 # models_heating = load('heating')
 models_cooling = load('cooling')
 model_names = [
@@ -117,17 +120,13 @@ if st.session_state.submitted:
     predict_button = st.button("Dự đoán", key="predict_button")
 
     if predict_button:
-        # Tìm model tương ứng
-        # model_heating = dict(models_heating)[selected_model_name]
-        model_cooling = dict(models_cooling)[selected_model_name]
-
-        # Predict
+        # Predict (memoized per input)
         try:
+            inputs = (relative_compactness, wall_area, roof_area, overall_height, glazing_area, glazing_area_distribution)
             # heating_load = model_heating.predict(scaled_df)[0]
+            _, cooling_load = predict(inputs, selected_model_name, model_version())
             heating_load = 20.0
 
-            cooling_load = model_cooling.predict(scaled_df)[0]
-
             st.success(f"🎯 Kết quả dự đoán heating load : {heating_load:.4f}")
             st.success(f"🎯 Kết quả dự đoán cooling load : {cooling_load:.4f}")
 
@@ -197,3 +196,5 @@ if st.session_state.submitted:
         else:
             rating = "C (Hiệu suất thấp)"
         st.write(f"- **Xếp loại hiệu suất**: {rating}")
+
+report_latency(rerun_started)
@@ -4,8 +4,11 @@ import pandas as pd
 from preprocess import scale
 from load_model import load
 from tab import *
+from resources import start_rerun, report_latency
 
-# Load models
+rerun_started = start_rerun()
+
+# Load models (cached once per process)
 models = load()
 
 model_names = [
@@ -103,3 +106,5 @@ if app_mode == "☀️ Gợi ý số tấm pin mặt trời":
 
 if app_mode == "🏠 Phân loại hiệu suất":
     run("energy efficiency", model_names, models)
+
+report_latency(rerun_started)
@@ -1,11 +1,9 @@
-import pickle
+from resources import load_models
 
 
-def load():
-    with open(f"models/heating_AL.pkl", "rb") as f:
-        heating = pickle.load(f)
-    with open(f"models/cooling_AL.pkl", "rb") as f:
-        cooling = pickle.load(f)
-    models = {"heating": heating, "cooling": cooling}
+def load(kind=None):
+    models = load_models()
+    if kind is not None:
+        return models[kind]
 
     return models
@@ -1,14 +1,10 @@
-import pickle
-import pandas as pd
-import os
+from resources import MODEL_DIR, load_transformer
 
-path = os.path.dirname(os.path.abspath(__file__)) + "/models"
-print(path)
+path = MODEL_DIR
 
 
 def scale(df):
-    with open(f"models/col_transformer.pkl", "rb") as f:
-        ct = pickle.load(f)
+    ct = load_transformer()
 
     scaled_df = ct.transform(df)
 
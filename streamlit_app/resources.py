@@ -0,0 +1,88 @@
+import os
+import pickle
+import time
+
+import pandas as pd
+import streamlit as st
+
+# Resolve model files next to this module instead of the current directory
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+# Process-wide latency figures, shown in the sidebar
+timings = {"startup_ms": None, "last_rerun_ms": None}
+_process_start = time.perf_counter()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _load_pickle(path, mtime):
+    # mtime is part of the cache key so a replaced file is loaded again
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _model_path(file_name):
+    return os.path.join(MODEL_DIR, file_name)
+
+
+def load_pickle(file_name):
+    """Load a pickle from the models folder once per process and file version"""
+    path = _model_path(file_name)
+    return _load_pickle(path, os.path.getmtime(path))
+
+
+def model_version():
+    """Modification times of every served file, used to invalidate predictions"""
+    return tuple(
+        os.path.getmtime(_model_path(name))
+        for name in ("col_transformer.pkl", "heating_AL.pkl", "cooling_AL.pkl")
+    )
+
+
+def load_transformer():
+    return load_pickle("col_transformer.pkl")
+
+
+def load_models():
+    models = {
+        "heating": load_pickle("heating_AL.pkl"),
+        "cooling": load_pickle("cooling_AL.pkl"),
+    }
+    if timings["startup_ms"] is None:
+        timings["startup_ms"] = (time.perf_counter() - _process_start) * 1000
+    return models
+
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def predict(inputs, model_name, version):
+    """
+    Predict (heating_load, cooling_load) for one building.
+
+    inputs is a tuple of the six features in column order; results are
+    memoized per input, model and model version so switching tabs reuses them.
+    """
+    columns = [
+        "Relative Compactness",
+        "Wall Area",
+        "Roof Area",
+        "Overall Height",
+        "Glazing Area",
+        "Glazing Area Distribution",
+    ]
+    scaled = load_transformer().transform(pd.DataFrame([inputs], columns=columns))
+    models = load_models()
+    heating_load = float(models["heating"][model_name].predict(scaled)[0])
+    cooling_load = float(models["cooling"][model_name].predict(scaled)[0])
+    return heating_load, cooling_load
+
+
+def start_rerun():
+    """Mark the start of a script run"""
+    return time.perf_counter()
+
+
+def report_latency(started):
+    """Record the duration of the current script run and show it in the sidebar"""
+    timings["last_rerun_ms"] = (time.perf_counter() - started) * 1000
+    if timings["startup_ms"] is not None:
+        st.sidebar.caption(f"⏱️ Startup: {timings['startup_ms']:.0f} ms")
+    st.sidebar.caption(f"⏱️ Rerun: {timings['last_rerun_ms']:.0f} ms")
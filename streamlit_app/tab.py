@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from preprocess import scale
+from resources import model_version, predict
 
 
 def hvac(area, heating_load, cooling_load):
@@ -59,8 +60,6 @@ def run(tab, model_names, models):
     #     """
     # )
 
-    models_heating = models["heating"]
-    models_cooling = models["cooling"]
     if "submitted" not in st.session_state:
         st.session_state.submitted = False
 
@@ -122,14 +121,19 @@ def run(tab, model_names, models):
         predict_button = st.button("Dự đoán", key="predict_button")
 
         if predict_button:
-            # Tìm model tương ứng
-            model_heating = dict(models_heating)[selected_model_name]
-            model_cooling = dict(models_cooling)[selected_model_name]
-
-            # Predict
+            # Predict (memoized per input, so switching tabs does not recompute)
             try:
-                heating_load = model_heating.predict(scaled_df)[0]
-                cooling_load = model_cooling.predict(scaled_df)[0]
+                inputs = (
+                    relative_compactness,
+                    wall_area,
+                    roof_area,
+                    overall_height,
+                    glazing_area,
+                    glazing_area_distribution,
+                )
+                heating_load, cooling_load = predict(
+                    inputs, selected_model_name, model_version()
+                )
 
                 # st.success(f"🎯 Kết quả dự đoán heating load : {heating_load:.4f}")
                 # st.success(f"🎯 Kết quả dự đoán cooling load : {cooling_load:.4f}")